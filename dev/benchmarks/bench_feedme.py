@@ -0,0 +1,84 @@
+"""
+Microbenchmark of feedme writing: the old write_base + write_component path (one open and one write
+per parameter) against render_feedme and the single buffered write of write_feedme.
+
+The speedup is in render_feedme. Writing is dominated by creating the file, so write_feedme (a new
+temporary file renamed into place) measures from on par with the old writer to ~2x faster depending
+on the file system, its main gain is that readers never see a partial feedme.
+
+python dev/benchmarks/bench_feedme.py [n configs]
+"""
+import os
+import sys
+import time
+import tempfile
+
+from pygalfitm import PyGalfitm
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+BANDS = ["u", "j0378", "j0395", "j0410", "j0430", "g", "j0515", "r", "j0660", "i", "j0861", "z"]
+
+
+def old_write_feedme(pyg, feedme_path):
+    file = open(feedme_path, "w")
+    for param in pyg.base:
+        final = str(param) + ") " + str(pyg.base[param]["value"]).ljust(32) + " # " + str(pyg.base[param]["comment"]) + "\n"
+        file.write(final)
+    file.close()
+
+    for component_name in pyg.active_components:
+        config = pyg.components_config[component_name]
+        f = open(feedme_path, "a")
+        f.write("\n\n\n")
+        f.write("0) " + component_name.translate({ord(ch): None for ch in '0123456789'}) + "\n")
+        for i in pyg.components_config[component_name]:
+            final = i + ") " + config[i]['col1'].ljust(35) + " " + config[i]['col2'].ljust(5) + config[i]['col3'].ljust(10) + " # " + config[i]['comment'] + "\n"
+            f.write(final)
+        f.close()
+
+
+def make_config(key):
+    pyg = PyGalfitm()
+    pyg.activate_components(["sersic", "sersic", "sky"])
+    pyg.set_base({
+        "A": ",".join(f"/data/obj{key}_{band}.fits" for band in BANDS),
+        "A1": ",".join(BANDS),
+        "B": f"/outputs/obj{key}ss.fits",
+        "J": ",".join(str(20 + i * 0.1) for i in range(len(BANDS))),
+    })
+    pyg.set_component("sersic", {
+        "1": ",".join([str(100 + key % 7)] * len(BANDS)),
+        "3": ",".join(str(18 + i * 0.01) for i in range(len(BANDS))),
+    })
+    return pyg
+
+
+configs = [make_config(key) for key in range(N)]
+
+with tempfile.TemporaryDirectory() as tmp:
+    paths = [os.path.join(tmp, f"galfit_{key}.feedme") for key in range(N)]
+
+    for pyg, path in zip(configs[:10], paths):
+        old_write_feedme(pyg, path)
+        with open(path) as f:
+            assert f.read() == pyg.render_feedme()
+
+    start = time.perf_counter()
+    for pyg, path in zip(configs, paths):
+        old_write_feedme(pyg, path)
+    t_old = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for pyg in configs:
+        pyg.render_feedme()
+    t_render = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for pyg, path in zip(configs, paths):
+        pyg.write_feedme(path)
+    t_new = time.perf_counter() - start
+
+print(f"{N} feedmes with {len(BANDS)} bands and 3 components")
+print(f"write_base + write_component : {t_old * 1000:10.1f} ms")
+print(f"render_feedme (no disk)      : {t_render * 1000:10.1f} ms  ({t_old / t_render:.1f}x)")
+print(f"write_feedme (atomic write)  : {t_new * 1000:10.1f} ms  ({t_old / t_new:.1f}x, file creation bound)")
@@ -0,0 +1,43 @@
+"""
+Import time of "import pygalfitm" in fresh interpreters, and a check that the heavy optional modules
+are not loaded by it (they must only be imported on first use). Exits with an error if one is.
+
+python dev/benchmarks/bench_import.py [n runs]
+"""
+import sys
+import json
+import statistics
+import subprocess
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+
+## Must not be imported by "import pygalfitm"
+HEAVY = [
+    "matplotlib", "requests", "pandas", "psutil", "scipy", "pyarrow",
+    "astropy.io.fits", "astropy.table", "astropy.coordinates", "astropy.visualization",
+    "pygalfitm.VOs", "pygalfitm.plot", "pygalfitm.psf",
+]
+
+CODE = f"""
+import sys, time, json
+start = time.perf_counter()
+import pygalfitm
+elapsed = time.perf_counter() - start
+print(json.dumps({{"elapsed": elapsed, "loaded": [m for m in {HEAVY!r} if m in sys.modules]}}))
+"""
+
+times = []
+loaded = set()
+for _ in range(N):
+    result = json.loads(subprocess.check_output([sys.executable, "-c", CODE]))
+    times.append(result["elapsed"])
+    loaded.update(result["loaded"])
+
+print(f"import pygalfitm, {N} fresh interpreters")
+print(f"median : {statistics.median(times) * 1000:8.1f} ms")
+print(f"min    : {min(times) * 1000:8.1f} ms")
+
+if loaded:
+    print(f"Heavy modules loaded at import: {sorted(loaded)}")
+    sys.exit(1)
+print("No heavy module loaded at import.")
@@ -0,0 +1,61 @@
+"""
+Microbenchmark of logging from many threads to a log file: the old wlog (frame inspection, datetime
+formatting and one open/write/close per message under a lock) against the queued writer of ControlThreads.
+
+python dev/benchmarks/bench_log.py [messages per thread] [threads]
+"""
+import os
+import sys
+import time
+import inspect
+import tempfile
+import threading
+from datetime import datetime
+
+from pygalfitm.log import ControlThreads
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+THREADS = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+lock = threading.Lock()
+
+
+def old_wlog(log_file, content, tipo="[info]"):
+    func = inspect.currentframe().f_back.f_code
+    log_message = f"{datetime.now().strftime('%d/%m/%Y %H:%M:%S')}  {tipo} - {os.path.basename(func.co_filename)} - {func.co_name}() - {str(content)}"
+    with lock:
+        io = open(log_file, 'a')
+        io.write(log_message + "\n")
+        io.close()
+
+
+def run_threads(fn):
+    threads = [threading.Thread(target=fn, args=(key,)) for key in range(THREADS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    old_file = os.path.join(tmp, "old.log")
+    t_old = run_threads(lambda key: [old_wlog(old_file, f"fit {key} {i}") for i in range(N)])
+
+    control = ControlThreads(log_file=os.path.join(tmp, "new.log"), print_log=False, max_workers=1)
+    t_new = run_threads(lambda key: [control.info(f"fit {key} {i}") for i in range(N)])
+    start = time.perf_counter()
+    control.flush()
+    t_flush = time.perf_counter() - start
+
+    assert len(control.get_logs()) == N * THREADS
+
+    filtered = ControlThreads(log_file=os.path.join(tmp, "warn.log"), print_log=False, level="warning", max_workers=1)
+    t_filtered = run_threads(lambda key: [filtered.info(f"fit {key} {i}") for i in range(N)])
+
+print(f"{N * THREADS} messages from {THREADS} threads")
+print(f"old wlog                  : {t_old * 1000:10.1f} ms")
+print(f"queued (caller time)      : {t_new * 1000:10.1f} ms  ({t_old / t_new:.1f}x)")
+print(f"queued (until flushed)    : {(t_new + t_flush) * 1000:10.1f} ms  ({t_old / (t_new + t_flush):.1f}x)")
+print(f"below level (filtered)    : {t_filtered * 1000:10.1f} ms")
@@ -0,0 +1,55 @@
+"""
+Benchmark of the sigma/RMS map construction: np.vectorize per pixel (old create_sigma_image)
+against the whole-array functions of pygalfitm.VOs.noise.
+
+python dev/benchmarks/bench_noise.py [stamp size] [n bands]
+"""
+import sys
+import time
+
+import numpy as np
+
+from pygalfitm.VOs.utils import create_rms, onlypos
+from pygalfitm.VOs.noise import sigma_map, weight_to_rms, stack_sigma_maps
+
+SIZE = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+NBANDS = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+
+
+def old_sigma(weight, data):
+    RMS = np.vectorize(create_rms)(weight)
+    IM = np.vectorize(onlypos)(data)
+    return np.sqrt(np.square(RMS) + IM)
+
+
+def timeit(fn, repeat=3):
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+rng = np.random.default_rng(42)
+weights = [rng.uniform(0, 10, (SIZE, SIZE)).astype(np.float32) for _ in range(NBANDS)]
+datas = [rng.normal(0, 5, (SIZE, SIZE)).astype(np.float32) for _ in range(NBANDS)]
+for w in weights:
+    w[rng.random(w.shape) < 0.01] = 0
+
+## np.vectorize takes the output dtype from the first pixel, so old_sigma truncates the data to
+## integers when that pixel is negative. Check against a float64 reference instead.
+for w, d in zip(weights, datas):
+    w64, d64 = w.astype(np.float64), d.astype(np.float64)
+    rms = np.divide(1, w64, out=np.zeros_like(w64), where=w64 != 0)
+    assert np.allclose(np.sqrt(rms**2 + np.clip(d64, 0, None)), sigma_map(w, d), rtol=1e-5)
+    assert np.allclose(rms, weight_to_rms(w), rtol=1e-5)
+
+t_old = timeit(lambda: [old_sigma(w, d) for w, d in zip(weights, datas)], repeat=1)
+t_new = timeit(lambda: [sigma_map(w, d) for w, d in zip(weights, datas)])
+t_stack = timeit(lambda: stack_sigma_maps(weights, datas))
+
+print(f"{NBANDS} bands of {SIZE}x{SIZE}")
+print(f"np.vectorize       : {t_old * 1000:10.2f} ms")
+print(f"sigma_map per band : {t_new * 1000:10.2f} ms  ({t_old / t_new:.0f}x)")
+print(f"stack_sigma_maps   : {t_stack * 1000:10.2f} ms  ({t_old / t_stack:.0f}x)")
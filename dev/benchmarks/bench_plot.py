@@ -0,0 +1,53 @@
+"""
+Quick-look of a synthetic 12 band output block (36 images): gen_plot (one matplotlib axes, Lupton stretch
+and colorbar per image) against gen_mosaic (one vectorized stretch, tiled into a single PNG).
+
+python dev/benchmarks/bench_plot.py [image size] [runs]
+"""
+import os
+import sys
+import time
+import tempfile
+
+import numpy as np
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from astropy.io import fits
+
+from pygalfitm import PyGalfitm
+from pygalfitm.plot import gen_plot, gen_mosaic
+
+SIZE = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+N = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+BANDS = ["u", "j0378", "j0395", "j0410", "j0430", "g", "j0515", "r", "j0660", "i", "j0861", "z"]
+
+with tempfile.TemporaryDirectory() as tmp:
+    rng = np.random.default_rng(0)
+    block = os.path.join(tmp, "objss.fits")
+    hdus = [fits.PrimaryHDU()]
+    for kind in ["in", "model", "res"]:
+        for band in BANDS:
+            hdus.append(fits.ImageHDU(rng.normal(0, 1, (SIZE, SIZE)).astype(np.float32), name=f"{band}_{kind}"))
+    fits.HDUList(hdus).writeto(block)
+
+    pyg = PyGalfitm()
+    pyg.base["A1"]["value"] = ",".join(BANDS)
+    pyg.base["B"]["value"] = block
+    pyg.set_values("sersic", "3", np.linspace(17, 18, len(BANDS)))
+    pyg.set_values("sersic", "4", np.linspace(5, 6, len(BANDS)))
+
+    start = time.perf_counter()
+    for _ in range(N):
+        gen_plot(pyg, "sersic", [3, 4], fig_filename=os.path.join(tmp, "plot.png"), return_plot=True)
+        plt.close("all")
+    t_plot = (time.perf_counter() - start) / N
+
+    start = time.perf_counter()
+    for _ in range(N):
+        gen_mosaic(pyg, os.path.join(tmp, "mosaic.png"), "sersic", [3, 4])
+    t_mosaic = (time.perf_counter() - start) / N
+
+print(f"{len(BANDS)} bands, {SIZE}x{SIZE} images, {N} runs")
+print(f"gen_plot   : {t_plot * 1000:8.1f} ms")
+print(f"gen_mosaic : {t_mosaic * 1000:8.1f} ms  ({t_plot / t_mosaic:.1f}x)")
@@ -1 +1,23 @@
-from .splus import *
\ No newline at end of file
+import importlib
+
+## Submodules and the names of splus are imported on first access, see pygalfitm/__init__.py
+_SUBMODULES = ["download", "noise", "priors", "splus", "utils", "zeropoints"]
+
+
+__all__ = ["get_splus_class", "splus"]
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return importlib.import_module(f".{name}", __name__)
+
+    if not name.startswith("_"):
+        splus = importlib.import_module(".splus", __name__)
+        if hasattr(splus, name):
+            return getattr(splus, name)
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_SUBMODULES))
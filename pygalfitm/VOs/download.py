@@ -0,0 +1,128 @@
+import os
+import time
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from pygalfitm.VOs.utils import write_fits_content_firsthdu, create_sigma_image, create_rms_image
+
+from pygalfitm.log import control
+
+
+def fetch_stamp(conn, ra, dec, cut_size, band, weight=False, retries=3, backoff=1.0):
+    """Downloads one S-PLUS stamp, retrying with exponential backoff.
+
+    Args:
+        conn (splusdata.Core): splusdata logged in connection (or any object with the same stamp method).
+        ra (float): right ascension deg, center of image
+        dec (float): declination deg, center of image
+        cut_size (int): image size
+        band (str): splus band.
+        weight (bool, optional): download the weight image instead of the data. Defaults to False.
+        retries (int, optional): number of retries after the first failure. Defaults to 3.
+        backoff (float, optional): seconds to wait before the first retry, doubled at every retry. Defaults to 1.0.
+
+    Returns:
+        astropy.io.fits.HDUList: stamp HDUs.
+    """
+    filt = band.replace("j0", "f").upper()
+
+    for attempt in range(retries + 1):
+        try:
+            if hasattr(conn, "stamp"): ## New splusdata API splusdata>=3.92
+                if weight:
+                    return conn.stamp(ra, dec, cut_size, filt, weight=True)
+                return conn.stamp(ra, dec, cut_size, filt)
+
+            control.warn("Please update your splusdata to >=4.0 and use splusdata.Core instead of splusdata.connect")
+            if weight:
+                return conn.get_cut_weight(ra, dec, cut_size, filt)
+            return conn.get_cut(ra, dec, cut_size, filt)
+        except Exception as e:
+            if attempt == retries:
+                raise
+            wait = backoff * 2 ** attempt
+            control.warn(f"Download of {band} {'weight ' if weight else ''}stamp failed ({e}), retrying in {wait}s")
+            time.sleep(wait)
+
+
+def download_stamps(
+    conn,
+    name,
+    ra,
+    dec,
+    cut_size,
+    bands,
+    data_folder,
+    use_sigma=False,
+    remove_negatives=True,
+    max_workers=8,
+    retries=3,
+    backoff=1.0,
+    ):
+    """Downloads the data (and weight) stamps of all bands at once through a bounded thread pool.
+
+    Each FITS file is written as soon as its request completes, the sigma and RMS images of a band
+    are created once both its data and weight stamps are in.
+
+    Files written in data_folder:
+        {name}_{band}.fits, and with use_sigma {name}_{band}_weight.fits, {name}_{band}_sigma.fits and {name}_{band}_rms.fits
+
+    Args:
+        conn (splusdata.Core): splusdata logged in connection (or any object with the same stamp method).
+        name (str): file base name.
+        ra (float): right ascension deg, center of image
+        dec (float): declination deg, center of image
+        cut_size (int): image size
+        bands (list): splus bands.
+        data_folder (str): folder path to save downloaded images.
+        use_sigma (bool, optional): also download weights and create sigma and RMS images. Defaults to False.
+        remove_negatives (bool, optional): Removes negatives values from images downloaded. Defaults to True.
+        max_workers (int, optional): maximum number of requests in flight. Defaults to 8.
+        retries (int, optional): number of retries of each request. Defaults to 3.
+        backoff (float, optional): seconds to wait before the first retry, doubled at every retry. Defaults to 1.0.
+
+    Raises:
+        Exception: a stamp could not be downloaded after all retries.
+
+    Returns:
+        dict: {band: {"image": path, "weight": path, "sigma": path, "rms": path}}, weight, sigma and rms only with use_sigma.
+    """
+    bands = [band.lower() for band in bands]
+    files = {band: {} for band in bands}
+    hdus = {band: {} for band in bands}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {}
+        for band in bands:
+            kinds = ["image", "weight"] if use_sigma else ["image"]
+            for kind in kinds:
+                future = pool.submit(fetch_stamp, conn, ra, dec, cut_size, band, kind == "weight", retries, backoff)
+                futures[future] = (band, kind)
+
+        for future in as_completed(futures):
+            band, kind = futures[future]
+            try:
+                stamp = future.result()
+            except Exception as e:
+                for pending in futures:
+                    pending.cancel()
+                control.critical(e)
+                raise Exception(f"Could not download {band} {name} band {kind} - {e}")
+
+            suffix = "" if kind == "image" else "_weight"
+            files[band][kind] = os.path.join(data_folder, f'{name}_{band}{suffix}.fits')
+            write_fits_content_firsthdu(stamp, files[band][kind], remove_negatives)
+
+            if use_sigma:
+                hdus[band][kind] = stamp
+                if len(hdus[band]) == 2:
+                    files[band]["sigma"] = create_sigma_image(
+                        hdus[band]["weight"][1].data, hdus[band]["image"][1].data,
+                        os.path.join(data_folder, f'{name}_{band}_sigma.fits')
+                    )
+                    files[band]["rms"] = create_rms_image(
+                        hdus[band]["weight"][1].data, os.path.join(data_folder, f'{name}_{band}_rms.fits')
+                    )
+                    del hdus[band]
+
+    return files
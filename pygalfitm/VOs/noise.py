@@ -0,0 +1,75 @@
+import numpy as np
+
+
+def weight_to_rms(weight, out=None):
+    """
+    Converts a weight map to an RMS map (1 / weight), pixels with zero weight are set to 0.
+
+    Works on single images and on band stacks of shape (n_bands, ny, nx).
+
+    Parameters:
+    weight (array-like): The weight data.
+    out (numpy.ndarray, optional): float32 buffer with the same shape to write the result to.
+
+    Returns:
+    numpy.ndarray: float32 RMS map.
+    """
+    weight = np.asarray(weight)
+    if out is None:
+        out = np.zeros(weight.shape, dtype=np.float32)
+    else:
+        out[...] = 0
+
+    np.divide(1, weight, out=out, where=weight != 0, casting="unsafe")
+    return out
+
+
+def sigma_map(weight, data, out=None):
+    """
+    Computes the sigma map sqrt(rms**2 + max(data, 0)) from weight and science data.
+
+    Works on single images and on band stacks of shape (n_bands, ny, nx).
+
+    Parameters:
+    weight (array-like): The weight data.
+    data (array-like): The science data, non positive (and NaN) pixels count as 0.
+    out (numpy.ndarray, optional): float32 buffer with the same shape to write the result to.
+
+    Returns:
+    numpy.ndarray: float32 sigma map.
+    """
+    sigma = weight_to_rms(weight, out)
+    np.square(sigma, out=sigma)
+
+    positive = np.asarray(data, dtype=np.float32)
+    np.add(sigma, positive, out=sigma, where=positive > 0)
+
+    np.sqrt(sigma, out=sigma)
+    return sigma
+
+
+def stack_sigma_maps(weights, datas):
+    """
+    Computes the sigma maps of many bands at once.
+
+    Parameters:
+    weights (list): weight images of each band, all with the same shape.
+    datas (list): science images of each band, all with the same shape.
+
+    Returns:
+    numpy.ndarray: float32 array of shape (n_bands, ny, nx).
+    """
+    return sigma_map(np.stack(weights), np.stack(datas))
+
+
+def stack_rms_maps(weights):
+    """
+    Computes the RMS maps of many bands at once.
+
+    Parameters:
+    weights (list): weight images of each band, all with the same shape.
+
+    Returns:
+    numpy.ndarray: float32 array of shape (n_bands, ny, nx).
+    """
+    return weight_to_rms(np.stack(weights))
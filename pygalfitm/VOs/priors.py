@@ -0,0 +1,138 @@
+import os
+import json
+
+import numpy as np
+
+from pygalfitm.auxiliars import SkyIndex
+from pygalfitm.log import control
+
+## Catalog columns used as initial guesses, in the idr4_single tables they are named <column>_<band>
+PRIOR_COLUMNS = ["RA", "DEC", "B", "A", "FLUX_RADIUS_50", "THETA"]
+
+
+def catalog_band(band):
+    """Returns the band name used in the idr4_single tables (r, J0660, ...)."""
+    return band.lower().replace("j0", "J0").replace("f", "J0")
+
+
+def build_priors_query(band, targets, radius=0.0015):
+    """Builds one ADQL query returning the catalog rows around many targets in one band.
+
+    Args:
+        band (str): catalog band name, see catalog_band.
+        targets (list): (ra, dec) pairs in degrees.
+        radius (float, optional): search radius around each target in degrees. Defaults to 0.0015.
+
+    Returns:
+        str: ADQL query.
+    """
+    circles = "\n            OR ".join(
+        f"1 = CONTAINS( POINT('ICRS', x.ra_{band}, x.dec_{band}), CIRCLE('ICRS', {ra}, {dec}, {radius}))"
+        for ra, dec in targets
+    )
+    return f"""
+            select ra_{band}, dec_{band}, B_{band}, A_{band}, FLUX_RADIUS_50_{band}, THETA_{band}, {band}_auto
+            from "idr4_single"."idr4_single_{band.lower()}" as x
+            where
+            {circles}
+        """
+
+
+def _cache_key(ra, dec, radius):
+    return f"{float(ra):.6f},{float(dec):.6f},{radius}"
+
+
+def _load_cache(cache_file):
+    if cache_file is None or not os.path.exists(cache_file):
+        return {}
+    with open(cache_file, "r") as f:
+        return json.load(f)
+
+
+def _save_cache(cache, cache_file):
+    tmp = f"{cache_file}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(cache, f)
+    os.replace(tmp, cache_file)
+
+
+def match_priors(table, band, targets, radius=0.0015):
+    """Finds the nearest catalog row of each target within radius.
+
+    Args:
+        table (pandas.DataFrame): result of build_priors_query.
+        band (str): catalog band name.
+        targets (list): (ra, dec) pairs in degrees.
+        radius (float, optional): maximum separation in degrees. Defaults to 0.0015.
+
+    Returns:
+        list: one dict {column: value} per target (columns PRIOR_COLUMNS and "auto"), None if nothing is within radius.
+    """
+    matches = [None] * len(targets)
+    if len(table) == 0:
+        return matches
+
+    ra, dec = np.array(targets, dtype=np.float64).T
+    idx, _ = SkyIndex(table, f"RA_{band}", f"DEC_{band}").query(ra, dec, max_sep=radius)
+
+    for key, i in enumerate(idx):
+        if i < 0:
+            continue
+        obj = table.iloc[i]
+        matches[key] = {col: float(obj[f"{col}_{band}"]) for col in PRIOR_COLUMNS}
+        matches[key]["auto"] = float(obj[f"{band}_auto"])
+
+    return matches
+
+
+def get_catalog_priors(conn, targets, bands, chunk_size=100, radius=0.0015, cache_file=None):
+    """Gets the catalog values used as initial Sersic guesses (position, A/B, FLUX_RADIUS_50, THETA and auto magnitude)
+    for many targets in many bands.
+
+    Targets are queried in chunks, with one query per band returning the rows around all targets of the
+    chunk, instead of one query per band and target. Results are stored in cache_file (JSON), targets
+    already there are not queried again.
+
+    Ex:
+        priors = get_catalog_priors(conn, list(zip(df["RA"], df["DEC"])), bands, cache_file="priors.json")
+        pyg = get_splus_class(name, ra, dec, 200, data_folder, output_folder, conn, bands=bands, priors=priors[0])
+
+    Args:
+        conn (splusdata.Core): splusdata logged in connection.
+        targets (list): (ra, dec) pairs in degrees.
+        bands (list): splus bands.
+        chunk_size (int, optional): number of targets per query. Defaults to 100.
+        radius (float, optional): search radius around each target in degrees. Defaults to 0.0015.
+        cache_file (str, optional): JSON file where the priors are cached. Defaults to None (no cache).
+
+    Returns:
+        list: one dict per target {band: {column: value} or None}, see match_priors.
+    """
+    targets = [(float(ra), float(dec)) for ra, dec in targets]
+    cache = _load_cache(cache_file)
+
+    missing = {}
+    for ra, dec in targets:
+        key = _cache_key(ra, dec, radius)
+        entry = cache.get(key, {})
+        if any(catalog_band(band) not in entry for band in bands):
+            missing[key] = (ra, dec)
+    missing_targets = list(missing.values())
+
+    for start in range(0, len(missing_targets), chunk_size):
+        chunk = missing_targets[start:start + chunk_size]
+        for band in bands:
+            band = catalog_band(band)
+            table = conn.query(build_priors_query(band, chunk, radius)).to_pandas()
+
+            for (ra, dec), match in zip(chunk, match_priors(table, band, chunk, radius)):
+                cache.setdefault(_cache_key(ra, dec, radius), {})[band] = match
+
+        control.info(f"Catalog priors: {min(start + chunk_size, len(missing_targets))}/{len(missing_targets)} targets queried")
+        if cache_file is not None:
+            _save_cache(cache, cache_file)
+
+    return [
+        {catalog_band(band): cache[_cache_key(ra, dec, radius)][catalog_band(band)] for band in bands}
+        for ra, dec in targets
+    ]
@@ -3,17 +3,16 @@ from astropy.io import fits
 
 import pygalfitm
 from pygalfitm import PyGalfitm
-from pygalfitm.auxiliars import string_times_x, get_dims, get_exptime, unpack_file, check_vo_file, find_nearest_object
-from pygalfitm.psf import make_psf
+from pygalfitm.auxiliars import string_times_x, get_dims, get_exptime, unpack_file
+from pygalfitm.psf import get_psf_data, moffat_kernel_batch, write_psf
 
-from pygalfitm.VOs.utils import write_fits_content_firsthdu, create_sigma_image, create_rms_image
+from pygalfitm.VOs.download import download_stamps
+from pygalfitm.VOs.priors import get_catalog_priors, catalog_band
+from pygalfitm.VOs.zeropoints import get_zero_points
 
-import pandas as pd
 import numpy as np
 import os
 
-from pygalfitm.log import control
-
 def get_splus_class(
     name,
     ra,
@@ -41,6 +40,10 @@ def get_splus_class(
         "J0861": 8607.59,
     },
     conv_box_const=60,
+    download_workers=8,
+    download_retries=3,
+    priors=None,
+    psf_folder=None,
     **kwargs,
     ):
     """Function to get splus data and process it with galfitm
@@ -59,6 +62,12 @@ def get_splus_class(
         zpfile (str, optional): path to zeropoint file, if None it will automatically download it. Defaults to None.
         SPLUS_WAVELENGHTS (dict, optional): SPLUS wavelenghts. Defaults to { "i": 7670.59, "r": 6251.83, "g": 4758.49, "z": 8936.64, "u": 3533.29, "J0378": 3773.13, "J0395": 3940.70, "J0410": 4095.27, "J0430": 4292.39, "J0515": 5133.15, "J0660": 6613.88, "J0861": 8607.59 }.
         conv_box_const (int, optional): convolution box size. Defaults to 60.
+        download_workers (int, optional): maximum number of stamp requests in flight. Defaults to 8.
+        download_retries (int, optional): number of retries of each stamp request. Defaults to 3.
+        priors (dict, optional): catalog initial guesses of this object, one item of pygalfitm.VOs.priors.get_catalog_priors.
+            If None they are queried for this object only. Defaults to None.
+        psf_folder (str, optional): folder of the PSF files, named by their content so objects with the same
+            PSF share one file. Use one folder for all objects of a run. Defaults to None (data_folder).
     Returns:
         (pygalfitm.Pygalfitm) : Pygalfitm class with splus values. 
     """    
@@ -75,44 +84,24 @@ def get_splus_class(
     fwhmmeans = []
     conv_boxes = ""
 
-    for band in bands:
+    download_stamps(
+        conn, name, ra, dec, cut_size, bands, data_folder,
+        use_sigma=use_sigma,
+        remove_negatives=remove_negatives,
+        max_workers=download_workers,
+        retries=download_retries,
+    )
+
+    ## PSFs of all bands are evaluated together, and fields already seen come from memory
+    psf_params = [get_psf_data(os.path.join(data_folder, f'{name}_{band.lower()}.fits')) for band in bands]
+    psf_kernels = moffat_kernel_batch([fwhm for fwhm, _ in psf_params], [beta for _, beta in psf_params])
+
+    for band, kernel in zip(bands, psf_kernels):
         band = band.lower()
-        try:
-            try:
-                hdus = conn.stamp(ra, dec, cut_size, band.replace("j0", "f").upper()) ## New splusdata API splusdata>=3.92
-                if use_sigma:
-                    weight_hdus = conn.stamp(ra, dec, cut_size, band.replace("j0", "f").upper(), weight=True)
-            except Exception as e:
-                control.warn("Please update your splusdata to >=4.0 and use splusdata.Core instead of splusdata.connect")
-                hdus = conn.get_cut(ra, dec, cut_size, band.replace("j0", "f").upper())
-                if use_sigma:
-                    weight_hdus = conn.get_cut_weight(ra, dec, cut_size, band.replace("j0", "f").upper())  
-            
-            write_fits_content_firsthdu(
-                hdus, 
-                os.path.join(data_folder, f'{name}_{band.lower()}.fits'), 
-                remove_negatives
-            )
-            if use_sigma:
-                write_fits_content_firsthdu(
-                    weight_hdus, 
-                    os.path.join(data_folder, f'{name}_{band.lower()}_weight.fits'),
-                    remove_negatives
-                )
-                
-                create_sigma_image(weight_hdus[1].data, hdus[1].data, os.path.join(data_folder, f'{name}_{band.lower()}_sigma.fits'))
-                create_rms_image(weight_hdus[1].data, os.path.join(data_folder, f'{name}_{band.lower()}_rms.fits'))
-                
-        except Exception as e:
-            raise Exception(e)
-            control.critical(e)
-            control.warn(f"Could not download {band} {name} band image")
-        
-        make_psf(os.path.join(data_folder, f'{name}_{band.lower()}.fits'), outfile=os.path.join(data_folder, f'psf_{name}_{band.lower()}.fits'))
         
         im_name = os.path.join(data_folder, f'{name}_{band.lower()}.fits')
         input_images += "," + im_name
-        psf_images += "," + os.path.join(data_folder, f'psf_{name}_{band.lower()}.fits')
+        psf_images += "," + write_psf(kernel, psf_folder or data_folder)
         filters += "," + str(band).lower()
         wavelenghts += "," + str(SPLUS_WAVELENGHTS[band.lower().lower().replace("f", "J0").replace("j0", "J0")])
         
@@ -138,13 +127,11 @@ def get_splus_class(
         rms_images = rms_images[1:]
 
     ## Get ZPs
-    check_vo_file("VOs/splusZPs.csv", "https://splus.cloud/files/documentation/iDR4/tabelas/iDR4_zero-points.csv") ## Check if zps file exists
-    df = pd.read_csv(os.path.join(pygalfitm.__path__[0], "VOs/splusZPs.csv"))
     header = getheader(os.path.join(data_folder, name + f"_{bands[0].lower()}.fits"))
     field = header['OBJECT']
 
-    for band in bands:
-        zps += "," + str(df[df['Field'] == field.replace("_", "-")][f'ZP_{band.lower().replace("f", "J0").replace("j0", "J0")}'].values[0])
+    for zp in get_zero_points(zpfile).lookup([field], bands)[0]:
+        zps += "," + str(zp)
     zps = zps[1:]
 
     ## Get axis_ratios, effective_rs, position_angles, mags
@@ -153,23 +140,20 @@ def get_splus_class(
     position_angles : str = ""
     mags : str = ""
 
-    for band in bands:
+    if priors is None:
+        priors = get_catalog_priors(conn, [(ra, dec)], bands)[0]
 
-        band = band.lower().replace("j0", "J0").replace("f", "J0")
-        table = conn.query(f"""
-            select ra_{band}, dec_{band}, B_{band}, A_{band}, FLUX_RADIUS_50_{band}, THETA_{band}, {band}_auto
-            from "idr4_single"."idr4_single_{band.lower()}" as x
-            where 
-            1 = CONTAINS( POINT('ICRS', x.ra_{band}, x.dec_{band}), 
-            CIRCLE('ICRS', {ra}, {dec}, 0.0015))
-        """)
+    for band in bands:
 
-        obj = find_nearest_object(table.to_pandas(), ra, dec, ra_name=f"RA_{band}", dec_name=f"DEC_{band}")
+        band = catalog_band(band)
+        obj = priors[band]
+        if obj is None:
+            raise Exception(f"No catalog object found for {name} in band {band}")
         
-        axis_ratios += "," + str( obj[f"B_{band}"]/obj[f"A_{band}"] )
-        effective_rs += "," + str( obj[f"FLUX_RADIUS_50_{band}"] )
-        position_angles += "," + str( obj[f"THETA_{band}"] )
-        mags += "," + str( obj[f"{band}_auto"]  )
+        axis_ratios += "," + str( obj["B"]/obj["A"] )
+        effective_rs += "," + str( obj["FLUX_RADIUS_50"] )
+        position_angles += "," + str( obj["THETA"] )
+        mags += "," + str( obj["auto"]  )
 
     axis_ratios = axis_ratios[1:]
     effective_rs = effective_rs[1:]
@@ -1,4 +1,3 @@
-import numpy as np
 from astropy.io import fits
 from collections import OrderedDict
 import glob
@@ -6,6 +5,8 @@ import os
 import re
 import multiprocessing as mp
 
+from pygalfitm.VOs.noise import weight_to_rms, sigma_map
+
 
 def onlypos(x):
     if x > 0:
@@ -52,16 +53,8 @@ def create_sigma_image(weight_data, fits_data, out_filename):
     Returns:
     str: The filename of the saved sigma image.
     """
-    # Invert each pixel in weight data
-    vector_rms = np.vectorize(create_rms)
-    RMS = vector_rms(weight_data)
-    
-    # Apply only positive function element-wise to the FITS data
-    vector_onlypos = np.vectorize(onlypos)
-    IM = vector_onlypos(fits_data)
-    
-    # Calculate Sigma and save to new FITS files
-    SIGMA = np.sqrt(np.square(RMS) + IM)
+    # sqrt(rms**2 + max(data, 0)) in float32, see pygalfitm.VOs.noise
+    SIGMA = sigma_map(weight_data, fits_data)
     hdu_sigma = fits.PrimaryHDU(SIGMA)
     hdu_sigma.writeto(out_filename, overwrite=True)
     return out_filename
@@ -71,15 +64,14 @@ def create_rms_image(weight_data, out_filename):
     Create an RMS image from the given weight data and save it to the specified output file.
 
     Parameters:
-    weight_data (list): A list of weight data values.
+    weight_data (array-like): The weight data.
     out_filename (str): The path to the output file where the RMS image will be saved.
 
     Returns:
     str: The path to the saved RMS image file.
     """
     # Invert each pixel in weight data
-    vector_rms = np.vectorize(create_rms)
-    RMS = vector_rms(weight_data)
+    RMS = weight_to_rms(weight_data)
     
     hdu_rms = fits.PrimaryHDU(RMS)
     hdu_rms.writeto(out_filename, overwrite=True)
@@ -0,0 +1,142 @@
+import os
+
+import numpy as np
+
+import pygalfitm
+from pygalfitm.auxiliars import check_vo_file
+from pygalfitm.VOs.priors import catalog_band
+
+ZP_FILE = "VOs/splusZPs.csv"
+ZP_URL = "https://splus.cloud/files/documentation/iDR4/tabelas/iDR4_zero-points.csv"
+
+## One ZeroPoints per file, loaded once per process
+_zero_points = {}
+
+
+class ZeroPoints:
+    """
+    S-PLUS zero-point table indexed by field name, loaded on first use.
+
+    The CSV is parsed once into a (n_fields, n_bands) float array. With `binary` a compact .npz copy
+    is written next to the CSV and used by the next processes, which is faster to load than the CSV.
+
+    Examples
+    --------
+    >>> zps = get_zero_points()
+    >>> zps.zp("HYDRA_0011", "r")
+    >>> zps.lookup(["HYDRA-0011", "HYDRA-0012"], ["g", "r", "J0660"])   # shape (2, 3)
+    """
+
+    def __init__(self, filename=None, binary=True):
+        """
+        Args:
+            filename (str, optional): zero-point CSV (columns Field and ZP_<band>). If None the iDR4 table is
+                downloaded to the package folder. Defaults to None.
+            binary (bool, optional): read and write the compact .npz copy of the table. Defaults to True.
+        """
+        self.filename = filename
+        self.binary = binary
+
+        self._fields = None
+        self._bands = None
+        self._values = None
+
+    def _load(self):
+        if self._values is not None:
+            return
+
+        if self.filename is None:
+            check_vo_file(ZP_FILE, ZP_URL) ## Check if zps file exists
+            self.filename = os.path.join(pygalfitm.__path__[0], ZP_FILE)
+
+        npz = os.path.splitext(self.filename)[0] + ".npz"
+        if self.binary and os.path.exists(npz) and os.path.getmtime(npz) >= os.path.getmtime(self.filename):
+            with np.load(npz, allow_pickle=False) as data:
+                fields, bands, values = data["fields"], data["bands"], data["values"]
+        else:
+            import pandas as pd
+            df = pd.read_csv(self.filename)
+            zp_cols = [col for col in df.columns if col.startswith("ZP_")]
+
+            fields = np.asarray(df["Field"], dtype=str)
+            bands = np.array([col[3:] for col in zp_cols])
+            values = df[zp_cols].values.astype(np.float64)
+
+            if self.binary:
+                try:
+                    tmp = f"{npz}.{os.getpid()}.tmp.npz"
+                    np.savez(tmp, fields=fields, bands=bands, values=values)
+                    os.replace(tmp, npz)
+                except OSError:
+                    pass
+
+        self._fields = {field: key for key, field in enumerate(fields)}
+        self._bands = {band: key for key, band in enumerate(bands)}
+        self._values = values
+
+    @property
+    def fields(self):
+        """Field names in the table."""
+        self._load()
+        return list(self._fields)
+
+    @property
+    def bands(self):
+        """Bands in the table."""
+        self._load()
+        return list(self._bands)
+
+    def _field_index(self, field):
+        field = field.replace("_", "-")
+        if field not in self._fields:
+            raise KeyError(f"Field not found in zero-point table - {field}")
+        return self._fields[field]
+
+    def _band_index(self, band):
+        band = catalog_band(band)
+        if band not in self._bands:
+            raise KeyError(f"Band not found in zero-point table - {band}")
+        return self._bands[band]
+
+    def zp(self, field, band):
+        """Returns the zero point of one field and band.
+
+        Args:
+            field (str): field name, as in the OBJECT header keyword ("_" or "-" separated).
+            band (str): splus band.
+
+        Returns:
+            float: zero point.
+        """
+        self._load()
+        return float(self._values[self._field_index(field), self._band_index(band)])
+
+    def lookup(self, fields, bands):
+        """Returns the zero points of many fields and bands.
+
+        Args:
+            fields (list): field names.
+            bands (list): splus bands.
+
+        Returns:
+            numpy.ndarray: array of shape (len(fields), len(bands)).
+        """
+        self._load()
+        rows = [self._field_index(field) for field in fields]
+        cols = [self._band_index(band) for band in bands]
+        return self._values[np.ix_(rows, cols)]
+
+
+def get_zero_points(filename=None, binary=True):
+    """Returns the ZeroPoints of a file, shared by every call in this process.
+
+    Args:
+        filename (str, optional): zero-point CSV. Defaults to None (iDR4 table in the package folder).
+        binary (bool, optional): read and write the compact .npz copy of the table. Defaults to True.
+
+    Returns:
+        ZeroPoints: zero-point table.
+    """
+    if filename not in _zero_points:
+        _zero_points[filename] = ZeroPoints(filename, binary)
+    return _zero_points[filename]
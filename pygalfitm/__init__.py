@@ -1,6 +1,43 @@
+import importlib
+
 from .pygalfitm import PyGalfitm
-from .auxiliars import *
 
-from .psf import *
+## Everything else is imported on first access (PEP 562), so "import pygalfitm" does not load
+## matplotlib, requests, pandas or the VO code in every worker process
+_SUBMODULES = [
+    "aio", "auxiliars", "batch", "cache", "components", "imageblock", "journal", "log",
+    "plot", "psf", "qa", "read", "render", "tables", "workers", "VOs",
+]
+
+## Modules whose public names used to be star-imported here, searched in this order
+_STAR_MODULES = ["auxiliars", "psf", "VOs"]
+
+
+## Names of "from pygalfitm import *", resolved (and imported) only by a star import
+__all__ = [
+    "PyGalfitm",
+    "unpack_file", "string_times_x", "get_dims", "get_exptime", "band_output_path", "band_list",
+    "check_vo_file",
+    "find_nearest_object", "SkyIndex", "remove_parentheses_and_brackets", "clear_folder",
+    "get_psf_data", "make_psf", "radial_grid", "moffat_kernels", "moffat_kernel_batch", "moffat_kernel", "write_psf",
+    "get_splus_class", "splus",
+]
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return importlib.import_module(f".{name}", __name__)
+
+    if not name.startswith("_"):
+        for module_name in _STAR_MODULES:
+            module = importlib.import_module(f".{module_name}", __name__)
+            if hasattr(module, name):
+                value = getattr(module, name)
+                globals()[name] = value
+                return value
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
-from .VOs import *
\ No newline at end of file
+def __dir__():
+    return sorted(set(globals()) | set(_SUBMODULES))
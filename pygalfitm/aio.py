@@ -0,0 +1,124 @@
+import asyncio
+
+from pygalfitm.log import control
+from pygalfitm.workers import validate_executable
+
+
+async def run_async(pyg, timeout=None, cwd=None, on_line=None, keep_output=True):
+    """Runs galfitm for a PyGalfitm object without blocking the event loop.
+
+    galfitm is started with asyncio.create_subprocess_exec (no shell) and its stdout is read
+    line by line as it is produced. If the timeout expires or the calling task is cancelled,
+    the galfitm process is killed before the exception propagates. The executable is only
+    validated, never downloaded, so the event loop is not blocked waiting for input.
+
+    Args:
+        pyg (pygalfitm.PyGalfitm): PyGalfitm object with the feedme already written.
+        timeout (float, optional): maximum time in seconds for the fit. Defaults to None (no limit).
+        cwd (str, optional): working directory of the galfitm process. Defaults to None (current directory).
+        on_line (callable, optional): called with each decoded stdout line as soon as it is read. Defaults to None.
+        keep_output (bool, optional): accumulate stdout and return it, set False to only stream it to on_line. Defaults to True.
+
+    Raises:
+        FileNotFoundError: galfitm executable not found or not executable.
+        TimeoutError: galfitm did not finish in `timeout` seconds.
+        Exception: galfitm exited with an error.
+
+    Returns:
+        str: output of run (empty if keep_output is False).
+    """
+    if not pyg.check_number_of_filters():
+        control.info("Warning! Running with possibly wrong parameters on components.")
+
+    executable = validate_executable(pyg.executable)
+
+    proc = await asyncio.create_subprocess_exec(
+        executable, pyg.feedme_path,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT,
+        cwd=cwd,
+    )
+
+    lines = []
+
+    async def read_stdout():
+        while True:
+            line = await proc.stdout.readline()
+            if not line:
+                break
+            line = line.decode("UTF-8", errors="replace")
+            if keep_output:
+                lines.append(line)
+            if on_line is not None:
+                on_line(line)
+
+    try:
+        await asyncio.wait_for(asyncio.gather(read_stdout(), proc.wait()), timeout)
+    except asyncio.TimeoutError:
+        raise TimeoutError(f"galfitm did not finish in {timeout}s - {pyg.feedme_path}")
+    finally:
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+
+    output = "".join(lines)
+    if proc.returncode != 0:
+        control.info(output)
+        raise Exception("Error running galfitm.")
+
+    return output
+
+
+async def gather_runs(pygs, max_concurrency=None, timeout=None, cwds=None, return_exceptions=True):
+    """Runs galfitm for many PyGalfitm objects concurrently in the running event loop.
+
+    Args:
+        pygs (list): PyGalfitm objects with their feedmes already written.
+        max_concurrency (int, optional): maximum number of galfitm processes running at once. Defaults to None (no limit).
+        timeout (float, optional): maximum time in seconds for each fit. Defaults to None (no limit).
+        cwds (list, optional): working directory of each fit, same length as pygs. Defaults to None.
+        return_exceptions (bool, optional): return exceptions of failed fits in place of their output
+            instead of raising the first one. Defaults to True.
+
+    Raises:
+        FileNotFoundError: a galfitm executable was not found, checked before any fit starts.
+
+    Returns:
+        list: output (or exception) of each fit, in the same order as pygs.
+    """
+    ## Check every executable once, before the fits start
+    for executable in {pyg.executable for pyg in pygs}:
+        validate_executable(executable)
+
+    semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+    if cwds is None:
+        cwds = [None] * len(pygs)
+
+    async def limited(pyg, cwd):
+        if semaphore is None:
+            return await run_async(pyg, timeout=timeout, cwd=cwd)
+        async with semaphore:
+            return await run_async(pyg, timeout=timeout, cwd=cwd)
+
+    return await asyncio.gather(
+        *[limited(pyg, cwd) for pyg, cwd in zip(pygs, cwds)],
+        return_exceptions=return_exceptions
+    )
+
+
+def run_many(pygs, max_concurrency=None, timeout=None, cwds=None, return_exceptions=True):
+    """Blocking helper that runs `gather_runs` in a new event loop.
+
+    Ex:
+        outputs = run_many([pyg1, pyg2, pyg3], max_concurrency=32, timeout=600)
+
+    Raises:
+        FileNotFoundError: a galfitm executable was not found, checked before the event loop starts.
+
+    Returns:
+        list: output (or exception) of each fit, in the same order as pygs.
+    """
+    for executable in {pyg.executable for pyg in pygs}:
+        validate_executable(executable)
+
+    return asyncio.run(gather_runs(pygs, max_concurrency, timeout, cwds, return_exceptions))
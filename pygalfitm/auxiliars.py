@@ -1,10 +1,8 @@
-from astropy.io import fits
-import requests
 import os
+import pickle
 import pygalfitm
 
-from astropy.coordinates import SkyCoord
-import astropy.units as u
+import numpy as np
 
 def unpack_file(filename, output=None, output_folder=None, delete_compressed=False):
     """
@@ -35,6 +33,8 @@ def unpack_file(filename, output=None, output_folder=None, delete_compressed=Fal
     elif not output:
         output = filename.replace('.fz', '')
 
+    from astropy.io import fits
+
     packed = fits.open(filename)
     unpacked = fits.hdu.image.PrimaryHDU(data=packed[1].data, header=packed[1].header)
     fits.hdu.hdulist.HDUList(hdus=[unpacked]).writeto(output, overwrite=True)
@@ -63,6 +63,8 @@ def string_times_x(string, x):
 
 def get_dims(filename):
     """Returns a tuple (width, height)"""
+    from astropy.io import fits
+
     hdulist = fits.open(filename)
     hdu = hdulist[0]
     ret = (hdu.header["NAXIS1"], hdu.header["NAXIS2"])
@@ -71,12 +73,38 @@ def get_dims(filename):
 
 def get_exptime(filename):
     """Returns exposure-time from image header"""
+    from astropy.io import fits
+
     hdulist = fits.open(filename)
     hdu = hdulist[0]
     ret = hdu.header["EXPTIME"]
     hdulist.close()
     return ret
 
+def band_output_path(pyg):
+    """Returns the path of the .band file galfitm writes next to the output image block (base B).
+
+    Args:
+        pyg (pygalfitm.PyGalfitm): PyGalfitm object.
+
+    Returns:
+        str: path of the result .band file.
+    """
+    return os.path.splitext(pyg.base["B"]["value"].strip())[0] + ".galfit.01.band"
+
+def band_list(base):
+    """Returns the band labels of base A1, without the spaces around each label.
+
+    Every result column and image block extension is named by these labels, so all of them must use this list.
+
+    Args:
+        base (dict): base parameters (PyGalfitm.base or a parsed base).
+
+    Returns:
+        list: band labels, e.g. ["g", "r", "i"] for "g, r, i".
+    """
+    return [band.strip() for band in base["A1"]["value"].strip().split(",")]
+
 def check_vo_file(file, download_link):
     """
     Checks if a file required for the pygalfitm package is available. If the file is not present, the function downloads
@@ -95,6 +123,8 @@ def check_vo_file(file, download_link):
 
     """
     if not os.path.exists(os.path.join(pygalfitm.__path__[0], f'{file}')):
+        import requests
+
         print("Downloading " + file)
         r = requests.get(download_link)
         print("Writing " + os.path.join(pygalfitm.__path__[0], file))
@@ -117,7 +147,16 @@ def find_nearest_object(table, ra, dec, ra_name = "ra", dec_name = "dec") :
     Returns:
     nearest_object : pandas Series
         Series representing the nearest object in the table.
+
+    To match many targets against the same table build a SkyIndex once, it may also be
+    passed here in place of the table.
     """
+    if isinstance(table, SkyIndex):
+        return table.nearest(ra, dec)
+
+    from astropy.coordinates import SkyCoord
+    import astropy.units as u
+
     target_coord = SkyCoord(ra=ra*u.degree, dec=dec*u.degree)
     table_coords = SkyCoord(ra=table[ra_name]*u.degree, dec=table[dec_name]*u.degree, unit = (u.degree, u.degree))
     idx, sep, _ = target_coord.match_to_catalog_sky(table_coords)
@@ -125,6 +164,101 @@ def find_nearest_object(table, ra, dec, ra_name = "ra", dec_name = "dec") :
     return nearest_object
 
 
+def _unit_vectors(ra, dec):
+    ra = np.radians(np.asarray(ra, dtype=np.float64))
+    dec = np.radians(np.asarray(dec, dtype=np.float64))
+    cos_dec = np.cos(dec)
+    return np.column_stack([cos_dec * np.cos(ra), cos_dec * np.sin(ra), np.sin(dec)])
+
+
+class SkyIndex:
+    """
+    Sky cross-match index of a table, the KD-tree is built once and queried for many targets.
+
+    Positions are stored as unit vectors, so the chord distance returned by the tree is converted
+    exactly to an angular separation.
+
+    Examples
+    --------
+    >>> index = SkyIndex(catalog, ra_name="RA", dec_name="DEC")
+    >>> idx, sep = index.query(targets["RA"], targets["DEC"], max_sep=1 / 3600)
+    >>> index.save("catalog.skyindex")
+    >>> index = SkyIndex.load("catalog.skyindex")
+    """
+
+    def __init__(self, table, ra_name = "ra", dec_name = "dec"):
+        """
+        Args:
+            table (pandas.DataFrame or astropy.table.Table): table with the objects.
+            ra_name (str, optional): Right Ascension column (degrees). Defaults to "ra".
+            dec_name (str, optional): Declination column (degrees). Defaults to "dec".
+        """
+        from scipy.spatial import cKDTree
+
+        self.table = table
+        self.ra_name = ra_name
+        self.dec_name = dec_name
+        self.tree = cKDTree(_unit_vectors(table[ra_name], table[dec_name]))
+
+    def __len__(self):
+        return self.tree.n
+
+    def query(self, ra, dec, max_sep = None):
+        """
+        Finds the nearest object of the table for each target.
+
+        Parameters:
+        ra : float or array-like
+            Right Ascension of the targets in degrees.
+        dec : float or array-like
+            Declination of the targets in degrees.
+        max_sep : float, optional
+            Maximum separation in degrees, targets without an object closer than that get index -1.
+
+        Returns:
+        idx : numpy.ndarray
+            Row index of the nearest object of each target (-1 if none within max_sep).
+        sep : numpy.ndarray
+            Separation in degrees (NaN if none within max_sep).
+        """
+        targets = _unit_vectors(np.atleast_1d(ra), np.atleast_1d(dec))
+
+        if max_sep is None:
+            upper_bound = np.inf
+        else:
+            ## Chord length of the maximum angular separation
+            upper_bound = 2 * np.sin(np.radians(min(max_sep, 180)) / 2) * (1 + 1e-12)
+
+        dist, idx = self.tree.query(targets, k=1, distance_upper_bound=upper_bound)
+
+        found = np.isfinite(dist)
+        sep = np.full(len(dist), np.nan)
+        sep[found] = np.degrees(2 * np.arcsin(np.clip(dist[found] / 2, 0, 1)))
+        idx = np.where(found, idx, -1)
+
+        return idx, sep
+
+    def nearest(self, ra, dec):
+        """
+        Returns the nearest object of the table to one position, like find_nearest_object.
+        """
+        idx, _ = self.query(ra, dec)
+        if hasattr(self.table, "iloc"):
+            return self.table.iloc[idx[0]]
+        return self.table[idx[0]]
+
+    def save(self, filename):
+        """Saves the index (tree and table) to a pickle file."""
+        with open(filename, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, filename):
+        """Loads an index saved with SkyIndex.save."""
+        with open(filename, "rb") as f:
+            return pickle.load(f)
+
+
 def remove_parentheses_and_brackets(s):
     """Removes any parts of a string that are inside parentheses or square brackets.
 
@@ -0,0 +1,249 @@
+import os
+import time
+import traceback
+
+from functools import partial
+
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from pygalfitm.auxiliars import band_output_path
+from pygalfitm.workers import init_worker, run_job
+from pygalfitm.log import control
+
+
+def iter_rows(table, id_col="ID"):
+    """Yields (name, row) pairs from a table of objects.
+
+    Args:
+        table (pandas.DataFrame, astropy.table.Table or list of dict): table with one object per row.
+        id_col (str, optional): column holding the object names. Defaults to "ID".
+
+    Yields:
+        tuple: (name, row) where row is a dict with the columns of the table.
+    """
+    if hasattr(table, "to_dict") and hasattr(table, "iterrows"):
+        rows = table.to_dict(orient="records")
+    elif hasattr(table, "colnames"):
+        rows = [{col: row[col] for col in table.colnames} for row in table]
+    else:
+        rows = table
+
+    for row in rows:
+        yield str(row[id_col]), dict(row)
+
+
+def _run_in_scratch(pyg, cwd=None):
+    return run_job(pyg, outputs=("block", "band", "log"), cwd=cwd)["output"]
+
+
+def fit_object(name, row, build_fn, workdir, executable=None, read_result=True, build_kwargs=None, cache=None,
+               scratch=False):
+    """Builds, writes and runs a single PyGalfitm job inside its own working directory.
+    This is the function executed by each worker of `fit_catalog`, so it never raises,
+    failures are returned in the result dict. Relative paths set by build_fn are read from workdir,
+    with or without scratch, and the paths returned are absolute.
+
+    Args:
+        name (str): object name.
+        row (dict): table row of the object.
+        build_fn (callable): function `build_fn(row, workdir, **build_kwargs)` returning a configured PyGalfitm object.
+            It must be importable from a module (not a lambda) to be sent to the worker processes.
+        workdir (str): working directory of this job, created if it does not exist.
+        executable (str, optional): galfitm executable path, overrides the one set by build_fn. Defaults to None.
+        read_result (bool, optional): read the .band result into a PyGalfitm object. Defaults to True.
+        build_kwargs (dict, optional): extra keyword arguments passed to build_fn. Defaults to None.
+        cache (pygalfitm.cache.FitCache, optional): result cache, cached fits are restored instead of run. Defaults to None.
+        scratch (bool, optional): run galfitm in the scratch folder of the worker, see pygalfitm.workers.run_job. Defaults to False.
+
+    Returns:
+        dict: result with keys name, status ("done" or "failed"), workdir, feedme, band_file, output, result, error, traceback and elapsed.
+    """
+    start = time.time()
+    result = {
+        "name": name,
+        "status": "failed",
+        "workdir": os.path.abspath(workdir),
+        "feedme": None,
+        "band_file": None,
+        "output": None,
+        "result": None,
+        "error": None,
+        "traceback": None,
+        "elapsed": None,
+    }
+
+    try:
+        os.makedirs(workdir, exist_ok=True)
+
+        pyg = build_fn(row, workdir, **(build_kwargs or {}))
+        if not pyg.name:
+            pyg.name = name
+        if executable is not None:
+            pyg.executable = executable
+
+        result["feedme"] = os.path.abspath(os.path.join(workdir, "galfit.feedme"))
+        pyg.feedme_path = result["feedme"]
+
+        run_fn = partial(_run_in_scratch, cwd=workdir) if scratch else None
+        if cache is not None:
+            result["output"] = cache.run(pyg, cwd=workdir, run_fn=run_fn)
+        else:
+            pyg.write_feedme()
+            result["output"] = pyg.run(cwd=workdir) if run_fn is None else run_fn(pyg)
+        result["band_file"] = os.path.abspath(os.path.join(workdir, band_output_path(pyg)))
+
+        if read_result:
+            from pygalfitm.read import read_output_to_class
+            result["result"] = read_output_to_class(result["band_file"])
+
+        result["status"] = "done"
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {str(e)}"
+        result["traceback"] = traceback.format_exc()
+
+    result["elapsed"] = round(time.time() - start, 4)
+    return result
+
+
+def iter_fit_catalog(table, build_fn, output_folder, id_col="ID", max_workers=None, executable=None,
+                     read_result=True, build_kwargs=None, cache=None, scratch=False, scratch_root=None,
+                     journal=None, retries=0):
+    """Runs one galfitm job per object of a table in a process pool and yields the results as the jobs finish.
+
+    Each object gets its own working directory `output_folder/<name>` with its own galfit.feedme,
+    so galfitm outputs (fit.log, image blocks) of concurrent jobs do not collide.
+
+    With a journal every attempt is recorded as it finishes, and objects already done in the journal,
+    or that failed more than `retries` + 1 times, are skipped, so an interrupted run can be restarted
+    with the same arguments. Failed jobs are resubmitted up to `retries` times.
+
+    Args:
+        table (pandas.DataFrame, astropy.table.Table or list of dict): objects to fit.
+        build_fn (callable): function `build_fn(row, workdir, **build_kwargs)` returning a configured PyGalfitm object.
+        output_folder (str): folder where the working directories are created.
+        id_col (str, optional): column holding the object names. Defaults to "ID".
+        max_workers (int, optional): maximum number of concurrent galfitm jobs. Defaults to None (number of CPUs).
+        executable (str, optional): galfitm executable path. Defaults to None (the one set by build_fn).
+        read_result (bool, optional): read each .band result into a PyGalfitm object. Defaults to True.
+        build_kwargs (dict, optional): extra keyword arguments passed to build_fn. Defaults to None.
+        cache (pygalfitm.cache.FitCache, optional): result cache shared by the workers. Defaults to None.
+        scratch (bool, optional): each worker validates the executable once and runs galfitm without a shell
+            in its own scratch folder, moving back the block, .band and fit.log, see pygalfitm.workers. Defaults to False.
+        scratch_root (str, optional): folder of the scratch folders. Defaults to None (/dev/shm if available).
+        journal (pygalfitm.journal.RunJournal, optional): journal of the run. Defaults to None.
+        retries (int, optional): number of times a failed object is tried again. Defaults to 0.
+
+    Yields:
+        dict: final result of each object, see `fit_object`, with the attempt number in "attempt".
+    """
+    os.makedirs(output_folder, exist_ok=True)
+
+    states = journal.states() if journal is not None else {}
+    jobs = []
+    n_done, n_exhausted = 0, 0
+    for name, row in iter_rows(table, id_col):
+        status, failures = states.get(name, (None, 0))
+        if status == "done":
+            n_done += 1
+        elif failures > retries:
+            n_exhausted += 1
+        else:
+            jobs.append((name, row, failures + 1))
+
+    if n_done or n_exhausted:
+        control.info(f"Skipping {n_done} objects already done and {n_exhausted} objects that failed {retries + 1} times")
+
+    total = len(jobs)
+    finished, failed = 0, 0
+
+    pool_kwargs = {"initializer": init_worker, "initargs": (executable, scratch_root)} if scratch else {}
+    with ProcessPoolExecutor(max_workers=max_workers, **pool_kwargs) as pool:
+        pending = {}
+
+        def submit(name, row, attempt):
+            workdir = os.path.abspath(os.path.join(output_folder, name))
+            future = pool.submit(fit_object, name, row, build_fn, workdir, executable, read_result, build_kwargs, cache, scratch)
+            pending[future] = (name, row, workdir, attempt)
+
+        for job in jobs:
+            submit(*job)
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, row, workdir, attempt = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    ## The worker process died (e.g. BrokenProcessPool), fit_object itself never raises
+                    result = {
+                        "name": name, "status": "failed", "workdir": workdir, "feedme": None, "band_file": None,
+                        "output": None, "result": None, "error": f"{type(e).__name__}: {str(e)}",
+                        "traceback": traceback.format_exc(), "elapsed": None,
+                    }
+                result["attempt"] = attempt
+
+                if journal is not None:
+                    journal.record_result(result, attempt)
+
+                if result["status"] != "done" and attempt <= retries:
+                    control.warn(f"Failed {name} (attempt {attempt}), retrying - {result['error']}")
+                    submit(name, row, attempt + 1)
+                    continue
+
+                finished += 1
+                if result["status"] == "done":
+                    control.info(f"Finished {name} in {result['elapsed']}s - {finished}/{total}")
+                else:
+                    failed += 1
+                    control.warn(f"Failed {name} - {result['error']} - {finished}/{total}, {failed} failed")
+                yield result
+
+
+def fit_catalog(table, build_fn, output_folder, id_col="ID", max_workers=None, executable=None,
+                read_result=True, build_kwargs=None, callback=None, cache=None, writer=None, scratch=False,
+                scratch_root=None, journal=None, retries=0):
+    """Fits every object of a table running independent PyGalfitm jobs in a process pool.
+
+    Ex:
+        def build(row, workdir):
+            conn = splusdata.Core()
+            return get_splus_class(row["ID"], row["RA"], row["DEC"], 200, workdir, workdir, conn)
+
+        results = fit_catalog(df, build, "outputs/", max_workers=40)
+        failed = [r["name"] for r in results if r["status"] == "failed"]
+
+    Args:
+        table (pandas.DataFrame, astropy.table.Table or list of dict): objects to fit.
+        build_fn (callable): function `build_fn(row, workdir, **build_kwargs)` returning a configured PyGalfitm object.
+            It must be defined at module level so it can be sent to the worker processes.
+        output_folder (str): folder where the working directories are created.
+        id_col (str, optional): column holding the object names. Defaults to "ID".
+        max_workers (int, optional): maximum number of concurrent galfitm jobs. Defaults to None (number of CPUs).
+        executable (str, optional): galfitm executable path. Defaults to None (the one set by build_fn).
+        read_result (bool, optional): read each .band result into a PyGalfitm object. Defaults to True.
+        build_kwargs (dict, optional): extra keyword arguments passed to build_fn. Defaults to None.
+        callback (callable, optional): called with each result dict as soon as its job finishes. Defaults to None.
+        cache (pygalfitm.cache.FitCache, optional): result cache shared by the workers. Defaults to None.
+        writer (pygalfitm.tables.ResultWriter, optional): catalog where the rows of every finished object are
+            added, finalized after the last job. Needs read_result. Defaults to None.
+        scratch (bool, optional): run galfitm in per-worker scratch folders, see iter_fit_catalog. Defaults to False.
+        scratch_root (str, optional): folder of the scratch folders. Defaults to None (/dev/shm if available).
+        journal (pygalfitm.journal.RunJournal, optional): journal used to resume the run, see iter_fit_catalog. Defaults to None.
+        retries (int, optional): number of times a failed object is tried again. Defaults to 0.
+
+    Returns:
+        list: result dicts in order of completion, see `fit_object`.
+    """
+    results = []
+    for result in iter_fit_catalog(table, build_fn, output_folder, id_col, max_workers, executable,
+                                   read_result, build_kwargs, cache, scratch, scratch_root, journal, retries):
+        if writer is not None and result["result"] is not None:
+            writer.add(result["result"])
+        if callback is not None:
+            callback(result)
+        results.append(result)
+
+    if writer is not None:
+        writer.finalize()
+    return results
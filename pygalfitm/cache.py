@@ -0,0 +1,228 @@
+import os
+import time
+import shutil
+import sqlite3
+import hashlib
+import tempfile
+
+from contextlib import closing
+
+from pygalfitm.auxiliars import band_output_path
+from pygalfitm.log import control
+
+## Base parameters that name input files of the fit
+IMAGE_PARAMETERS = ["A", "C", "D", "F"]
+
+
+class FitCache:
+    """
+    On-disk cache of galfitm results, shared by every process pointing to the same folder.
+
+    The key of a fit is a sha256 of the rendered feedme (base plus active components) and of the
+    images named in base A, C, D and F (their bytes, or only their size and modification time if
+    `hash_content` is False). Relative paths are taken from the working directory of galfitm. A hit
+    restores the .band output and the output image block (base B) without running galfitm.
+
+    The index is a SQLite database inside the cache folder, entries are evicted in least recently
+    used order when the total size goes above `max_bytes`.
+
+    Examples
+    --------
+    >>> cache = FitCache("/scratch/galfitm_cache", max_bytes=50 * 1024**3)
+    >>> output = cache.run(pyg)   # runs galfitm only if this fit is not cached
+    """
+
+    def __init__(self, cache_dir, max_bytes=10 * 1024**3, hash_content=True):
+        """
+        Args:
+            cache_dir (str): cache folder, created if it does not exist.
+            max_bytes (int, optional): maximum total size of the cached files. Defaults to 10 GiB.
+            hash_content (bool, optional): hash the bytes of the input images. If False only their size and
+                modification time are used, which misses fits whose images are downloaded again on every run
+                (e.g. get_splus_class). Defaults to True.
+        """
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_bytes = max_bytes
+        self.hash_content = hash_content
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with self._connect() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, size INTEGER, last_used REAL)")
+
+    def _connect(self):
+        ## A new connection per operation keeps the object picklable for process pools
+        db = sqlite3.connect(os.path.join(self.cache_dir, "index.sqlite"), timeout=60, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        return closing(db)
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def _hash_file(self, h, path):
+        if self.hash_content:
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    h.update(chunk)
+        else:
+            stat = os.stat(path)
+            h.update(f"{stat.st_size}:{stat.st_mtime_ns}".encode())
+
+    def key(self, pyg, cwd=None, feedme=None):
+        """Computes the cache key of a PyGalfitm object.
+
+        Args:
+            pyg (pygalfitm.PyGalfitm): PyGalfitm object.
+            cwd (str, optional): working directory of galfitm, relative image paths are read from it.
+                Defaults to None (current directory).
+            feedme (str, optional): feedme text already rendered, as returned by write_feedme. Defaults to None.
+
+        Returns:
+            str: hex sha256 key.
+        """
+        if feedme is None:
+            feedme = pyg.render_feedme()
+        h = hashlib.sha256(feedme.encode("UTF-8"))
+
+        for param in IMAGE_PARAMETERS:
+            if param not in pyg.base:
+                continue
+            for path in pyg.base[param]["value"].split(","):
+                path = path.strip()
+                if path == "" or path.lower() == "none":
+                    continue
+                h.update(f"\0{param}:{path}\0".encode())
+                path = _resolve(path, cwd)
+                if os.path.exists(path):
+                    self._hash_file(h, path)
+                else:
+                    h.update(b"missing")
+
+        return h.hexdigest()
+
+    def restore(self, pyg, key=None, cwd=None):
+        """Restores the outputs of a cached fit to the paths expected from the PyGalfitm object.
+
+        Args:
+            pyg (pygalfitm.PyGalfitm): PyGalfitm object.
+            key (str, optional): precomputed key. Defaults to None.
+            cwd (str, optional): working directory of galfitm, see key. Defaults to None.
+
+        Returns:
+            str: galfitm output of the cached run, or None if the fit is not cached.
+        """
+        if key is None:
+            key = self.key(pyg, cwd)
+
+        with self._connect() as db:
+            row = db.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+
+        entry = self._entry_dir(key)
+        try:
+            _copy_atomic(os.path.join(entry, "block.fits"), _resolve(pyg.base["B"]["value"].strip(), cwd))
+            _copy_atomic(os.path.join(entry, "output.band"), _resolve(band_output_path(pyg), cwd))
+            with open(os.path.join(entry, "output.txt"), "r") as f:
+                output = f.read()
+        except FileNotFoundError:
+            ## Entry evicted by another process in the meantime
+            with self._connect() as db:
+                db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            return None
+
+        control.debug(f"Restored {pyg.name} from cache")
+        return output
+
+    def store(self, pyg, output, key=None, cwd=None):
+        """Stores the outputs of a finished fit.
+
+        Args:
+            pyg (pygalfitm.PyGalfitm): PyGalfitm object that was run.
+            output (str): galfitm output of the run.
+            key (str, optional): key computed before the run. Defaults to None.
+            cwd (str, optional): working directory of galfitm, see key. Defaults to None.
+        """
+        if key is None:
+            key = self.key(pyg, cwd)
+
+        entry = self._entry_dir(key)
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+
+        tmp = tempfile.mkdtemp(dir=os.path.dirname(entry))
+        shutil.copyfile(_resolve(pyg.base["B"]["value"].strip(), cwd), os.path.join(tmp, "block.fits"))
+        shutil.copyfile(_resolve(band_output_path(pyg), cwd), os.path.join(tmp, "output.band"))
+        with open(os.path.join(tmp, "output.txt"), "w") as f:
+            f.write(output)
+
+        size = sum(os.path.getsize(os.path.join(tmp, i)) for i in os.listdir(tmp))
+        try:
+            os.rename(tmp, entry)
+        except OSError:
+            ## Same fit already stored by another process
+            shutil.rmtree(tmp, ignore_errors=True)
+
+        with self._connect() as db:
+            db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?)", (key, size, time.time()))
+        self.evict()
+
+    def evict(self):
+        """Removes least recently used entries until the cache size is below max_bytes."""
+        removed = []
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            total = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total > self.max_bytes:
+                for key, size in db.execute("SELECT key, size FROM entries ORDER BY last_used").fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    removed.append(key)
+                    total -= size
+            db.execute("COMMIT")
+
+        for key in removed:
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+
+    def clear(self):
+        """Removes every entry of the cache."""
+        with self._connect() as db:
+            keys = [row[0] for row in db.execute("SELECT key FROM entries").fetchall()]
+            db.execute("DELETE FROM entries")
+        for key in keys:
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+
+    def run(self, pyg, cwd=None, run_fn=None):
+        """Writes the feedme and runs galfitm, unless the same fit is already cached.
+
+        Args:
+            pyg (pygalfitm.PyGalfitm): PyGalfitm object.
+            cwd (str, optional): working directory of the galfitm process. Defaults to None.
+            run_fn (callable, optional): called with pyg to run galfitm and returning its output,
+                e.g. pygalfitm.workers.run_job. Defaults to None (pyg.run).
+
+        Returns:
+            str: output of run.
+        """
+        ## The feedme is rendered once, for the file and for the key
+        key = self.key(pyg, cwd, pyg.write_feedme())
+        output = self.restore(pyg, key, cwd)
+        if output is not None:
+            return output
+
+        output = pyg.run(cwd=cwd) if run_fn is None else run_fn(pyg)
+        self.store(pyg, output, key, cwd)
+        return output
+
+
+def _resolve(path, cwd):
+    ## galfitm opens relative paths from its own working directory, not from the one of Python
+    if cwd is None or os.path.isabs(path):
+        return path
+    return os.path.join(cwd, path)
+
+
+def _copy_atomic(src, dst):
+    tmp = f"{dst}.{os.getpid()}.tmp"
+    shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
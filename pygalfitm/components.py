@@ -0,0 +1,573 @@
+from types import MappingProxyType
+from collections.abc import MutableMapping
+
+import numpy as np
+
+## Columns of a parameter line in the string API (components_config[component][param][column])
+COLUMNS = ("col1", "col2", "col3", "comment")
+
+
+class ParamTemplate:
+    """Default value of one component parameter (one feedme line), shared by every PyGalfitm."""
+
+    __slots__ = ("col1", "col2", "col3", "comment")
+
+    def __init__(self, col1, col2, col3, comment):
+        object.__setattr__(self, "col1", col1)
+        object.__setattr__(self, "col2", col2)
+        object.__setattr__(self, "col3", col3)
+        object.__setattr__(self, "comment", comment)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ParamTemplate is immutable.")
+
+    def __repr__(self):
+        return f"ParamTemplate({self.col1!r}, {self.col2!r}, {self.col3!r}, {self.comment!r})"
+
+    def as_dict(self):
+        """Returns a new {"col1", "col2", "col3", "comment"} dict, the format of PyGalfitm.components_config."""
+        return {"col1": self.col1, "col2": self.col2, "col3": self.col3, "comment": self.comment}
+
+
+def _freeze(templates):
+    return MappingProxyType({name: MappingProxyType(params) for name, params in templates.items()})
+
+
+## Read only, PyGalfitm objects copy a component only when it is first changed
+COMPONENT_TEMPLATES = _freeze({
+    "sky": {
+        "1":  ParamTemplate("BKGG,BKGR,BKGI", "0", "band", "Sky background at center of fitting region [ADUs]"),
+        "2":  ParamTemplate("0,0,0", "0", "band", "dsky/dx (sky gradient in x) [ADUs/pix]"),
+        "3":  ParamTemplate("0,0,0", "0", "band", "dsky/dy (sky gradient in y) [ADUs/pix]"),
+        "Z":  ParamTemplate("0", "", "", "Skip this model in output image? (yes=1, no=0)")
+    },
+    "sersic": {
+        "1":  ParamTemplate("200.0,200.0,200.0", "1", "band", "Position x [pixel]"),
+        "2":  ParamTemplate("200.0,200.0,200.0", "1", "band", "Position y [pixel]"),
+        "3":  ParamTemplate("0,0,0", "3", "band", "Integrated magnitude"),
+        "4":  ParamTemplate("0,0,0", "2", "band", "R_e (effective radius) [pix]"),
+        "5":  ParamTemplate("4", "2", "band", "Sersic index n (de Vaucouleurs n=4)"),
+        "9":  ParamTemplate("0,0,0", "1", "band", "Axis ratio (b/a)"),
+        "10": ParamTemplate("0,0,0", "1", "band", "Position angle (PA) [deg: Up=0, Left=90]"),
+        "Z":  ParamTemplate("0", "", "", "Skip this model in output image? (yes=1, no=0)")
+    },
+    "expdisk": {
+        "1":  ParamTemplate("300", "1", "band", "Position x [pixel]"),
+        "2":  ParamTemplate("357.4", "1", "band", "Position y [pixel]"),
+        "3":  ParamTemplate("0,0,0", "3", "band", "Integrated magnitude"),
+        "4":  ParamTemplate("0,0,0", "2", "band", "R_s (disk scale lengths) [pix]"),
+        "9":  ParamTemplate("0,0,0", "1", "band", "Axis ratio (b/a)"),
+        "10": ParamTemplate("0,0,0", "1", "band", "Position angle (PA) [deg: Up=0, Left=90]"),
+        "Z":  ParamTemplate("0", "", "", "Skip this model in output image? (yes=1, no=0)")
+    },
+    "moffat": {
+        "1":  ParamTemplate("300", "1", "band", "Position x [pixel]"),
+        "2":  ParamTemplate("357.4", "1", "band", "Position y [pixel]"),
+        "3":  ParamTemplate("0,0,0", "3", "band", "Total magnitude"),
+        "4":  ParamTemplate("0,0,0", "2", "band", "FWHM"),
+        "5":  ParamTemplate("0,0,0", "2", "band", "powerlaw"),
+        "9":  ParamTemplate("0,0,0", "1", "band", "Axis ratio (b/a)"),
+        "10": ParamTemplate("0,0,0", "1", "band", "Position angle (PA) [deg: Up=0, Left=90]"),
+        "Z":  ParamTemplate("0", "", "", "Skip this model in output image? (yes=1, no=0)")
+    },
+    "ferrer": {
+        "1":  ParamTemplate("300", "1", "band", "Position x [pixel]"),
+        "2":  ParamTemplate("357.4", "1", "band", "Position y [pixel]"),
+        "3":  ParamTemplate("0,0,0", "3", "band", "Central surface brghtness [mag/arcsec^2]"),
+        "4":  ParamTemplate("0,0,0", "2", "band", "Outer truncation radius  [pix]"),
+        "5":  ParamTemplate("0,0,0", "2", "band", "Alpha (outer truncation sharpness) "),
+        "6":  ParamTemplate("0,0,0", "2", "band", "Beta (central slope)"),
+        "9":  ParamTemplate("0,0,0", "1", "band", "Axis ratio (b/a)"),
+        "10": ParamTemplate("0,0,0", "1", "band", "Position angle (PA) [deg: Up=0, Left=90]"),
+        "Z":  ParamTemplate("0", "", "", "Skip this model in output image? (yes=1, no=0)")
+    },
+    "psf": {
+        "1":  ParamTemplate("0,0,0", "0", "band", "position x [pixel]"),
+        "2":  ParamTemplate("0,0,0", "0", "band", "position y [pixel]"),
+        "3":  ParamTemplate("0,0,0", "0", "band", "total magnitude "),
+        "Z":  ParamTemplate("0", "", "", "Skip this model in output image? (yes=1, no=0)")
+    },
+    "nuker": {
+        "1":  ParamTemplate("300.", "1", "band", "Position x [pixel]"),
+        "2":  ParamTemplate("357.4", "1", "band", "Position y [pixel]"),
+        "3":  ParamTemplate("0,0,0", "3", "band", "mu(Rb)            [surface brightness mag. at Rb]"),
+        "4":  ParamTemplate("0,0,0", "2", "band", "Rb               [pixels]"),
+        "5":  ParamTemplate("0,0,0", "2", "band", "alpha  (sharpness of transition)"),
+        "6":  ParamTemplate("0,0,0", "2", "band", "beta   (outer powerlaw slope)"),
+        "7":  ParamTemplate("0,0,0", "1", "band", "gamma  (inner powerlaw slope)"),
+        "9":  ParamTemplate("0,0,0", "1", "band", "axis ratio (b/a)"),
+        "10": ParamTemplate("0,0,0", "1", "band", "Position angle (PA) [deg: Up=0, Left=90]"),
+        "Z":  ParamTemplate("0", "", "", "Skip this model in output image? (yes=1, no=0)")
+    },
+    "corser": {
+        "1":  ParamTemplate("300.", "1", "band", "Position x [pixel]"),
+        "2":  ParamTemplate("357.4", "1", "band", "Position y [pixel]"),
+        "3":  ParamTemplate("0,0,0", "3", "band", "mu(Rb)            [surface brightness mag. at Rb]"),
+        "4":  ParamTemplate("0,0,0", "2", "band", "Rb               [pixels]"),
+        "5":  ParamTemplate("0,0,0", "2", "band", "alpha  (sharpness of transition)"),
+        "6":  ParamTemplate("0,0,0", "1", "band", "gamma  (inner powerlaw slope)"),
+        "7":  ParamTemplate("0,0,0", "1", "band", "R_e (half-light radius)   [pix]"),
+        "8":  ParamTemplate("0,0,0", "1", "band", "Sersic index n (de Vaucouleurs n=4) "),
+        "9":  ParamTemplate("0,0,0", "1", "band", "axis ratio (b/a)"),
+        "10": ParamTemplate("0,0,0", "1", "band", "Position angle (PA) [deg: Up=0, Left=90]"),
+        "Z":  ParamTemplate("0", "", "", "Skip this model in output image? (yes=1, no=0)")
+    },
+    "devauc": {
+        "1":  ParamTemplate("300.", "1", "band", "Position x [pixel]"),
+        "2":  ParamTemplate("357.4", "1", "band", "Position y [pixel]"),
+        "3":  ParamTemplate("0,0,0", "3", "band", "Total magnitude"),
+        "4":  ParamTemplate("0,0,0", "2", "band", "Rs               [Pixels]"),
+        "9":  ParamTemplate("0,0,0", "1", "band", "Axis ratio (b/a)"),
+        "10": ParamTemplate("0,0,0", "1", "band", "Position angle (PA) [deg: Up=0, Left=90]"),
+        "Z":  ParamTemplate("0", "", "", "Skip this model in output image? (yes=1, no=0)")
+    },
+    "edgedisk": {
+        "1":  ParamTemplate("300.", "1", "band", "Position x [pixel]"),
+        "2":  ParamTemplate("357.4", "1", "band", "Position y [pixel]"),
+        "3":  ParamTemplate("0,0,0", "3", "band", "central surface brightness  [mag/arcsec^2]"),
+        "4":  ParamTemplate("0,0,0", "2", "band", "disk scale-height    [Pixels]"),
+        "5":  ParamTemplate("0,0,0", "2", "band", "disk scale-length    [Pixels]"),
+        "10": ParamTemplate("0,0,0", "1", "band", "Position angle (PA) [deg: Up=0, Left=90]"),
+        "Z":  ParamTemplate("0", "", "", "Skip this model in output image? (yes=1, no=0)")
+    },
+    "gaussian": {
+        "1":  ParamTemplate("300.", "1", "band", "Position x [pixel]"),
+        "2":  ParamTemplate("357.4", "1", "band", "Position y [pixel]"),
+        "3":  ParamTemplate("0,0,0", "3", "band", "Total magnitude"),
+        "4":  ParamTemplate("0,0,0", "2", "band", "FWHM               [pixels]"),
+        "9":  ParamTemplate("0,0,0", "1", "band", "Axis ratio (b/a)"),
+        "10": ParamTemplate("0,0,0", "1", "band", "Position angle (PA) [deg: Up=0, Left=90]"),
+        "Z":  ParamTemplate("0", "", "", "Skip this model in output image? (yes=1, no=0)")
+    },
+    "king": {
+        "1":  ParamTemplate("300", "1", "band", "Position x [pixel]"),
+        "2":  ParamTemplate("357.4", "1", "band", "Position y [pixel]"),
+        "3":  ParamTemplate("0,0,0", "3", "band", "mu(0)"),
+        "4":  ParamTemplate("0,0,0", "2", "band", "Rc"),
+        "5":  ParamTemplate("0,0,0", "2", "band", "Rt"),
+        "6":  ParamTemplate("0,0,0", "2", "band", "alpha"),
+        "9":  ParamTemplate("0,0,0", "1", "band", "Axis ratio (b/a)"),
+        "10": ParamTemplate("0,0,0", "1", "band", "Position angle (PA) [deg: Up=0, Left=90]"),
+        "Z":  ParamTemplate("0", "", "", "Skip this model in output image? (yes=1, no=0)")
+    }
+})
+
+BASE_TEMPLATE = MappingProxyType({
+    "A":  ("", "Input data image (FITS file)"),
+    "A1": ("g, r, i", "Nick names (band labels) "),
+    "A2": ("4770, 6231, 7625", "Effective wavelenghts"),
+    "B":  ("4770, 6231, 7625", "Output data image block"),
+    "C":  ("", "Sigma image name (made from data if blank or 'none')"),
+    "D":  ("", "Input PSF image and (optional) diffusion kernel"),
+    "E":  ("1", "PSF fine sampling factor relative to data "),
+    "F":  ("none", "Bad pixel mask (FITS image or ASCII coord list)"),
+    "G":  ("none", "File with parameter constraints (ASCII file) "),
+    "H":  ("1    200  1  200", "Image region to fit (xmin xmax ymin ymax)"),
+    "I":  ("200  200", "Size of the convolution box (x y)"),
+    "J":  ("0,0,0", "Magnitude photometric zeropoint"),
+    "K":  ("0.55  0.55", "Plate scale (dx dy)   [arcsec per pixel]"),
+    "O":  ("regular", "Display type (regular, curses, both)"),
+    "P":  ("0", "Choose: 0=optimize, 1=model, 2=imgblock, 3=subcomps"),
+    "U":  ("0", ""),
+    "V":  ("0", "Use standard optimizer (0) or MultiNest (1)"),
+    "W":  ("default", "Output images"),
+})
+
+
+def new_base():
+    """Returns a new base config dict ({letter: {"value", "comment"}}) with the default values."""
+    return {letter: {"value": value, "comment": comment} for letter, (value, comment) in BASE_TEMPLATE.items()}
+
+
+def _parse_value(value):
+    ## galfitm marks problematic values with * and fixed ones with []
+    try:
+        return float(value.strip().strip("*[]"))
+    except ValueError:
+        return np.nan
+
+
+def parse_values(text):
+    """Returns the comma separated values of a feedme column as a float64 array, NaN where not a number."""
+    return np.array([_parse_value(value) for value in text.split(",")], dtype=np.float64)
+
+
+def _parse_problem(value):
+    value = value.strip()
+    return len(value) > 1 and value.startswith("*") and value.endswith("*")
+
+
+def parse_problems(text):
+    """Returns a boolean array of the comma separated values of a feedme column, True where galfitm
+    marked the value as a problem of the fit (*value*, e.g. a parameter that hit a constraint)."""
+    return np.array([_parse_problem(value) for value in text.split(",")], dtype=bool)
+
+
+def _parse_dof(col2):
+    try:
+        return int(col2.split(",")[0])
+    except ValueError:
+        return 0
+
+
+def format_values(values):
+    """Returns the feedme text (comma separated) of an array of parameter values."""
+    return ",".join(str(value) for value in np.asarray(values, dtype=np.float64).tolist())
+
+
+class ParamView(MutableMapping):
+    """One parameter of a ComponentParams as a {"col1", "col2", "col3", "comment"} dict of strings.
+
+    Reads and writes go to the arrays of the component, col1 is parsed when set and only formatted
+    again when the values were changed through ComponentParams.set_value.
+    """
+
+    __slots__ = ("_params", "_name")
+
+    def __init__(self, params, name):
+        self._params = params
+        self._name = name
+
+    def __getitem__(self, column):
+        if column not in COLUMNS:
+            raise KeyError(column)
+        return self._params._get(self._name, column)
+
+    def __setitem__(self, column, value):
+        if column not in COLUMNS:
+            raise KeyError(column)
+        self._params._set(self._name, column, value)
+
+    def __delitem__(self, column):
+        raise KeyError("Parameter columns can not be removed.")
+
+    def __iter__(self):
+        return iter(COLUMNS)
+
+    def __len__(self):
+        return len(COLUMNS)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class ComponentParams(MutableMapping):
+    """Parameters of one component, stored as arrays.
+
+    The values of col1 are kept in `values`, a float64 array of shape (n_params, n_bands) padded with
+    NaN, with the number of values of each parameter in `lengths` and the degrees of freedom (col2) in
+    `dof`. Values that are not numbers (e.g. the sky template "BKGG,BKGR,BKGI") are NaN in `values`
+    and keep their text for the feedme.
+
+    As a mapping it is the old {param: {"col1", "col2", "col3", "comment"}} dict, with ParamView items.
+
+    Ex:
+        params = pyg.components_config["sersic"]
+        params.value("3")                      # magnitudes, numpy array with one value per band
+        params.set_value("4", [3.1, 2.9, 2.7])
+        params["4"]["col1"]                    # "3.1,2.9,2.7"
+    """
+
+    __slots__ = ("names", "values", "lengths", "dof", "comments", "_index", "_col1", "_col2", "_col3", "_shared")
+
+    def __init__(self, params=None):
+        """
+        Args:
+            params (dict, optional): {param: {"col1", "col2", "col3", "comment"}}. Defaults to None.
+        """
+        self.names = []
+        self.values = np.empty((0, 0))
+        self.lengths = np.empty(0, dtype=np.int64)
+        self.dof = np.empty(0, dtype=np.int64)
+        self.comments = []
+
+        self._index = {}
+        self._col1 = []
+        self._col2 = []
+        self._col3 = []
+        self._shared = False
+
+        if params is not None:
+            for name in params:
+                self[name] = params[name]
+
+    def __getitem__(self, name):
+        if name not in self._index:
+            raise KeyError(name)
+        return ParamView(self, name)
+
+    def __setitem__(self, name, param):
+        if name not in self._index:
+            self._append(name)
+        for column in COLUMNS:
+            self._set(name, column, param.get(column, ""))
+
+    def __delitem__(self, name):
+        self._own()
+        i = self._index.pop(name)
+        del self.names[i], self.comments[i], self._col1[i], self._col2[i], self._col3[i]
+        self.values = np.delete(self.values, i, axis=0)
+        self.lengths = np.delete(self.lengths, i)
+        self.dof = np.delete(self.dof, i)
+        self._index = {name: key for key, name in enumerate(self.names)}
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __repr__(self):
+        return f"ComponentParams({ {name: dict(self[name]) for name in self.names}!r})"
+
+    def __getstate__(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    def __setstate__(self, state):
+        self._shared = False
+        for slot, value in state.items():
+            setattr(self, slot, value)
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+    def copy(self):
+        """Returns an independent copy."""
+        new = ComponentParams.__new__(ComponentParams)
+        new.names = list(self.names)
+        new.values = self.values.copy()
+        new.lengths = self.lengths.copy()
+        new.dof = self.dof.copy()
+        new.comments = list(self.comments)
+        new._index = dict(self._index)
+        new._col1 = list(self._col1)
+        new._col2 = list(self._col2)
+        new._col3 = list(self._col3)
+        new._shared = False
+        return new
+
+    def _share(self):
+        ## New ComponentParams reading the arrays and lists of this one, copied by _own at its first change
+        new = ComponentParams.__new__(ComponentParams)
+        for slot in self.__slots__:
+            setattr(new, slot, getattr(self, slot))
+        new._shared = True
+        return new
+
+    def _own(self):
+        if self._shared:
+            owned = self.copy()
+            for slot in self.__slots__:
+                setattr(self, slot, getattr(owned, slot))
+
+    def _append(self, name):
+        self._own()
+        self._index[name] = len(self.names)
+        self.names.append(name)
+        self.comments.append("")
+        self._col1.append("")
+        self._col2.append("")
+        self._col3.append("")
+        self.values = np.vstack([self.values, np.full((1, self.values.shape[1]), np.nan)])
+        self.lengths = np.append(self.lengths, 0)
+        self.dof = np.append(self.dof, 0)
+
+    def _fit(self, i, values):
+        self._own()
+        n = len(values)
+        if n > self.values.shape[1]:
+            pad = np.full((len(self.names), n - self.values.shape[1]), np.nan)
+            self.values = np.hstack([self.values, pad])
+        self.values[i] = np.nan
+        self.values[i, :n] = values
+        self.lengths[i] = n
+
+    def _get(self, name, column):
+        i = self._index[name]
+        if column == "col1":
+            if self._col1[i] is None:
+                self._own()
+                self._col1[i] = format_values(self.values[i, :self.lengths[i]])
+            return self._col1[i]
+        if column == "col2":
+            return self._col2[i]
+        if column == "col3":
+            return self._col3[i]
+        return self.comments[i]
+
+    def _set(self, name, column, value):
+        self._own()
+        i = self._index[name]
+        value = str(value)
+        if column == "col1":
+            self._fit(i, parse_values(value))
+            self._col1[i] = value
+        elif column == "col2":
+            self._col2[i] = value
+            self.dof[i] = _parse_dof(value)
+        elif column == "col3":
+            self._col3[i] = value
+        else:
+            self.comments[i] = value
+
+    def value(self, name):
+        """Returns the values (col1) of a parameter, one per band.
+
+        Args:
+            name (str): parameter name ("1", "3", ...).
+
+        Returns:
+            numpy.ndarray: float64 values, NaN where the text is not a number.
+        """
+        i = self._index[name]
+        return self.values[i, :self.lengths[i]].copy()
+
+    def set_value(self, name, values, dof=None, mode=None):
+        """Sets the values (col1) of a parameter from numbers, without going through strings.
+
+        Args:
+            name (str): parameter name, added if it does not exist.
+            values (float or array-like): one value per band.
+            dof (int, optional): degrees of freedom (col2). Defaults to None (unchanged).
+            mode (str, optional): "band" or "cheb" (col3). Defaults to None (unchanged).
+        """
+        if name not in self._index:
+            self._append(name)
+        i = self._index[name]
+        self._fit(i, np.atleast_1d(np.asarray(values, dtype=np.float64)))
+        self._col1[i] = None
+
+        if dof is not None:
+            self._set(name, "col2", dof)
+        if mode is not None:
+            self._set(name, "col3", mode)
+
+    def problems(self, name):
+        """Returns the problem markers of a parameter, see parse_problems.
+
+        Args:
+            name (str): parameter name ("1", "3", ...).
+
+        Returns:
+            numpy.ndarray: boolean array, one value per band. All False for values set through set_value.
+        """
+        i = self._index[name]
+        if self._col1[i] is None:
+            return np.zeros(self.lengths[i], dtype=bool)
+        return parse_problems(self._col1[i])
+
+    @property
+    def problem_mask(self):
+        """Boolean array shaped as `values`, True where galfitm marked the value as a problem (*value*)."""
+        mask = np.zeros(self.values.shape, dtype=bool)
+        for i, col1 in enumerate(self._col1):
+            if col1 is not None and "*" in col1:
+                flags = parse_problems(col1)
+                mask[i, :len(flags)] = flags
+        return mask
+
+    @property
+    def band_mask(self):
+        """Boolean array, parameters fitted per band (col3 "band")."""
+        return np.array([col3.strip() == "band" for col3 in self._col3], dtype=bool)
+
+    @property
+    def cheb_mask(self):
+        """Boolean array, parameters fitted with Chebyshev polynomials (col3 "cheb")."""
+        return np.array([col3.strip() == "cheb" for col3 in self._col3], dtype=bool)
+
+    def rows(self):
+        """Yields (param, col1, col2, col3, comment) for every parameter, the feedme lines of the component."""
+        for i, name in enumerate(self.names):
+            yield name, self._get(name, "col1"), self._col2[i], self._col3[i], self.comments[i]
+
+
+## Parsed templates (read only arrays), new components share them until their first change
+_prototypes = {}
+
+
+def new_component(name):
+    """Returns the parameters of a component with the values of its template.
+
+    The arrays are the ones of the template until the component is first changed (copy on write),
+    reading a component never copies it.
+
+    Args:
+        name (str): component name, in COMPONENT_TEMPLATES.
+
+    Returns:
+        ComponentParams: component parameters.
+    """
+    if name not in _prototypes:
+        prototype = ComponentParams(
+            {param: template.as_dict() for param, template in COMPONENT_TEMPLATES[name].items()}
+        )
+        for array in (prototype.values, prototype.lengths, prototype.dof):
+            array.flags.writeable = False
+        _prototypes[name] = prototype
+    return _prototypes[name]._share()
+
+
+class ComponentsConfig(MutableMapping):
+    """Components of one PyGalfitm, a dict {component: {param: {"col1", "col2", "col3", "comment"}}}.
+
+    Every template component is present, but it only shares the parsed template until it is first
+    changed (copy on write, see new_component), so neither a new PyGalfitm nor reading every component
+    copies the 12 templates. Components added or replaced (sersic1, read results, ...) are stored as
+    ComponentParams.
+    """
+
+    __slots__ = ("_configs", "_deleted")
+
+    def __init__(self, configs=None):
+        self._configs = {}
+        self._deleted = set()
+        if configs is not None:
+            self.update(configs)
+
+    def __getitem__(self, name):
+        config = self._configs.get(name)
+        if config is None:
+            if name not in COMPONENT_TEMPLATES or name in self._deleted:
+                raise KeyError(name)
+            config = self._configs[name] = new_component(name)
+        return config
+
+    def __setitem__(self, name, config):
+        if not isinstance(config, ComponentParams):
+            config = ComponentParams(config)
+        self._deleted.discard(name)
+        self._configs[name] = config
+
+    def __delitem__(self, name):
+        if name not in self:
+            raise KeyError(name)
+        self._configs.pop(name, None)
+        if name in COMPONENT_TEMPLATES:
+            self._deleted.add(name)
+
+    def __contains__(self, name):
+        return name in self._configs or (name in COMPONENT_TEMPLATES and name not in self._deleted)
+
+    def __iter__(self):
+        for name in COMPONENT_TEMPLATES:
+            if name not in self._deleted:
+                yield name
+        for name in self._configs:
+            if name not in COMPONENT_TEMPLATES:
+                yield name
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"ComponentsConfig({dict(self)!r})"
+
+    def __getstate__(self):
+        return self._configs, self._deleted
+
+    def __setstate__(self, state):
+        self._configs, self._deleted = state
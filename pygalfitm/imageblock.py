@@ -0,0 +1,199 @@
+import os
+import sys
+
+import numpy as np
+
+from pygalfitm.auxiliars import band_list
+
+## Kinds of images of a galfitm output block, in the order of its HDUs
+KINDS = ["input", "model", "residual"]
+
+_KIND_ALIASES = {"in": "input", "res": "residual"}
+
+
+def _kind(kind):
+    kind = _KIND_ALIASES.get(kind, kind)
+    if kind not in KINDS:
+        raise KeyError(f"Kind not valid - {kind}, use one of {KINDS} (or the aliases {list(_KIND_ALIASES)})")
+    return kind
+
+
+class ImageBlock:
+    """
+    Lazy reader of a galfitm output image block (base B).
+
+    The block has the input images of every band (in the order of base A1), then the model images,
+    then the residual images. The file is opened memory-mapped on first access and images are only
+    read when used, indexed by (kind, band).
+
+    Examples
+    --------
+    >>> with ImageBlock(result) as block:
+    ...     residual = block["residual", "r"]
+    ...     cube = block.stack()  # (3, n_bands, ny, nx)
+    """
+
+    def __init__(self, pyg=None, path=None, bands=None):
+        """
+        Args:
+            pyg (pygalfitm.PyGalfitm, optional): PyGalfitm result, block and bands are taken from base B and A1. Defaults to None.
+            path (str, optional): block path, if pyg is not given. Defaults to None.
+            bands (list, optional): band labels of the block, if pyg is not given. Defaults to None.
+        """
+        if pyg is not None:
+            path = pyg.base["B"]["value"].strip()
+            bands = band_list(pyg.base)
+        if path is None or bands is None:
+            raise ValueError("Please give a PyGalfitm object or the path and bands of the block")
+
+        self.path = path
+        self.bands = [band.strip() for band in bands]
+        self._hdul = None
+        self._raw = None
+        self._data = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+    def __len__(self):
+        return len(KINDS) * len(self.bands)
+
+    @property
+    def hdul(self):
+        """The opened (memory-mapped) HDU list."""
+        if self._hdul is None:
+            from astropy.io import fits
+            self._hdul = fits.open(self.path, memmap=True)
+        return self._hdul
+
+    def close(self):
+        """Closes the file and its memory maps, arrays returned before must not be used after it.
+
+        A memory map still used by arrays returned before stays open until they are released.
+        """
+        self._data = {}
+        if getattr(self, "_hdul", None) is not None:
+            self._hdul.close()
+            self._hdul = None
+        if getattr(self, "_raw", None) is not None:
+            mm = self._raw._mmap
+            self._raw = None
+            ## Closed only when no array still maps it, unmapping a used buffer crashes the process
+            if sys.getrefcount(mm) == 2:
+                mm.close()
+
+    def index(self, kind, band):
+        """Returns the HDU index of an image.
+
+        Args:
+            kind (str): "input", "model" or "residual" ("in" and "res" also accepted).
+            band (str): band label of base A1.
+
+        Raises:
+            KeyError: kind not in KINDS or band not in the block.
+
+        Returns:
+            int: HDU index.
+        """
+        kind = _kind(kind)
+        if band not in self.bands:
+            raise KeyError(f"Band not in block - {band}")
+        return 1 + KINDS.index(kind) * len(self.bands) + self.bands.index(band)
+
+    def __getitem__(self, key):
+        kind, band = key
+        index = self.index(kind, band)
+        if index not in self._data:
+            self._data[index] = self.hdul[index].data
+        return self._data[index]
+
+    def get(self, kind, band):
+        """Returns one image (memory-mapped when possible), same as block[kind, band]."""
+        return self[kind, band]
+
+    def _strided(self, kinds, bands):
+        ## Images of the same shape, not scaled and evenly spaced in the file are one strided view of it
+        hdus = [self.hdul[self.index(kind, band)] for kind in kinds for band in bands]
+        headers = [hdu.header for hdu in hdus]
+        first = headers[0]
+        if first["BITPIX"] not in [-32, -64, 8, 16, 32, 64] or first.get("NAXIS") != 2:
+            return None
+        for header in headers:
+            if any(header.get(key) != first.get(key) for key in ["BITPIX", "NAXIS", "NAXIS1", "NAXIS2"]):
+                return None
+            if header.get("BSCALE", 1) != 1 or header.get("BZERO", 0) != 0:
+                return None
+
+        locations = [hdu.fileinfo()["datLoc"] for hdu in hdus]
+        steps = set(np.diff(locations).tolist())
+        if len(steps) > 1:
+            return None
+
+        dtype = np.dtype({8: "u1", 16: ">i2", 32: ">i4", 64: ">i8", -32: ">f4", -64: ">f8"}[first["BITPIX"]])
+        ny, nx = first["NAXIS2"], first["NAXIS1"]
+        step = steps.pop() if steps else ny * nx * dtype.itemsize
+
+        ## One map of the file is shared by every view, closed by close
+        if self._raw is None:
+            self._raw = np.memmap(self.path, dtype=np.uint8, mode="r")
+        return np.ndarray(
+            (len(kinds), len(bands), ny, nx), dtype=dtype, buffer=self._raw, offset=locations[0],
+            strides=(step * len(bands), step, nx * dtype.itemsize, dtype.itemsize),
+        )
+
+    def stack(self, kinds=None, bands=None):
+        """Returns the images as one (n_kinds, n_bands, ny, nx) array.
+
+        When the images are evenly spaced in the file (the usual galfitm block) the array is a read-only
+        memory-mapped view of the file and nothing is copied, otherwise the images are stacked in memory.
+
+        Args:
+            kinds (list, optional): kinds. Defaults to None (input, model and residual).
+            bands (list, optional): bands. Defaults to None (all bands of the block).
+
+        Raises:
+            KeyError: a kind not in KINDS or a band not in the block.
+
+        Returns:
+            np.ndarray: images.
+        """
+        kinds = [_kind(kind) for kind in (kinds or KINDS)]
+        bands = list(bands or self.bands)
+
+        ## Only whole blocks of consecutive HDUs can be one view
+        if kinds == KINDS[KINDS.index(kinds[0]):KINDS.index(kinds[0]) + len(kinds)] and bands == self.bands:
+            view = self._strided(kinds, bands)
+            if view is not None:
+                return view
+
+        return np.stack([np.stack([self[kind, band] for band in bands]) for kind in kinds])
+
+    def export(self, folder, filename="{kind}_{band}.fits", kinds=None, bands=None, overwrite=True):
+        """Writes images to single image FITS files.
+
+        Args:
+            folder (str): output folder.
+            filename (str, optional): file name pattern, with {kind} and {band}. Defaults to "{kind}_{band}.fits".
+            kinds (list, optional): kinds. Defaults to None (all).
+            bands (list, optional): bands. Defaults to None (all).
+            overwrite (bool, optional): overwrite existing files. Defaults to True.
+
+        Returns:
+            dict: {(kind, band): path}.
+        """
+        from astropy.io import fits
+
+        os.makedirs(folder, exist_ok=True)
+        paths = {}
+        for kind in [_kind(kind) for kind in (kinds or KINDS)]:
+            for band in (bands or self.bands):
+                path = os.path.join(folder, filename.format(kind=kind, band=band))
+                fits.PrimaryHDU(data=self[kind, band]).writeto(path, overwrite=overwrite)
+                paths[kind, band] = path
+        return paths
@@ -0,0 +1,154 @@
+import os
+import time
+import sqlite3
+
+from contextlib import closing
+
+## Status of an object run
+DONE = "done"
+FAILED = "failed"
+
+
+class RunJournal:
+    """
+    Append-only journal of a catalog run, used to resume it after a crash.
+
+    Every finished attempt of an object is one row (name, status, attempt, start time, elapsed time,
+    working directory, output paths and error) of a SQLite database in WAL mode. Each record is a
+    single INSERT committed on its own, so a crash loses at most the attempt that was running, and
+    many processes can record into the same journal at the same time.
+
+    Examples
+    --------
+    >>> journal = RunJournal("outputs/journal.sqlite")
+    >>> results = fit_catalog(df, build, "outputs/", journal=journal, retries=2)
+    >>> journal.summary()
+    {'done': 9950, 'failed': 50}
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): journal file, created if it does not exist.
+        """
+        self.path = os.path.abspath(path)
+        self._db = None
+        self._pid = None
+
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        self._connection().executescript("""
+            CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempt INTEGER,
+                started REAL,
+                elapsed REAL,
+                workdir TEXT,
+                feedme TEXT,
+                band_file TEXT,
+                error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS runs_name ON runs (name, id);
+        """)
+
+    def __getstate__(self):
+        ## Connections are not shared between processes, each process opens its own
+        state = self.__dict__.copy()
+        state["_db"] = None
+        state["_pid"] = None
+        return state
+
+    def _connection(self):
+        if self._db is None or self._pid != os.getpid():
+            self._db = sqlite3.connect(self.path, timeout=60, isolation_level=None, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._pid = os.getpid()
+        return self._db
+
+    def close(self):
+        """Closes the connection of this process."""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def record(self, name, status, attempt=None, started=None, elapsed=None, workdir=None, feedme=None,
+               band_file=None, error=None):
+        """Appends the outcome of one attempt of an object.
+
+        Args:
+            name (str): object name.
+            status (str): "done" or "failed".
+            attempt (int, optional): attempt number, starting at 1. Defaults to None.
+            started (float, optional): start time (time.time()). Defaults to None (now minus elapsed).
+            elapsed (float, optional): duration in seconds. Defaults to None.
+            workdir (str, optional): working directory. Defaults to None.
+            feedme (str, optional): feedme path. Defaults to None.
+            band_file (str, optional): .band result path. Defaults to None.
+            error (str, optional): error message. Defaults to None.
+        """
+        if started is None:
+            started = time.time() - (elapsed or 0)
+
+        self._connection().execute(
+            "INSERT INTO runs (name, status, attempt, started, elapsed, workdir, feedme, band_file, error) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (str(name), status, attempt, started, elapsed, workdir, feedme, band_file, error),
+        )
+
+    def record_result(self, result, attempt=None):
+        """Appends a result dict of pygalfitm.batch.fit_object.
+
+        Args:
+            result (dict): fit_object result.
+            attempt (int, optional): attempt number. Defaults to None.
+        """
+        self.record(
+            result["name"], result["status"], attempt=attempt, elapsed=result["elapsed"],
+            workdir=result["workdir"], feedme=result["feedme"], band_file=result["band_file"], error=result["error"],
+        )
+
+    def states(self):
+        """Returns the latest status of every object in the journal and its number of failed attempts.
+
+        Returns:
+            dict: {name: (latest status, number of failures)}.
+        """
+        rows = self._connection().execute("""
+            SELECT name, status, failures FROM (
+                SELECT name, status, id,
+                    SUM(status = 'failed') OVER (PARTITION BY name) AS failures,
+                    MAX(id) OVER (PARTITION BY name) AS last
+                FROM runs
+            ) WHERE id = last
+        """).fetchall()
+        return {name: (status, failures) for name, status, failures in rows}
+
+    def completed(self):
+        """Returns the set of objects whose latest attempt finished."""
+        return {name for name, (status, _) in self.states().items() if status == DONE}
+
+    def history(self, name):
+        """Returns every attempt of an object, oldest first.
+
+        Returns:
+            list: one dict per attempt with the journal columns.
+        """
+        with closing(self._connection().execute("SELECT * FROM runs WHERE name = ? ORDER BY id", (str(name),))) as cursor:
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def summary(self):
+        """Returns the number of objects per latest status.
+
+        Returns:
+            dict: {status: count}.
+        """
+        counts = {}
+        for status, _ in self.states().values():
+            counts[status] = counts.get(status, 0) + 1
+        return counts
@@ -19,22 +19,45 @@ for i in range(100):
 
 control.wait(group="sum_func")
 control.info("Finished")
+
+control.set_backend("psf", "processes") ## CPU bound tasks, the function must be defined at module level
+for image in images:
+    control.submit(make_psf, image, group="psf")
+control.wait(group="psf")
+
+for future in control.as_completed(group="sum_func"):
+    future.result()
+
 control.time(content)
 
 """
 
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from multiprocessing import util
+from functools import partial
+from collections import deque
 import threading
-import inspect
+import weakref
+import atexit
+import queue
+import sys
 
 import os
-from datetime import datetime
 
 import time
 
-import psutil
 from threading import Lock
 
+## Severity of each message type, messages below ControlThreads.level are dropped before any formatting
+LEVELS = {"[debug]": 10, "[info]": 20, "[time]": 20, "[warning]": 30, "[critical]": 50}
+LEVEL_NAMES = {"debug": 10, "info": 20, "warning": 30, "critical": 50}
+
+## Maximum number of messages formatted and written at once by the writer thread
+BATCH_SIZE = 1000
+
+## Finished futures kept per group while nobody iterates as_completed, the oldest are released first
+MAX_FINISHED = 1000
+
 class ControlThreads(ThreadPoolExecutor):
     """
     A thread pool executor that extends concurrent.futures.ThreadPoolExecutor, providing
@@ -46,16 +69,27 @@ class ControlThreads(ThreadPoolExecutor):
     -------
     submit(fn, *args, group="default", **kwargs):
         Submit a function to be executed by the thread pool, optionally assigning it to a group.
+    set_backend(group, backend):
+        Runs the tasks of a group in threads (default) or in a process pool.
+    wait(group="default", timeout=None):
+        Blocks until every task of a group finished.
+    as_completed(group="default", timeout=None):
+        Yields the futures of a group as they finish.
     get_logs():
         Returns the content of the log file as a list of strings.
     get_queue(group='default'):
         Returns a list indicating the completion status of tasks in a specified group.
+    progress(group='default'):
+        Returns the number of finished and submitted tasks of a group.
     info(content, **kwargs), time(content), warn(content), critical(content), debug(content):
         Methods to log messages of different severities.
     clear_logs():
         Clears the log file.
-    finishLog(filename):
-        Copies the current log file to a new location and clears the log.
+    flush(timeout=None):
+        Waits until every message logged so far is printed and written.
+
+    Messages are put in a queue and formatted, printed and written to the log file (one open handle,
+    one write per batch) by a background thread, so logging threads never wait for the console or the disk.
 
     Examples
     --------
@@ -73,7 +107,8 @@ class ControlThreads(ThreadPoolExecutor):
     """
     
     
-    def __init__(self, log_file=None, print_log=True, debug=False, max_workers=psutil.cpu_count(logical=True) - 2):
+    def __init__(self, log_file=None, print_log=True, debug=False, max_workers=None,
+                 level=None, capture_caller=True, max_processes=None):
         """
         Initialize the Log object.
 
@@ -81,21 +116,48 @@ class ControlThreads(ThreadPoolExecutor):
             log_file (str): Path to the log file. If None, logging to a file is disabled.
             print_log (bool): Whether to print log messages to the console.
             debug (bool): Whether to enable debug mode.
-            max_workers (int): Maximum number of worker threads to use.
+            max_workers (int): Maximum number of worker threads to use. If None, the number of CPUs minus 2 (at least 1).
+            level (str): Minimum level logged, "debug", "info", "warning" or "critical". If None, "debug" in debug mode and "info" otherwise.
+            capture_caller (bool): Whether to show the file and function that logged each message.
+            max_processes (int): Maximum number of worker processes of groups with the "processes" backend. If None, max_workers.
 
         """
+        ## Threads are only started by the first submit
+        if max_workers is None:
+            max_workers = max(1, (os.cpu_count() or 1) - 2)
         ThreadPoolExecutor.__init__(self, max_workers)
         self.lock = Lock()
         
-        self.tasks = {'default': []}
+        ## Pending futures of each group, finished ones are moved to _finished for as_completed. Without
+        ## an as_completed running only the last MAX_FINISHED are kept, so fire and forget submits do not leak
+        self.tasks = {'default': set()}
+        self._finished = {}
+        self._iterating = {}
+        self._counts = {'default': [0, 0]}
+        self._done = threading.Condition(Lock())
         self.log_file = log_file
         
         if self.log_file is not None:
             self._init_log()
         
         self.workers = max_workers
+        self.max_processes = max_processes or max_workers
+        self.backends = {}
+        self._process_pool = None
+        self._pool_lock = Lock()
         self.print_log = print_log
         self.debug_mode = debug
+        self.level = LEVEL_NAMES[level] if level is not None else (10 if debug else 20)
+        self.capture_caller = capture_caller
+
+        ## The writer thread is started on the first message of each process (forked workers start their own)
+        self._records = None
+        self._writer_pid = None
+        self._writer_lock = Lock()
+        self._fd = None
+        self._fd_key = None
+        self._stamp = (None, "")
+        _instances.add(self)
 
     def reconfigure(self, *args, **kwargs):
         """
@@ -125,12 +187,60 @@ class ControlThreads(ThreadPoolExecutor):
             group: The group to which the task belongs (default is "default").
             **kwargs: Keyword arguments to be passed to the function.
 
+        Returns:
+            concurrent.futures.Future: future of the task.
         """
-        future = super().submit(fn, *args, **kwargs)
+        if self.backends.get(group) == "processes":
+            future = self._processes().submit(_traced_call, fn, args, kwargs)
+        else:
+            future = super().submit(fn, *args, **kwargs)
         future.add_done_callback(worker_callbacks)
-        if group not in self.tasks:
-            self.tasks[group] = []
-        self.tasks[group].append(future)
+
+        with self._done:
+            self.tasks.setdefault(group, set()).add(future)
+            self._counts.setdefault(group, [0, 0])[1] += 1
+        future.add_done_callback(partial(self._task_done, group))
+        return future
+
+    def set_backend(self, group, backend):
+        """
+        Selects where the tasks of a group run. Tasks already submitted are not moved.
+
+        With "processes" the tasks run in a process pool shared by every such group, for CPU bound work
+        limited by the GIL. Functions and arguments must be picklable (functions defined at module level),
+        and exceptions raised in the workers are logged with the traceback of the worker.
+
+        Args:
+            group (str): The group name.
+            backend (str): "threads" or "processes".
+
+        Raises:
+            ValueError: Backend not valid.
+        """
+        if backend not in ["threads", "processes"]:
+            raise ValueError(f"Backend not valid - {backend}")
+        self.backends[group] = backend
+
+    def _processes(self):
+        with self._pool_lock:
+            if self._process_pool is None:
+                self._process_pool = ProcessPoolExecutor(self.max_processes)
+        return self._process_pool
+
+    def shutdown(self, wait=True, **kwargs):
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=wait, **kwargs)
+        super().shutdown(wait=wait, **kwargs)
+
+    def _task_done(self, group, future):
+        with self._done:
+            self.tasks[group].discard(future)
+            finished = self._finished.setdefault(group, deque())
+            finished.append(future)
+            if not self._iterating.get(group) and len(finished) > MAX_FINISHED:
+                finished.popleft()
+            self._counts[group][0] += 1
+            self._done.notify_all()
 
     def get_logs(self):
         """
@@ -144,23 +254,42 @@ class ControlThreads(ThreadPoolExecutor):
         """
         if self.log_file is None:
             raise Exception("No log file was defined")
-        f = open(self.log_file, 'r')
-        return f.readlines()
+        self.flush()
+        with open(self.log_file, 'r') as f:
+            return f.readlines()
 
     def get_queue(self, group = 'default'):
-        return [i.done() for i in self.tasks[group]]
+        done, submitted = self.progress(group)
+        return [True] * done + [False] * (submitted - done)
+
+    def progress(self, group = 'default'):
+        """
+        Returns the number of finished and submitted tasks of a group.
+
+        Args:
+            group (str, optional): The group name. Defaults to "default".
+
+        Returns:
+            tuple: (finished, submitted)
+        """
+        with self._done:
+            done, submitted = self._counts.get(group, (0, 0))
+        return done, submitted
     
     def info(self, content, **kwargs):
         """ Logs an informational message. """
-        self.wlog(content, "[info]")
+        if self.level <= 20:
+            self.wlog(content, "[info]")
         
     def time(self, content):
         """ Logs an time message. """
-        self.wlog(content, "[time]")
+        if self.level <= 20:
+            self.wlog(content, "[time]")
         
     def warn(self, content):
         """ Logs an warn message. """
-        self.wlog(content, "[warning]")
+        if self.level <= 30:
+            self.wlog(content, "[warning]")
         
     def critical(self, content):
         """ Logs an critical message. """
@@ -168,31 +297,131 @@ class ControlThreads(ThreadPoolExecutor):
         
     def debug(self, content):
         """ Logs an debug message. """
-        if self.debug_mode:
+        if self.debug_mode and self.level <= 10:
             self.wlog(content, "[debug]")
     
     def wlog(self, content, tipo="[info]", print_log = True):
-        func = inspect.currentframe().f_back.f_back.f_code
-        function = func.co_name
-        filename = func.co_filename
+        """
+        Queues a message, it is formatted and written by the writer thread.
 
-        thread_id = threading.current_thread().native_id
+        Args:
+            content: The message, converted with str.
+            tipo (str): Message type, "[info]", "[time]", "[warning]", "[critical]" or "[debug]".
+            print_log (bool): Whether to print the message to the console.
+        """
+        if LEVELS.get(tipo, 20) < self.level:
+            return
 
-        if tipo == "[critical]":
-            log_message = f"{datetime.now().strftime('%d/%m/%Y %H:%M:%S')}  {tipo} - Thread {thread_id} - {str(content)}"
-        elif tipo == "[time]":
-            log_message = f"{datetime.now().strftime('%d/%m/%Y %H:%M:%S')}  {tipo} - {str(content)}"
-        else:
-            log_message = f"{datetime.now().strftime('%d/%m/%Y %H:%M:%S')}  {tipo} - {os.path.basename(filename)} - {function}() - {str(content)}"
+        print_log = print_log and self.print_log
+        if not print_log and self.log_file is None:
+            return
 
-        if print_log: 
-            print(log_message, end="\n")
-        
-        if self.log_file is not None:
-            with self.lock:
-                io = open(self.log_file, 'a')
-                io.write(log_message + "\n")
-                io.close()
+        ## Only the code object of the caller is kept, its name is formatted by the writer thread
+        code = None
+        if self.capture_caller and tipo not in ("[critical]", "[time]"):
+            try:
+                code = sys._getframe(2).f_code
+            except ValueError:
+                pass
+
+        if not isinstance(content, str):
+            content = str(content)
+
+        self._queue().put((time.time(), tipo, threading.get_native_id(), code, content, print_log))
+
+    def flush(self, timeout = None):
+        """
+        Waits until every message logged so far by this process is printed and written to the log file.
+
+        Args:
+            timeout (float, optional): Maximum time to wait in seconds. Defaults to None (no limit).
+        """
+        if self._records is None or self._writer_pid != os.getpid() or not self._writer.is_alive():
+            return
+        done = threading.Event()
+        self._records.put(done)
+        done.wait(timeout)
+
+    def _after_fork(self):
+        self._process_pool = None
+        self._pool_lock = Lock()
+        self._records = None
+        self._writer_pid = None
+        self._writer_lock = Lock()
+        self._fd = None
+        self._fd_key = None
+
+    def _queue(self):
+        if self._writer_pid != os.getpid():
+            with self._writer_lock:
+                if self._writer_pid != os.getpid():
+                    self._records = queue.SimpleQueue()
+                    self._writer = threading.Thread(target=self._write_loop, args=(self._records,), name="pygalfitm-log", daemon=True)
+                    self._writer.start()
+                    self._writer_pid = os.getpid()
+                    atexit.register(self.flush)
+                    util.Finalize(None, self.flush, exitpriority=100)
+        return self._records
+
+    def _format(self, record):
+        created, tipo, thread_id, code, content, _ = record
+
+        second = int(created)
+        if self._stamp[0] != second:
+            self._stamp = (second, time.strftime('%d/%m/%Y %H:%M:%S', time.localtime(second)))
+        stamp = self._stamp[1]
+
+        if tipo == "[critical]":
+            return f"{stamp}  {tipo} - Thread {thread_id} - {content}"
+        if code is None:
+            return f"{stamp}  {tipo} - {content}"
+        return f"{stamp}  {tipo} - {os.path.basename(code.co_filename)} - {code.co_name}() - {content}"
+
+    def _write_file(self, text):
+        key = (self.log_file, os.getpid())
+        if self._fd_key != key:
+            if self._fd is not None and self._fd_key[1] == os.getpid():
+                os.close(self._fd)
+            self._fd = os.open(self.log_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            self._fd_key = key
+
+        data = text.encode("UTF-8")
+        while data:
+            data = data[os.write(self._fd, data):]
+
+    def _write_loop(self, records):
+        while True:
+            batch = [records.get()]
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(records.get_nowait())
+                except queue.Empty:
+                    break
+
+            printed = []
+            written = []
+            events = []
+            for record in batch:
+                if isinstance(record, threading.Event):
+                    events.append(record)
+                    continue
+                message = self._format(record)
+                if record[5]:
+                    printed.append(message)
+                written.append(message)
+
+            try:
+                if printed:
+                    sys.stdout.write("\n".join(printed) + "\n")
+                    sys.stdout.flush()
+                if written and self.log_file is not None:
+                    with self.lock:
+                        self._write_file("\n".join(written) + "\n")
+            except Exception as e:
+                sys.stderr.write(f"pygalfitm log writer error: {e}\n")
+
+            for event in events:
+                event.set()
 
     def timer(self, func):
         """
@@ -211,40 +440,74 @@ class ControlThreads(ThreadPoolExecutor):
             return result
         return wrapper
 
-    def wait(self, group = "default"):
+    def wait(self, group = "default", timeout = None):
         """
-        Waits for all tasks in the specified group to complete.
+        Waits for all tasks in the specified group to complete, including tasks submitted while waiting.
+        The finished futures are left for as_completed, which may be iterating the same group concurrently.
 
         Args:
             group (str, optional): The group name. Defaults to "default".
+            timeout (float, optional): Maximum time to wait in seconds. Defaults to None (no limit).
+
+        Returns:
+            bool: True if every task finished, False if the timeout expired first.
         """
-        if group not in self.tasks:
-            return
-        queue = [i.done() for i in self.tasks[group]]
-        
-        while False in queue:
-            time.sleep(0.05)
-            queue = [i.done() for i in self.tasks[group]]
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._done:
+            while self.tasks.get(group):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._done.wait(remaining)
+        return True
+
+    def as_completed(self, group = "default", timeout = None):
+        """
+        Yields the futures of a group as they finish, first the ones that already finished (at most the
+        last MAX_FINISHED of them). Each future is yielded once and then released.
+
+        Args:
+            group (str, optional): The group name. Defaults to "default".
+            timeout (float, optional): Maximum time to wait in seconds. Defaults to None (no limit).
+
+        Raises:
+            TimeoutError: Tasks still running when the timeout expired.
+
+        Yields:
+            concurrent.futures.Future: finished future.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._done:
+            self._iterating[group] = self._iterating.get(group, 0) + 1
+        try:
+            while True:
+                with self._done:
+                    while not self._finished.get(group) and self.tasks.get(group):
+                        remaining = None if deadline is None else deadline - time.monotonic()
+                        if remaining is not None and remaining <= 0:
+                            raise TimeoutError(f"{len(self.tasks[group])} tasks of group {group} not finished")
+                        self._done.wait(remaining)
+                    finished = self._finished.pop(group, [])
+
+                if not finished:
+                    return
+                yield from finished
+        finally:
+            with self._done:
+                self._iterating[group] -= 1
 
     def clear_logs(self):
         """
         Clears the contents of the log file.
         """
-        io = open(self.log_file, 'w')
-        io.close()
+        self.flush()
+        with self.lock:
+            io = open(self.log_file, 'w')
+            io.close()
 
     
-def worker_callbacks(f):
-    """
-    Called to create trace of exceptions in threads.
-    """
-    e = f.exception()
-
-    if e is None:
-        return
-
+def _trace(tb):
     trace = []
-    tb = e.__traceback__
     while tb is not None:
         trace.append({
             "filename": tb.tb_frame.f_code.co_filename,
@@ -252,12 +515,53 @@ def worker_callbacks(f):
             "lineno": tb.tb_lineno
         })
         tb = tb.tb_next
+    return trace
+
+
+def _traced_call(fn, args, kwargs):
+    """
+    Runs a task in a worker process, exceptions carry the trace of the worker (kept when pickled back).
+    """
+    try:
+        return fn(*args, **kwargs)
+    except BaseException as e:
+        e.remote_trace = _trace(e.__traceback__)[1:]
+        e.remote_pid = os.getpid()
+        raise
+
+
+def worker_callbacks(f):
+    """
+    Called to create trace of exceptions in threads and worker processes.
+    """
+    if f.cancelled():
+        return
+    e = f.exception()
+
+    if e is None:
+        return
+
+    trace = getattr(e, "remote_trace", None)
+    if trace is None:
+        trace = _trace(e.__traceback__)
         
     trace_str = ""
     for key, i in enumerate(trace):
         trace_str += f"[Trace {key}: {i['filename']} - {i['name']}() - line {i['lineno']}]"
+
+    if hasattr(e, "remote_pid"):
+        trace_str = f"Process {e.remote_pid} " + trace_str
         
     control.critical(f"""{type(e).__name__}: {str(e)} -> {trace_str}""")
 
 
+## Live ControlThreads, reset in the child of a fork by one handler registered at import, weak so instances can be collected
+_instances = weakref.WeakSet()
+
+def _after_fork_all():
+    for instance in list(_instances):
+        instance._after_fork()
+
+os.register_at_fork(after_in_child=_after_fork_all)
+
 control = ControlThreads(log_file=None, print_log = True, debug = True)
\ No newline at end of file
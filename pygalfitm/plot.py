@@ -1,4 +1,4 @@
-from astropy.io import fits
+import numpy as np
 import matplotlib.pyplot as plt
 from mpl_toolkits.axes_grid1 import make_axes_locatable
 
@@ -6,6 +6,10 @@ from typing import List, Tuple
 
 from astropy.visualization import make_lupton_rgb
 
+from pygalfitm.imageblock import ImageBlock, KINDS
+## Defined with the render jobs, which build labels without importing matplotlib
+from pygalfitm.render import parameter_labels
+
 def get_bands(bands):
     r, g, b = bands.split(",")
     r = r.strip().lower().replace("f", "j0")
@@ -39,25 +43,13 @@ def gen_plot(pygalfit: object, component_selected: str = "sersic", plot_paramete
     for key, band in enumerate(filters): 
         filters[key] = band.strip()
     
-    fits_cube = fits.open(pygalfit.base["B"]["value"].strip())
-
-    plot_data = {}
-    for band in filters:
-        plot_data[band] = []
-
-    
-    for key, param in enumerate(plot_parameters):
+    with ImageBlock(pygalfit) as block:
+        ## Every image is stretched at once, all kinds and bands in the order of the panels
+        images = block.stack()
+        gray = lupton_gray(images.reshape(-1, *images.shape[2:]), stretch=lupton_stretch, Q=lupton_q)
 
-        values = pygalfit.components_config[component_selected][str(param)]["col1"].split(",")
-        comment = pygalfit.components_config[component_selected][str(param)]["comment"]
+    labels = parameter_labels(pygalfit, component_selected, plot_parameters)
 
-        if comment.strip() == "":
-            raise Exception("Please insert labels manually")
-
-        for key_band, band in enumerate(filters):
-
-            plot_data[band].append( (values[key_band], comment) )
-    
     n_filters = len(filters)
     filters_index = 0
     band_index = 0
@@ -69,7 +61,7 @@ def gen_plot(pygalfit: object, component_selected: str = "sersic", plot_paramete
 
     for i in range(1, n_filters * 3 + 1):
         ax = fig.add_subplot(3, n_filters, i)
-        im_data = make_lupton_rgb(fits_cube[i].data, fits_cube[i].data, fits_cube[i].data, stretch=lupton_stretch, Q=lupton_q)
+        im_data = np.repeat(gray[i - 1][..., None], 3, axis=-1)
         im = ax.imshow(im_data, cmap='gray', interpolation='none')
         
         ax.set_xticks([])
@@ -80,9 +72,7 @@ def gen_plot(pygalfit: object, component_selected: str = "sersic", plot_paramete
             y_label_index += 1
 
         if i <= n_filters:
-            string = ""
-            for info in plot_data[filters[filters_index]]:
-                string = string + f'{info[0]} {info[1].lstrip().split("[")[0]}\n'
+            string = "".join(f"{label}\n" for label in labels[filters_index])
             ax.set_title(f"""
 
 {filters[filters_index]}
@@ -105,6 +95,7 @@ def gen_plot(pygalfit: object, component_selected: str = "sersic", plot_paramete
 
     if fig_filename and not return_plot:
         fig.savefig(fig_filename)
+        plt.close(fig)
         return 
     
     elif fig_filename and return_plot:
@@ -127,34 +118,25 @@ def gen_color_plot(pygalfit, band_combinations=["i,r,g", "u,f378,f395"], lupton_
         fig_filename (_type_, optional): a string specifying the filename to save the plot to (default is None).
 
     """    
-    filters = pygalfit.base['A1']['value'].split(",") 
-    for key, band in enumerate(filters): 
-        filters[key] = band.strip()
-
-    fits_cube = fits.open(pygalfit.base["B"]["value"].strip())
-
-    # Get data for each filter
-    input_data = {f: fits_cube[i + 1].data for i, f in enumerate(filters)}
-    model_data = {f: fits_cube[i + len(filters) + 1].data for i, f in enumerate(filters)}
-    residual_data = {f: fits_cube[i + 2*len(filters) + 1].data for i, f in enumerate(filters)}
-
     n_rows = len(band_combinations)
     n_columns = 3
 
-    fig, axs = plt.subplots(nrows=n_rows, ncols=n_columns, figsize=(n_columns*5, n_rows*5))
+    fig, axs = plt.subplots(nrows=n_rows, ncols=n_columns, figsize=(n_columns*5, n_rows*5), squeeze=False)
 
-    for i, bands in enumerate(band_combinations):
-        r, g, b = get_bands(bands)
+    # Images are read from the block only for the bands used
+    with ImageBlock(pygalfit) as block:
+        for i, bands in enumerate(band_combinations):
+            r, g, b = get_bands(bands)
 
-        # Create RGB images
-        rgb_images = [make_lupton_rgb(data[r], data[g], data[b], stretch=lupton_stretch, Q=lupton_Q) 
-                      for data in (input_data, model_data, residual_data)]
+            # Create RGB images
+            rgb_images = [make_lupton_rgb(block[kind, r], block[kind, g], block[kind, b], stretch=lupton_stretch, Q=lupton_Q)
+                          for kind in KINDS]
 
-        # Display images
-        for j in range(n_columns):
-            axs[i, j].imshow(rgb_images[j])
-            axs[i, j].set_xticks([])
-            axs[i, j].set_yticks([])
+            # Display images
+            for j in range(n_columns):
+                axs[i, j].imshow(rgb_images[j])
+                axs[i, j].set_xticks([])
+                axs[i, j].set_yticks([])
 
     # Label rows and columns
     for j in range(n_columns):
@@ -169,6 +151,7 @@ def gen_color_plot(pygalfit, band_combinations=["i,r,g", "u,f378,f395"], lupton_
 
     if fig_filename and not return_plot:
         fig.savefig(fig_filename)
+        plt.close(fig)
         return 
     
     elif fig_filename and return_plot:
@@ -177,4 +160,99 @@ def gen_color_plot(pygalfit, band_combinations=["i,r,g", "u,f378,f395"], lupton_
     if return_plot:
         return fig
     else:
-        plt.show()
\ No newline at end of file
+        plt.show()
+
+
+def lupton_gray(images, stretch=0.2, Q=8):
+    """Asinh (Lupton) stretch of grayscale images, the same as make_lupton_rgb(d, d, d, stretch, Q)[..., 0],
+    computed once for any number of stacked images.
+
+    Args:
+        images (np.ndarray): images, any shape (e.g. (n_images, ny, nx)).
+        stretch (float, optional): linear stretch. Defaults to 0.2.
+        Q (float, optional): asinh softening. Defaults to 8.
+
+    Returns:
+        np.ndarray: uint8 images with the shape of `images`.
+    """
+    ## Same constants as astropy AsinhMapping
+    if abs(Q) < 1.0 / 2**23:
+        Q = 0.1
+    Q = min(Q, 1e10)
+    slope = 0.1 * 255 / np.arcsinh(0.1 * Q)
+
+    images = np.asarray(images, dtype=np.float32)
+    with np.errstate(invalid="ignore"):
+        gray = np.arcsinh(images * np.float32(Q / float(stretch))) * np.float32(slope)
+        np.minimum(gray, 255, out=gray)
+        gray[~(images > 0)] = 0
+    return gray.astype(np.uint8)
+
+
+def gen_mosaic(pygalfit, fig_filename=None, component_selected="sersic", plot_parameters=[], lupton_stretch=0.2,
+               lupton_q=8, scale=1, gap=4, return_array=False):
+    """Fast quick-look of the input, model and residual images of every band as a single PNG image.
+
+    All images of the output block are stretched at once (see lupton_gray) and tiled into one array, with
+    a row per kind (input, model, residual) and a column per band, and the band names and parameter labels
+    drawn above the columns. No matplotlib figure or axes are created, so it is much faster than gen_plot
+    for cubes with many bands.
+
+    Args:
+        pygalfit (pygalfitm.PyGalfitm): PyGalfitm object, usually read from a .band result.
+        fig_filename (str, optional): PNG file to write. Defaults to None.
+        component_selected (str, optional): component of the parameter labels. Defaults to "sersic".
+        plot_parameters (list, optional): parameters labeled above each band. Defaults to [].
+        lupton_stretch (float, optional): Lupton stretch. Defaults to 0.2.
+        lupton_q (int, optional): Lupton Q. Defaults to 8.
+        scale (int, optional): integer zoom of the images. Defaults to 1.
+        gap (int, optional): pixels between the images. Defaults to 4.
+        return_array (bool, optional): return the mosaic as an (height, width) uint8 array. Defaults to False.
+
+    Returns:
+        np.ndarray: the mosaic, only if `return_array` is True.
+    """
+    from PIL import Image, ImageDraw, ImageFont
+
+    filters = [band.strip() for band in pygalfit.base['A1']['value'].split(",")]
+    labels = parameter_labels(pygalfit, component_selected, plot_parameters)
+    n_filters = len(filters)
+
+    with ImageBlock(pygalfit) as block:
+        images = block.stack()
+        gray = lupton_gray(images.reshape(-1, *images.shape[2:]), stretch=lupton_stretch, Q=lupton_q)
+
+    if scale > 1:
+        gray = gray.repeat(scale, axis=1).repeat(scale, axis=2)
+    ny, nx = gray.shape[1:]
+
+    font = ImageFont.load_default()
+    measure = ImageDraw.Draw(Image.new("L", (1, 1)))
+    line = measure.textbbox((0, 0), "Ag", font=font)[3] + 2
+    left = max(measure.textbbox((0, 0), text, font=font)[2] for text in ["RESIDUAL", "MODEL", "INPUT"]) + 2 * gap
+    top = line * (1 + len(plot_parameters)) + gap
+
+    ## Single white canvas, every tile is written through one strided view of it
+    mosaic = np.full((top + 3 * (ny + gap), left + n_filters * (nx + gap)), 255, dtype=np.uint8)
+    tiles = mosaic[top:, left:].reshape(3, ny + gap, n_filters, nx + gap)
+    tiles[:, :ny, :, :nx] = gray.reshape(3, n_filters, ny, nx).transpose(0, 2, 1, 3)
+
+    image = Image.fromarray(mosaic)
+    draw = ImageDraw.Draw(image)
+    for key, band in enumerate(filters):
+        ## Labels are cut to the width of the image, so columns never overlap
+        texts = []
+        for text in [band] + labels[key]:
+            while len(text) > 1 and draw.textlength(text, font=font) > nx + gap:
+                text = text[:-1]
+            texts.append(text)
+        draw.multiline_text((left + key * (nx + gap), gap // 2), "\n".join(texts), fill=0, font=font, spacing=2)
+    for key, text in enumerate(["INPUT", "MODEL", "RESIDUAL"]):
+        draw.text((gap, top + key * (ny + gap) + ny // 2), text, fill=0, font=font)
+
+    if fig_filename:
+        ## Fast zlib level, noisy images barely compress better at higher levels
+        image.save(fig_filename, format="PNG", compress_level=1)
+
+    if return_array:
+        return np.asarray(image)
@@ -1,6 +1,21 @@
+import os
+import hashlib
+import functools
+import threading
+
+from collections import OrderedDict
+
 import numpy as np
 from astropy.io import fits
 
+## Moffat kernels already evaluated, keyed by (fwhm, beta, radius), least recently used first
+_kernels = OrderedDict()
+_kernels_lock = threading.Lock()
+
+## Kernels kept in memory, the least recently used are dropped above this
+MAX_KERNELS = 256
+
+
 def get_psf_data(filename):
     """
     Retrieves FWHM and beta parameters from the header of an input FITS file.
@@ -15,20 +30,131 @@ def get_psf_data(filename):
         IOError: If the input file cannot be read.
 
     """
-    hdulist = fits.open(filename)
-    hdu = hdulist[0]
-    
+    header = fits.getheader(filename)
+
     ret = [None, None]
-    for i in hdu.header:
+    for i in header:
         if 'FWHMMEAN' in i:
-            ret[0] = hdu.header[i]
+            ret[0] = header[i]
         if 'FWHMBETA' in i:
-            ret[1] = hdu.header[i]
-            
-    hdulist.close()
+            ret[1] = header[i]
+
     return tuple(ret)
 
 
+@functools.lru_cache(maxsize=16)
+def radial_grid(radius):
+    """
+    Distance of each pixel to the center of a (2 * radius + 1, 2 * radius + 1) kernel, computed once per radius.
+
+    Args:
+        radius (int): Radius of the kernel in pixels.
+
+    Returns:
+        numpy.ndarray: Read-only array of distances.
+    """
+    r = np.linspace(-radius, radius, 2 * radius + 1)
+    X, Y = np.meshgrid(r, r)
+    R = np.sqrt(X**2 + Y**2)
+    R.flags.writeable = False
+    return R
+
+
+def moffat_kernels(fwhm, beta, radius=10):
+    """
+    Evaluates Moffat kernels for many (fwhm, beta) pairs in one broadcast call.
+
+    Args:
+        fwhm (float or array): FWHM of each kernel (FWHMMEAN, divided by 0.5 as in make_psf).
+        beta (float or array): Beta parameter of each kernel, broadcast with fwhm.
+        radius (int, optional): Radius of the kernels in pixels. Default is 10.
+
+    Returns:
+        numpy.ndarray: (n, 2 * radius + 1, 2 * radius + 1) kernels, n is the broadcast size of fwhm and beta.
+    """
+    fwhm, beta = np.broadcast_arrays(np.asarray(fwhm, dtype=np.float64).ravel(), np.asarray(beta, dtype=np.float64).ravel())
+    fwhm = fwhm[:, None, None] / 0.5
+    beta = beta[:, None, None]
+
+    alpha = fwhm / (2 * np.sqrt(np.power(2., 1/beta) - 1.))
+    R = radial_grid(radius)
+    return (beta - 1.) / (np.pi * alpha**2) * np.power(1. + np.power(R / alpha, 2), -beta)
+
+
+def moffat_kernel_batch(fwhm, beta, radius=10):
+    """
+    Returns the Moffat kernels of many (fwhm, beta) pairs, memoized.
+
+    Kernels already in memory are reused, the missing ones are evaluated together by moffat_kernels.
+    At most MAX_KERNELS kernels are kept, the least recently used are dropped first.
+
+    Args:
+        fwhm (list): FWHM of each kernel.
+        beta (list): Beta parameter of each kernel.
+        radius (int, optional): Radius of the kernels in pixels. Default is 10.
+
+    Returns:
+        list: Read-only kernels, in the order of the pairs.
+    """
+    keys = [(float(f), float(b), int(radius)) for f, b in zip(fwhm, beta)]
+
+    with _kernels_lock:
+        missing = list(OrderedDict.fromkeys(key for key in keys if key not in _kernels))
+        if missing:
+            kernels = moffat_kernels([key[0] for key in missing], [key[1] for key in missing], radius)
+            for key, kernel in zip(missing, kernels):
+                kernel.flags.writeable = False
+                _kernels[key] = kernel
+
+        result = []
+        for key in keys:
+            _kernels.move_to_end(key)
+            result.append(_kernels[key])
+
+        while len(_kernels) > MAX_KERNELS:
+            _kernels.popitem(last=False)
+
+    return result
+
+
+def moffat_kernel(fwhm, beta, radius=10):
+    """
+    Returns one memoized Moffat kernel, see moffat_kernel_batch.
+
+    Returns:
+        numpy.ndarray: Read-only kernel.
+    """
+    return moffat_kernel_batch([fwhm], [beta], radius)[0]
+
+
+def write_psf(kernel, folder, prefix="psf_"):
+    """
+    Writes a PSF kernel to a FITS file named by the hash of its content.
+
+    Objects (or bands) with identical PSFs get the same file, which is written only if it is not on disk. Files are
+    written to a temporary name and renamed, so concurrent writers of the same PSF never see a partial file.
+
+    Args:
+        kernel (numpy.ndarray): PSF kernel.
+        folder (str): Folder of the PSF files.
+        prefix (str, optional): File name prefix. Default is "psf_".
+
+    Returns:
+        str: Path of the PSF file.
+    """
+    kernel = np.ascontiguousarray(kernel, dtype=np.float64)
+    digest = hashlib.sha1(str(kernel.shape).encode() + kernel.tobytes()).hexdigest()[:16]
+    path = os.path.join(folder, f"{prefix}{digest}.fits")
+
+    ## Checked on disk every time, the folder may have been cleared since the file was written
+    if not os.path.exists(path):
+        os.makedirs(folder, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        fits.PrimaryHDU(kernel).writeto(tmp, overwrite=True)
+        os.replace(tmp, path)
+
+    return path
+
 
 def make_psf(filename, outfile=None, fwhm=None, beta=None, radius=10):
     """
@@ -48,25 +174,16 @@ def make_psf(filename, outfile=None, fwhm=None, beta=None, radius=10):
         IOError: If the input file cannot be read.
 
     """
-    if not fwhm or beta:
+    if fwhm is None or beta is None:
         psf_data = get_psf_data(filename)
-        fwhm = psf_data[0]
-        beta = psf_data[1]
+        fwhm = psf_data[0] if fwhm is None else fwhm
+        beta = psf_data[1] if beta is None else beta
+
+    I = moffat_kernel(fwhm, beta, radius).copy()
 
-    fwhm = fwhm/0.5
-    alpha = fwhm / (2 * np.sqrt(np.power(2., 1/beta) - 1.))
-    r = np.linspace(-radius, radius, 2 * radius + 1)
-    X, Y = np.meshgrid(r, r)
-    R = np.sqrt(X**2 + Y**2)
-    I = (beta - 1.) / (np.pi * alpha**2) * \
-        np.power(1. + np.power(R / alpha, 2), -beta)
-    
     if outfile:
         hdu = fits.PrimaryHDU(I)
         hdulist = fits.HDUList([hdu])
         hdulist.writeto(outfile, overwrite=True)
 
     return I
-
-
-
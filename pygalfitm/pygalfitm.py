@@ -2,18 +2,24 @@ import os
 import sys
 import copy
 
-import requests
-
-from astropy.io import fits
-from astropy.table import Table
+import numpy as np
 
 import pygalfitm
 
-from pygalfitm.plot import gen_plot, gen_color_plot
-from pygalfitm.auxiliars import remove_parentheses_and_brackets
+from pygalfitm.auxiliars import band_list, remove_parentheses_and_brackets
+from pygalfitm.components import ComponentsConfig, new_base
 
 from pygalfitm.log import control
 
+## Removes the counter of duplicated components (sersic1 -> sersic) when writing the feedme
+_DIGITS = str.maketrans("", "", "0123456789")
+
+def _write_atomic(path, text):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
 class PyGalfitm:
     """PyGalfitM wrapper class. 
     """    
@@ -32,144 +38,10 @@ class PyGalfitm:
 
         self.name = ""
 
-        self.base = {
-            "A": {"value": "", "comment": "Input data image (FITS file)"},
-            "A1": {"value": "g, r, i", "comment": "Nick names (band labels) "},
-            "A2": {"value": "4770, 6231, 7625", "comment": "Effective wavelenghts"}, 
-            "B": {"value": "4770, 6231, 7625", "comment": "Output data image block"}, 
-            "C": {"value": "", "comment": "Sigma image name (made from data if blank or 'none')"},
-            "D": {"value": "", "comment": "Input PSF image and (optional) diffusion kernel"}, 
-            "E": {"value": "1", "comment": "PSF fine sampling factor relative to data "}, 
-            "F": {"value": "none", "comment": "Bad pixel mask (FITS image or ASCII coord list)"}, 
-            "G": {"value": "none", "comment": "File with parameter constraints (ASCII file) "},
-            "H": {"value": "1    200  1  200", "comment": "Image region to fit (xmin xmax ymin ymax)"},
-            "I": {"value": "200  200", "comment": "Size of the convolution box (x y)"},
-            "J": {"value": "0,0,0", "comment": "Magnitude photometric zeropoint"},
-            "K": {"value": "0.55  0.55", "comment": "Plate scale (dx dy)   [arcsec per pixel]"},
-            "O": {"value": "regular", "comment": "Display type (regular, curses, both)"}, 
-            "P": {"value": "0", "comment": "Choose: 0=optimize, 1=model, 2=imgblock, 3=subcomps"}, 
-            "U": {"value": "0", "comment": ""},
-            "V": {"value": "0", "comment": "Use standard optimizer (0) or MultiNest (1)"},
-            "W": {"value": "default", "comment": "Output images"}
-        }
-
-        self.components_config = {
-            "sky" : {
-                "1": {"col1": "BKGG,BKGR,BKGI", "col2": "0", "col3": "band", "comment": "Sky background at center of fitting region [ADUs]"},
-                "2": {"col1": "0,0,0", "col2": "0", "col3": "band", "comment": "dsky/dx (sky gradient in x) [ADUs/pix]"},
-                "3": {"col1": "0,0,0", "col2": "0", "col3": "band", "comment": "dsky/dy (sky gradient in y) [ADUs/pix]"},
-                "Z": {"col1": "0", "col2": "", "col3": "", "comment": "Skip this model in output image? (yes=1, no=0)"}
-            },
-            "sersic" : {
-                "1":  {"col1": "200.0,200.0,200.0", "col2": "1", "col3": "band", "comment": "Position x [pixel]"},
-                "2":  {"col1": "200.0,200.0,200.0", "col2": "1", "col3": "band", "comment": "Position y [pixel]"},
-                "3":  {"col1": "0,0,0", "col2": "3", "col3": "band", "comment": "Integrated magnitude"},
-                "4":  {"col1": "0,0,0", "col2": "2", "col3": "band", "comment": "R_e (effective radius) [pix]"},
-                "5":  {"col1": "4", "col2": "2", "col3": "band", "comment": "Sersic index n (de Vaucouleurs n=4)"},
-                "9":  {"col1": "0,0,0", "col2": "1", "col3": "band", "comment": "Axis ratio (b/a)"},
-                "10": {"col1": "0,0,0", "col2": "1", "col3": "band", "comment": "Position angle (PA) [deg: Up=0, Left=90]"},
-                "Z":  {"col1": "0", "col2": "", "col3": "", "comment": "Skip this model in output image? (yes=1, no=0)"}
-            },
-            "expdisk" : {
-                "1":  {"col1": "300", "col2": "1", "col3": "band", "comment": "Position x [pixel]"},
-                "2":  {"col1": "357.4", "col2": "1", "col3": "band", "comment": "Position y [pixel]"},
-                "3":  {"col1": "0,0,0", "col2": "3", "col3": "band", "comment": "Integrated magnitude"},
-                "4":  {"col1": "0,0,0", "col2": "2", "col3": "band", "comment": "R_s (disk scale lengths) [pix]"},
-                "9":  {"col1": "0,0,0", "col2": "1", "col3": "band", "comment": "Axis ratio (b/a)"},
-                "10": {"col1": "0,0,0", "col2": "1", "col3": "band", "comment": "Position angle (PA) [deg: Up=0, Left=90]"},
-                "Z":  {"col1": "0", "col2": "", "col3": "", "comment": "Skip this model in output image? (yes=1, no=0)"}
-            },
-            "moffat" : {
-                "1":  {"col1": "300", "col2": "1", "col3": "band", "comment": "Position x [pixel]"},
-                "2":  {"col1": "357.4", "col2": "1", "col3": "band", "comment": "Position y [pixel]"},
-                "3":  {"col1": "0,0,0", "col2": "3", "col3": "band", "comment": "Total magnitude"},
-                "4":  {"col1": "0,0,0", "col2": "2", "col3": "band", "comment": "FWHM"},
-                "5":  {"col1": "0,0,0", "col2": "2", "col3": "band", "comment": "powerlaw"},
-                "9":  {"col1": "0,0,0", "col2": "1", "col3": "band", "comment": "Axis ratio (b/a)"},
-                "10": {"col1": "0,0,0", "col2": "1", "col3": "band", "comment": "Position angle (PA) [deg: Up=0, Left=90]"},
-                "Z":  {"col1": "0", "col2": "", "col3": "", "comment": "Skip this model in output image? (yes=1, no=0)"}
-            },
-            "ferrer" : {
-                "1":  {"col1": "300", "col2": "1", "col3": "band", "comment": "Position x [pixel]"},
-                "2":  {"col1": "357.4", "col2": "1", "col3": "band", "comment": "Position y [pixel]"},
-                "3":  {"col1": "0,0,0", "col2": "3", "col3": "band", "comment": "Central surface brghtness [mag/arcsec^2]"},
-                "4":  {"col1": "0,0,0", "col2": "2", "col3": "band", "comment": "Outer truncation radius  [pix]"},
-                "5":  {"col1": "0,0,0", "col2": "2", "col3": "band", "comment": "Alpha (outer truncation sharpness) "},
-                "6":  {"col1": "0,0,0", "col2": "2", "col3": "band", "comment": "Beta (central slope)"},
-                "9":  {"col1": "0,0,0", "col2": "1", "col3": "band", "comment": "Axis ratio (b/a)"},
-                "10": {"col1": "0,0,0", "col2": "1", "col3": "band", "comment": "Position angle (PA) [deg: Up=0, Left=90]"},
-                "Z":  {"col1": "0", "col2": "", "col3": "", "comment": "Skip this model in output image? (yes=1, no=0)"}
-            },
-            "psf" : {
-                "1": {"col1": "0,0,0", "col2": "0", "col3": "band", "comment": "position x [pixel]"},
-                "2": {"col1": "0,0,0", "col2": "0", "col3": "band", "comment": "position y [pixel]"},
-                "3": {"col1": "0,0,0", "col2": "0", "col3": "band", "comment": "total magnitude "},
-                "Z": {"col1": "0", "col2": "", "col3": "", "comment": "Skip this model in output image? (yes=1, no=0)"}
-            },
-            "nuker" : {
-                "1":  {"col1": "300.", "col2": "1", "col3": "band", "comment": "Position x [pixel]"},
-                "2":  {"col1": "357.4", "col2": "1", "col3": "band", "comment": "Position y [pixel]"},
-                "3":  {"col1": "0,0,0", "col2": "3", "col3": "band", "comment": "mu(Rb)            [surface brightness mag. at Rb]"},
-                "4":  {"col1": "0,0,0", "col2": "2", "col3": "band", "comment": "Rb               [pixels]"},
-                "5":  {"col1": "0,0,0", "col2": "2", "col3": "band", "comment": "alpha  (sharpness of transition)"},
-                "6":  {"col1": "0,0,0", "col2": "2", "col3": "band", "comment": "beta   (outer powerlaw slope)"},
-                "7":  {"col1": "0,0,0", "col2": "1", "col3": "band", "comment": "gamma  (inner powerlaw slope)"},
-                "9": {"col1": "0,0,0", "col2": "1", "col3": "band", "comment": "axis ratio (b/a)"},
-                "10": {"col1": "0,0,0", "col2": "1", "col3": "band", "comment": "Position angle (PA) [deg: Up=0, Left=90]"},
-                "Z":  {"col1": "0", "col2": "", "col3": "", "comment": "Skip this model in output image? (yes=1, no=0)"}
-            },
-            "corser" : {
-                "1":  {"col1": "300.", "col2": "1", "col3": "band", "comment": "Position x [pixel]"},
-                "2":  {"col1": "357.4", "col2": "1", "col3": "band", "comment": "Position y [pixel]"},
-                "3":  {"col1": "0,0,0", "col2": "3", "col3": "band", "comment": "mu(Rb)            [surface brightness mag. at Rb]"},
-                "4":  {"col1": "0,0,0", "col2": "2", "col3": "band", "comment": "Rb               [pixels]"},
-                "5":  {"col1": "0,0,0", "col2": "2", "col3": "band", "comment": "alpha  (sharpness of transition)"},
-                "6":  {"col1": "0,0,0", "col2": "1", "col3": "band", "comment": "gamma  (inner powerlaw slope)"},
-                "7": {"col1": "0,0,0", "col2": "1", "col3": "band", "comment": "R_e (half-light radius)   [pix]"},
-                "8": {"col1": "0,0,0", "col2": "1", "col3": "band", "comment": "Sersic index n (de Vaucouleurs n=4) "},
-                "9": {"col1": "0,0,0", "col2": "1", "col3": "band", "comment": "axis ratio (b/a)"},
-                "10": {"col1": "0,0,0", "col2": "1", "col3": "band", "comment": "Position angle (PA) [deg: Up=0, Left=90]"},
-                "Z":  {"col1": "0", "col2": "", "col3": "", "comment": "Skip this model in output image? (yes=1, no=0)"}
-            },
-            "devauc" : {
-                "1":  {"col1": "300.", "col2": "1", "col3": "band", "comment": "Position x [pixel]"},
-                "2":  {"col1": "357.4", "col2": "1", "col3": "band", "comment": "Position y [pixel]"},
-                "3":  {"col1": "0,0,0", "col2": "3", "col3": "band", "comment": "Total magnitude"},
-                "4":  {"col1": "0,0,0", "col2": "2", "col3": "band", "comment": "Rs               [Pixels]"},
-                "9":  {"col1": "0,0,0", "col2": "1", "col3": "band", "comment": "Axis ratio (b/a)"},
-                "10": {"col1": "0,0,0", "col2": "1", "col3": "band", "comment": "Position angle (PA) [deg: Up=0, Left=90]"},
-                "Z":  {"col1": "0", "col2": "", "col3": "", "comment": "Skip this model in output image? (yes=1, no=0)"}
-            },
-            "edgedisk" : {
-                "1":  {"col1": "300.", "col2": "1", "col3": "band", "comment": "Position x [pixel]"},
-                "2":  {"col1": "357.4", "col2": "1", "col3": "band", "comment": "Position y [pixel]"},
-                "3":  {"col1": "0,0,0", "col2": "3", "col3": "band", "comment": "central surface brightness  [mag/arcsec^2]"},
-                "4":  {"col1": "0,0,0", "col2": "2", "col3": "band", "comment": "disk scale-height    [Pixels]"},
-                "5":  {"col1": "0,0,0", "col2": "2", "col3": "band", "comment": "disk scale-length    [Pixels]"},
-                "10": {"col1": "0,0,0", "col2": "1", "col3": "band", "comment": "Position angle (PA) [deg: Up=0, Left=90]"},
-                "Z":  {"col1": "0", "col2": "", "col3": "", "comment": "Skip this model in output image? (yes=1, no=0)"}
-            },
-            "gaussian" : {
-                "1":  {"col1": "300.", "col2": "1", "col3": "band", "comment": "Position x [pixel]"},
-                "2":  {"col1": "357.4", "col2": "1", "col3": "band", "comment": "Position y [pixel]"},
-                "3":  {"col1": "0,0,0", "col2": "3", "col3": "band", "comment": "Total magnitude"},
-                "4":  {"col1": "0,0,0", "col2": "2", "col3": "band", "comment": "FWHM               [pixels]"},
-                "9":  {"col1": "0,0,0", "col2": "1", "col3": "band", "comment": "Axis ratio (b/a)"},
-                "10": {"col1": "0,0,0", "col2": "1", "col3": "band", "comment": "Position angle (PA) [deg: Up=0, Left=90]"},
-                "Z":  {"col1": "0", "col2": "", "col3": "", "comment": "Skip this model in output image? (yes=1, no=0)"}
-            },
-            "king" : {
-                "1":  {"col1": "300", "col2": "1", "col3": "band", "comment": "Position x [pixel]"},
-                "2":  {"col1": "357.4", "col2": "1", "col3": "band", "comment": "Position y [pixel]"},
-                "3":  {"col1": "0,0,0", "col2": "3", "col3": "band", "comment": "mu(0)"},
-                "4":  {"col1": "0,0,0", "col2": "2", "col3": "band", "comment": "Rc"},
-                "5":  {"col1": "0,0,0", "col2": "2", "col3": "band", "comment": "Rt"},
-                "6":  {"col1": "0,0,0", "col2": "2", "col3": "band", "comment": "alpha"},
-                "9":  {"col1": "0,0,0", "col2": "1", "col3": "band", "comment": "Axis ratio (b/a)"},
-                "10": {"col1": "0,0,0", "col2": "1", "col3": "band", "comment": "Position angle (PA) [deg: Up=0, Left=90]"},
-                "Z":  {"col1": "0", "col2": "", "col3": "", "comment": "Skip this model in output image? (yes=1, no=0)"}
-            }
-        }
+        self.base = new_base()
+
+        ## Component templates are shared, each one is copied only when first accessed
+        self.components_config = ComponentsConfig()
 
         self.components = [
             "sersic",
@@ -184,6 +56,8 @@ class PyGalfitm:
 
     def check_executable(self):
         if not os.path.exists(self.executable):
+            import requests
+
             control.info("Executable path not found. ")
             while True:
                 i = input("Do you want to download the executable? (y/n): ")
@@ -328,23 +202,90 @@ class PyGalfitm:
         else:
             raise KeyError("Component not found.")
 
+    def get_values(self, component, item):
+        """Returns the values (column 1) of a component parameter as numbers, one per band.
+
+        Ex:
+            mags = p.get_values("sersic", "3")
+
+        Args:
+            component (str): component name
+            item (str): parameter name
+
+        Returns:
+            numpy.ndarray: float64 values, NaN where the value is not a number.
+        """
+        return self.components_config[component].value(item)
+
+    def set_values(self, component, item, values, dof = None, mode = None):
+        """Sets the values (column 1) of a component parameter from numbers.
+
+        Ex:
+            p.set_values("sersic", "4", [3.1, 2.9, 2.7], dof=2, mode="band")
+
+        Args:
+            component (str): component name
+            item (str): parameter name
+            values (float or array-like): one value per band.
+            dof (int, optional): degrees of freedom (column 2). Defaults to None (unchanged).
+            mode (str, optional): "band" or "cheb" (column 3). Defaults to None (unchanged).
+
+        Raises:
+            KeyError: Component not found.
+        """
+        if component not in self.components_config:
+            raise KeyError("Component not found.")
+        self.components_config[component].set_value(item, values, dof=dof, mode=mode)
+
 
     def write_feedme(self, feedme_path = None):
-        """Writes final feedme
+        """Writes final feedme. 
+        The whole file is rendered in memory and written with a single write to a temporary file, 
+        which is then renamed to feedme_path, so readers never see a partial feedme.
 
         Args:
             feedme_path (str, optional): file path, if none select default file path. Defaults to None.
+
+        Returns:
+            str: feedme text written, to be reused instead of calling render_feedme again (e.g. FitCache.key).
         """        
         if feedme_path is None:
             feedme_path = self.feedme_path
         else:
             self.feedme_path = feedme_path
 
-        self.write_base(feedme_path)
+        text = self.render_feedme()
+        _write_atomic(feedme_path, text)
+        return text
+
+    def render_feedme(self, encoding = None):
+        """Returns the feedme text of base and active components without touching disk, the same text written by write_feedme.
+
+        Args:
+            encoding (str, optional): if given, return the text encoded as bytes (e.g. "UTF-8"). Defaults to None.
+
+        Returns:
+            str or bytes: feedme text.
+        """
+        text = self._render_base() + "".join(
+            self._render_component(component) for component in self.active_components
+        )
+        if encoding is not None:
+            return text.encode(encoding)
+        return text
+
+    def _render_base(self):
+        base = self.base
+        return "".join([
+            f"{param}) {str(base[param]['value']).ljust(32)} # {base[param]['comment']}\n" for param in base
+        ])
+
+    def _render_component(self, component_name):
+        lines = ["\n\n\n0) ", component_name.translate(_DIGITS), "\n"]
+        for i, col1, col2, col3, comment in self.components_config[component_name].rows():
+            lines.append(f"{i}) {col1.ljust(35)} {col2.ljust(5)}{col3.ljust(10)} # {comment}\n")
+        return "".join(lines)
 
-        for component in self.active_components:
-            self.write_component(component, feedme_path)
-    
     def print_component(self, component):
         """Prints selected component to visualize informations
 
@@ -373,27 +314,16 @@ class PyGalfitm:
     def write_base(self, feedme_path = None):
         if feedme_path is None:
             feedme_path = self.feedme_path
-        file = open(feedme_path, "w")
-        for param in self.base:
-            final = str(param) + ") " + str(self.base[param]["value"]).ljust(32) + " # " + str(self.base[param]["comment"]) + "\n"
-            file.write(final)
-        file.close()
+        with open(feedme_path, "w") as file:
+            file.write(self._render_base())
     
     def write_component(self, component_name, feedme_path = None):
         if feedme_path is None:
             feedme_path = self.feedme_path
 
         if component_name in self.active_components:
-            config = self.components_config[component_name]
-            f = open(feedme_path, "a")
-            f.write("\n\n\n")
-
-            f.write("0) " + component_name.translate({ord(ch): None for ch in '0123456789'}) + "\n")
-            for i in self.components_config[component_name]:
-                final = i + ") " + config[i]['col1'].ljust(35) + " " + config[i]['col2'].ljust(5) + config[i]['col3'].ljust(10) + " # " + config[i]['comment'] + "\n"
-                f.write(final)
-
-            f.close()
+            with open(feedme_path, "a") as f:
+                f.write(self._render_component(component_name))
     
     def check_number_of_filters(self):
         """Check parameter by parameter from active components that have correct number of bands. 
@@ -402,26 +332,31 @@ class PyGalfitm:
         correct = True
 
         for component in self.active_components:
-            for att in self.components_config[component]:
-                length = len(self.components_config[component][att]["col1"].split(","))
-                if length == 1: ## These is due to the skip image parameter
-                    continue
-                degrees = int(self.components_config[component][att]["col2"].split(",")[0])
-                if length > 1 and length < degrees:
+            params = self.components_config[component]
+            ## Single values are skipped, these is due to the skip image parameter
+            many = params.lengths > 1
+            few_values = many & (params.lengths < params.dof)
+            wrong_bands = many & (params.lengths != nbands)
+
+            for i in np.flatnonzero(few_values | wrong_bands):
+                att = params.names[i]
+                if few_values[i]:
                     control.info("Higher degrees of freedom than params in component: " + component + " - (" + att + ")")
-                    correct = False
-
-                if length > 1 and length != nbands:
+                if wrong_bands[i]:
                     control.info("Number of parameters incorrect in component: " + component + " - (" + att + ")")
-                    correct = False
+                correct = False
         
 
         return correct
 
 
-    def run(self):
+    def run(self, cwd = None):
         """Run galfitm
 
+        Args:
+            cwd (str, optional): working directory of the galfitm process, where it writes fit.log and 
+                intermediate files. Defaults to None (current directory).
+
         Returns:
             str: output of run.
         """        
@@ -432,14 +367,32 @@ class PyGalfitm:
 
         self.check_executable()
         try:
-            output = subprocess.check_output(f'{self.executable} {self.feedme_path}', shell=True).decode("UTF-8")
+            output = subprocess.check_output(f'{self.executable} {self.feedme_path}', shell=True, cwd=cwd).decode("UTF-8")
         except subprocess.CalledProcessError as e:
             output = e.output.decode("UTF-8")
             control.info(output)
             raise Exception("Error running galfitm.")
 
         return output
-    
+
+    async def run_async(self, timeout = None, cwd = None, on_line = None, keep_output = True):
+        """Run galfitm without blocking the event loop (no shell), streaming stdout line by line.
+
+            Ex:
+                output = await pyg.run_async(timeout=600, on_line=print)
+
+        Args:
+            timeout (float, optional): maximum time in seconds for the fit, the process is killed on expiry. Defaults to None.
+            cwd (str, optional): working directory of the galfitm process. Defaults to None (current directory).
+            on_line (callable, optional): called with each stdout line as soon as it is read. Defaults to None.
+            keep_output (bool, optional): accumulate and return stdout. Defaults to True.
+
+        Returns:
+            str: output of run.
+        """
+        from pygalfitm.aio import run_async
+        return await run_async(self, timeout=timeout, cwd=cwd, on_line=on_line, keep_output=keep_output)
+
     def gen_plot(self, component_selected = "sersic", plot_parameters = [], plotsize_factor = (1, 1), 
              colorbar = True, lupton_stretch = 0.2, lupton_q = 8, fig_filename = None, return_plot = False, **kwargs):        
         """
@@ -459,6 +412,7 @@ class PyGalfitm:
             Returns:
                 - fig (plt.Figure): the matplotlib Figure object, only if `return_plot` is True.
         """
+        from pygalfitm.plot import gen_plot
         return gen_plot(self, component_selected, plot_parameters, plotsize_factor, 
              colorbar, lupton_stretch, lupton_q, fig_filename, return_plot, **kwargs)
 
@@ -475,47 +429,94 @@ class PyGalfitm:
 
         """
             
+        from pygalfitm.plot import gen_color_plot
         gen_color_plot(self, band_combinations=band_combinations, lupton_stretch=3.5, lupton_Q=8, return_plot=False, fig_filename=None)
 
+    def gen_mosaic(self, fig_filename=None, component_selected="sersic", plot_parameters=[], lupton_stretch=0.2,
+                   lupton_q=8, scale=1, gap=4, return_array=False):
+        """Fast quick-look of the input, model and residual images of every band as a single PNG image,
+        without matplotlib figures. See pygalfitm.plot.gen_mosaic.
+
+        Args:
+            fig_filename (str, optional): PNG file to write. Defaults to None.
+            component_selected (str, optional): component of the parameter labels. Defaults to "sersic".
+            plot_parameters (list, optional): parameters labeled above each band. Defaults to [].
+            lupton_stretch (float, optional): Lupton stretch. Defaults to 0.2.
+            lupton_q (int, optional): Lupton Q. Defaults to 8.
+            scale (int, optional): integer zoom of the images. Defaults to 1.
+            gap (int, optional): pixels between the images. Defaults to 4.
+            return_array (bool, optional): return the mosaic as a uint8 array. Defaults to False.
+        """
+        from pygalfitm.plot import gen_mosaic
+        return gen_mosaic(self, fig_filename, component_selected, plot_parameters, lupton_stretch,
+                          lupton_q, scale, gap, return_array)
+
 
-    def create_result_table(self):
+    def create_result_table(self, qa=False):
         """
         Creates a Pandas DataFrame containing result data for components 
         and their corresponding values for each band.
 
         This function reads the band data from the 'base' attribute and component data from the 'components_config' attribute.
-        It iterates through each component and its keys, extracting values for each band, and then combines them into a dictionary.
+        It iterates through each active component and its keys, extracting values for each band, and then combines them into a dictionary.
         Finally, it converts the dictionary into a Pandas DataFrame and returns it.
 
+        Values are floats, galfitm's markers are removed from them: "*16.9*" (a problem in the fit, e.g. the
+        parameter hit a constraint) is kept as True in the boolean column "component_col_name_band_problem",
+        "[16.9]" (a fixed parameter) is 16.9, fixed parameters are the ones with 0 degrees of freedom (col2).
+
+        To build one table of many objects use pygalfitm.tables.build_result_table.
+
+        Args:
+        qa (bool, optional): add the QA metrics of the fit, "QA_<metric>_<band>" (see pygalfitm.qa). Defaults to False.
+
         Returns:
         pd.DataFrame: A DataFrame containing result data for components and their corresponding values for each band, with column names in the format "component_col_name_band".
         """
         import pandas as pd
+        from pygalfitm.read import result_row
+
+        data = result_row(self.base, {component: self.components_config[component] for component in self.active_components})
+
+        if qa:
+            from pygalfitm.qa import qa_metrics
+            data.update(qa_metrics(self))
+
+        df = pd.DataFrame.from_dict({os.path.basename(self.name): data})
+        return df
+
+    def fits_table_rows(self):
+        """
+        Returns the row of each band saved by create_fits_table.
 
-        bands = self.base["A1"]["value"].strip().split(",")
+        Returns
+        -------
+        dict
+            {band: {column: value}}, with the object name in the "ID" column, one column per component
+            parameter ("component_col_name") and the zeropoint in the "ZP" column.
+        """
+        bands = band_list(self.base)
         data = {}
-        
-        
+        for band in bands:
+            data[band] = {}
 
         for component in self.components_config:
-            for key in self.components_config[component]:
-                col_name = remove_parentheses_and_brackets(self.components_config[component][key]["comment"])
+            params = self.components_config[component]
+            for i in np.flatnonzero(params.lengths == len(bands)):
+                col_name = remove_parentheses_and_brackets(params.comments[i])
                 if "--" in col_name:
                     continue
-                
-                values = self.components_config[component][key]["col1"].strip().split(",")
-                if len(values) == len(bands):
-                    
-                    for band in bands:
-                        data[f"{component}_{col_name}_{band}"] = values[bands.index(band)]
 
+                col = f"{component}_{col_name}"
+                for band, value in zip(bands, (params.values[i, :len(bands)] + 1).tolist()):
+                    data[band]["ID"] = self.name
+                    data[band][col] = value
 
         values = self.base["J"]["value"].strip().split(",")
         for band, value in zip(bands, values):
-            data[f"ZP_{band}"] = value
+            data[band][f"ZP"] = float(value)
 
-        df = pd.DataFrame.from_dict({os.path.basename(self.name): data})
-        return df
+        return data
 
     def create_fits_table(self, out_table):
         """
@@ -540,34 +541,22 @@ class PyGalfitm:
         If the existing file has a different number of HDUs than expected based on the number of bands, 
         a message is printed and no changes are made.
 
+        Every call rewrites the whole file, to save many objects use pygalfitm.tables.ResultWriter.
+
 
         Raises
         ------
         IOError
             If the out_table file path is not writable or if there's an error in opening the FITS file.
         """
-        bands = self.base["A1"]["value"].strip().split(",")
-        nbands = len(bands)
-        data = {}
-        for band in bands:
-            data[band] = {}
+        from astropy.io import fits
+        from astropy.table import Table
 
-        for component in self.components_config:
-            for key in self.components_config[component]:
-                col_name = remove_parentheses_and_brackets(self.components_config[component][key]["comment"])
-                if "--" in col_name:
-                    continue
-
-                values = self.components_config[component][key]["col1"].strip().split(",")
-                if len(values) == len(bands):
-                    for band in bands:
-                        col = f"{component}_{col_name}"
-                        data[band]["ID"] = [self.name]
-                        data[band][col] = [float(values[bands.index(band)]) + 1]
-
-        values = self.base["J"]["value"].strip().split(",")
-        for band, value in zip(bands, values):
-            data[band][f"ZP"] = [float(value)]
+        rows = self.fits_table_rows()
+        nbands = len(rows)
+        data = {}
+        for band in rows:
+            data[band] = {col: [value] for col, value in rows[band].items()}
 
         if not os.path.exists(out_table):
             cube = fits.HDUList([])
@@ -0,0 +1,230 @@
+import functools
+
+import numpy as np
+
+from pygalfitm.auxiliars import band_list
+from pygalfitm.components import ComponentParams, _parse_dof
+from pygalfitm.imageblock import ImageBlock
+from pygalfitm.log import control
+
+## Metrics of each band, columns "QA_<metric>_<band>" of the result tables
+METRICS = ["chi2nu", "rff", "central_residual", "asymmetry"]
+
+## Limits used by flag_table, a fit is flagged when a band is above one of them (absolute value for central_residual)
+DEFAULT_THRESHOLDS = {"chi2nu": 3.0, "rff": 0.1, "central_residual": 0.2, "asymmetry": 0.2}
+
+
+@functools.lru_cache(maxsize=32)
+def _aperture(shape, radius):
+    ## Circle around the center of the image, shared by every band and object of the same size
+    ny, nx = shape
+    y, x = np.ogrid[:ny, :nx]
+    aperture = (y - (ny - 1) / 2) ** 2 + (x - (nx - 1) / 2) ** 2 <= radius ** 2
+    aperture.flags.writeable = False
+    return aperture
+
+
+def _sum(values, mask):
+    return np.where(mask, values, 0).sum(axis=(-2, -1))
+
+
+def band_metrics(images, sigma=None, n_free=0, central_radius=5):
+    """Computes the QA metrics of every band of a fit at once.
+
+    - chi2nu: reduced chi², sum((residual / sigma)²) / (n_pixels - n_free / n_bands).
+    - rff: residual flux fraction, (sum|residual| - 0.8 sum(sigma)) / sum(input) (0.8 sigma is the
+      mean absolute value of pure noise, so a perfect fit has rff close to 0).
+    - central_residual: sum(residual) / sum(input) inside `central_radius` pixels of the image center.
+    - asymmetry: sum|residual - residual rotated by 180°| / (2 sum|input|).
+
+    Pixels that are not finite, or with sigma <= 0, are ignored.
+
+    Args:
+        images (np.ndarray): (3, n_bands, ny, nx) input, model and residual images (see ImageBlock.stack).
+        sigma (np.ndarray, optional): (n_bands, ny, nx) sigma images. Defaults to None (a constant sigma per
+            band estimated from the median absolute deviation of the residual).
+        n_free (float, optional): number of free parameters of the fit (all bands). Defaults to 0.
+        central_radius (float, optional): radius of the central aperture in pixels. Defaults to 5.
+
+    Returns:
+        dict: {metric: (n_bands,) array}.
+    """
+    images = np.asarray(images, dtype=np.float64)
+    data, residual = images[0], images[2]
+    n_bands = data.shape[0]
+
+    if sigma is None:
+        median = np.nanmedian(residual, axis=(-2, -1), keepdims=True)
+        sigma = 1.4826 * np.nanmedian(np.abs(residual - median), axis=(-2, -1), keepdims=True)
+    sigma = np.broadcast_to(np.asarray(sigma, dtype=np.float64), data.shape)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        valid = np.isfinite(data) & np.isfinite(residual) & np.isfinite(sigma) & (sigma > 0)
+        n_pixels = valid.sum(axis=(-2, -1))
+
+        chi2 = _sum((residual / sigma) ** 2, valid)
+        chi2nu = chi2 / np.maximum(n_pixels - n_free / n_bands, 1)
+
+        rff = (_sum(np.abs(residual), valid) - 0.8 * _sum(sigma, valid)) / _sum(data, valid)
+
+        central = valid & _aperture(data.shape[1:], central_radius)
+        central_residual = _sum(residual, central) / _sum(data, central)
+
+        both = valid & valid[:, ::-1, ::-1]
+        asymmetry = _sum(np.abs(residual - residual[:, ::-1, ::-1]), both) / (2 * _sum(np.abs(data), both))
+
+    return {"chi2nu": chi2nu, "rff": rff, "central_residual": central_residual, "asymmetry": asymmetry}
+
+
+def free_parameters(components):
+    """Number of free parameters of a fit, the degrees of freedom (column 2) of every parameter.
+
+    Args:
+        components (dict): {component: ComponentParams or parsed dict}, e.g. the active components.
+
+    Returns:
+        int: number of free parameters.
+    """
+    total = 0
+    for params in components.values():
+        if isinstance(params, ComponentParams):
+            dof = params.dof
+        else:
+            dof = np.array([_parse_dof(param["col2"]) for param in params.values()], dtype=np.int64)
+        total += int(np.maximum(dof, 0).sum())
+    return total
+
+
+def load_sigma(base, shape):
+    """Reads the sigma images of base C, cut to the fit region (base H) when they are larger than the block.
+
+    Args:
+        base (dict): base parameters.
+        shape (tuple): (n_bands, ny, nx) of the output block.
+
+    Returns:
+        np.ndarray: (n_bands, ny, nx) sigma images, or None if base C is blank or "none".
+    """
+    from astropy.io import fits
+
+    paths = [path.strip() for path in base.get("C", {}).get("value", "").split(",")]
+    if all(path == "" or path.lower() == "none" for path in paths):
+        return None
+    if len(paths) != shape[0]:
+        raise ValueError(f"Base C has {len(paths)} sigma images for {shape[0]} bands")
+
+    sigma = np.empty(shape, dtype=np.float64)
+    for key, path in enumerate(paths):
+        data = fits.getdata(path, memmap=True)
+        if data.shape != shape[1:]:
+            x1, x2, y1, y2 = (int(value) for value in base["H"]["value"].split()[:4])
+            data = data[y1 - 1:y2, x1 - 1:x2]
+        sigma[key] = data
+    return sigma
+
+
+def qa_row(base, components, central_radius=5):
+    """QA metrics of a fit from its parsed base and components, as one row.
+
+    Args:
+        base (dict): base parameters, the output block (B), bands (A1), sigma images (C) and region (H) are used.
+        components (dict): active components, see free_parameters.
+        central_radius (float, optional): see band_metrics. Defaults to 5.
+
+    Returns:
+        dict: {"QA_<metric>_<band>": float}.
+    """
+    bands = band_list(base)
+    with ImageBlock(path=base["B"]["value"].strip(), bands=bands) as block:
+        images = np.array(block.stack(), dtype=np.float64)
+
+    try:
+        sigma = load_sigma(base, images.shape[1:])
+    except (OSError, ValueError) as e:
+        control.warn(f"Sigma images not used, estimated from the residual - {e}")
+        sigma = None
+
+    metrics = band_metrics(images, sigma, free_parameters(components), central_radius)
+
+    row = {}
+    for metric in METRICS:
+        for band, value in zip(bands, metrics[metric].tolist()):
+            row[f"QA_{metric}_{band}"] = value
+    return row
+
+
+def qa_metrics(pyg, central_radius=5):
+    """QA metrics of a PyGalfitm result (read from a .band file), see band_metrics.
+
+    Args:
+        pyg (pygalfitm.PyGalfitm): PyGalfitm result.
+        central_radius (float, optional): see band_metrics. Defaults to 5.
+
+    Returns:
+        dict: {"QA_<metric>_<band>": float}.
+    """
+    components = {component: pyg.components_config[component] for component in pyg.active_components}
+    return qa_row(pyg.base, components, central_radius)
+
+
+def _qa_file(filename, central_radius=5):
+    from pygalfitm.read import output_name, parse_feedme
+
+    try:
+        with open(filename, "r") as f:
+            base, components = parse_feedme(f.read())
+        return output_name(filename), qa_row(base, components, central_radius)
+    except Exception as e:
+        control.warn(f"QA failed {filename} - {type(e).__name__}: {e}")
+        return output_name(filename), None
+
+
+def qa_many(paths, max_workers=None, chunksize=16, central_radius=5):
+    """Computes the QA metrics of many .band results in a process pool.
+
+    Ex:
+        qa = qa_many(glob.glob("outputs/*/*ss.galfit.01.band"), max_workers=32)
+        flagged = flag_table(qa)
+
+    Args:
+        paths (list): result file names.
+        max_workers (int, optional): number of worker processes. Defaults to None (number of CPUs).
+        chunksize (int, optional): number of files sent to a worker at once. Defaults to 16.
+        central_radius (float, optional): see band_metrics. Defaults to 5.
+
+    Returns:
+        pandas.DataFrame: one row per file (indexed by object name), columns "QA_<metric>_<band>".
+            Files that could not be read get a row of NaN.
+    """
+    from pygalfitm.read import _map_rows, _rows_to_frame
+
+    run = functools.partial(_qa_file, central_radius=central_radius)
+    return _rows_to_frame(_map_rows(run, paths, max_workers, chunksize))
+
+
+def flag_table(table, thresholds=None):
+    """Flags fits whose QA metrics are above the thresholds in any band.
+
+    Args:
+        table (pandas.DataFrame): table with "QA_<metric>_<band>" columns (qa_many, read_many(qa=True),
+            build_result_table(qa=True)).
+        thresholds (dict, optional): {metric: limit}. Defaults to None (DEFAULT_THRESHOLDS).
+
+    Returns:
+        pandas.DataFrame: one boolean column "flag_<metric>" per metric and "flag" (any of them), same index as table.
+    """
+    import pandas as pd
+
+    thresholds = dict(DEFAULT_THRESHOLDS if thresholds is None else thresholds)
+    flags = {}
+    for metric, limit in thresholds.items():
+        columns = [col for col in table.columns if col.startswith(f"QA_{metric}_")]
+        values = table[columns].to_numpy(dtype=np.float64)
+        if metric == "central_residual":
+            values = np.abs(values)
+        with np.errstate(invalid="ignore"):
+            flags[f"flag_{metric}"] = (values > limit).any(axis=1)
+
+    flags = pd.DataFrame(flags, index=table.index)
+    flags["flag"] = flags.any(axis=1)
+    return flags
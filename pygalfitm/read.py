@@ -1,88 +1,196 @@
 from pygalfitm import PyGalfitm
 
 import os
-from astropy.io import fits
+import functools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from pygalfitm.auxiliars import band_list, remove_parentheses_and_brackets
+from pygalfitm.components import ComponentParams, _parse_value
+from pygalfitm.log import control
 
-def read_output_to_class(filename):
-    """Reads a galfitm.feedme or .band result and returns a PyGalfitm class filled with the data.
+
+def parse_feedme(text):
+    """Parses the text of a galfitm.feedme or .band result in a single pass.
+
+    Repeated components are named as in PyGalfitm.activate_components (sersic, sersic1, sersic2, ...).
 
     Args:
-        filename (str): input file name.
+        text (str): feedme or .band text.
 
     Returns:
-        pygalfitm.PyGalfitm: PyGalfitm class filled with the data.
-    """    
-    out = open(filename, "r").read()
-    name = f"{filename}ss.galfit.01.band".split(".galfit")[0].rstrip("ss")
-
+        tuple: (base, components) dicts, in the same format as PyGalfitm.base and PyGalfitm.components_config.
+    """
     base = {}
     components = {}
+    counts = {}
+    current = None
 
-    in_base = True
-    in_current_component = ""
+    for line in text.splitlines():
+        letter, _, rest = line.strip().partition(" ")
+        letter = letter.replace(")", "")
 
-    current_component = ""
-    
-    for line in out.split("\n"):
-        line.lstrip().split(" ")[0].replace(")", "")
-        
-        letter = line.lstrip().split(" ")[0].replace(")", "")
-        
         if letter == "" or letter == "#" or len(letter) > 3:
             continue
-            
+
+        value, _, comment = rest.partition("#")
+
         if letter == "0":
-            [_, line_rest] = line.lstrip().split(" ", 1)
-            [current_component, line_rest] = line_rest.split(" ", 1)
-            
-            if current_component in components:
-                counter = 0
-                for comp in components:
-                    if current_component in comp:
-                        counter += 1
-
-                if counter != 0:
-                    in_current_component = current_component + str(counter)
-            else:
-                in_current_component = current_component
-
-            components[in_current_component] = {}
-            in_base = False
-
-        
-        if in_base:
-            base[letter] = {}
-
-            [_, line_rest] = line.lstrip().split(" ", 1)
-            [value, line_rest] = line_rest.lstrip().split("#", 1)
-            comment = line_rest.lstrip().strip().strip("#")
-
-            base[letter]['value'] = value
-            base[letter]['comment'] = comment
+            component = value.split()[0]
+            count = counts.get(component, 0)
+            counts[component] = count + 1
+
+            current = component if count == 0 else component + str(count)
+            components[current] = {}
+
+        elif current is None:
+            base[letter] = {"value": value.strip(), "comment": comment.strip()}
 
         else:
-            if letter == "0":
-                continue
-            [_, line_rest] = line.lstrip().split(" ", 1)
-            [col1, line_rest] = line_rest.lstrip().split(" ", 1)
-            [col2, line_rest] = line_rest.lstrip().split(" ", 1)
-            [col3, line_rest] = line_rest.lstrip().split(" ", 1)
-            comment = line_rest.lstrip().strip().strip("#")[1:]
-
-            components[in_current_component][letter] = {}
-
-            components[in_current_component][letter]["col1"] = col1
-            components[in_current_component][letter]["col2"] = col2
-            components[in_current_component][letter]["col3"] = col3
-            components[in_current_component][letter]["comment"] = comment
-
-        pyg = PyGalfitm()
-        pyg.name = os.path.basename(name)
-        pyg.base = base
-        
-        for comp in components.keys():
-            pyg.components_config[comp] = components[comp]
-        
-        pyg.activate_components(list(components.keys()))
+            cols = value.split()
+            cols += [""] * (3 - len(cols))
+            components[current][letter] = {
+                "col1": cols[0],
+                "col2": cols[1],
+                "col3": cols[2],
+                "comment": comment.strip(),
+            }
+
+    return base, components
+
+
+def output_name(filename):
+    """Object name of a result file (name of "<name>ss.galfit.01.band")."""
+    return os.path.basename(f"{filename}ss.galfit.01.band".split(".galfit")[0].rstrip("ss"))
+
+
+def read_output_to_class(filename):
+    """Reads a galfitm.feedme or .band result and returns a PyGalfitm class filled with the data.
+
+    Args:
+        filename (str): input file name.
+
+    Returns:
+        pygalfitm.PyGalfitm: PyGalfitm class filled with the data.
+    """
+    with open(filename, "r") as f:
+        base, components = parse_feedme(f.read())
+
+    pyg = PyGalfitm()
+    pyg.name = output_name(filename)
+    pyg.base = base
+
+    for comp in components:
+        pyg.components_config[comp] = components[comp]
+    pyg.active_components = list(components)
 
     return pyg
+
+
+def result_row(base, components):
+    """Flattens results into one row, with columns "component_col_name_band", "ZP_band" and
+    "component_col_name_band_problem" (True where galfitm marked the value as a problem, *value*).
+
+    This is the row of PyGalfitm.create_result_table, read_many and build_result_table.
+
+    Args:
+        base (dict): base parameters.
+        components (dict): {component: ComponentParams or parsed dict} of the components in the fit (the active
+            components, or the ones parsed from a .band file), inactive templates must not be given.
+
+    Returns:
+        dict: {column: float, or bool for the problem columns}.
+    """
+    bands = band_list(base)
+    nbands = len(bands)
+    row = {}
+    problems = {}
+
+    for component, params in components.items():
+        if not isinstance(params, ComponentParams):
+            params = ComponentParams(params)
+
+        flags = params.problem_mask
+        for i in np.flatnonzero(params.lengths == nbands):
+            col_name = remove_parentheses_and_brackets(params.comments[i])
+            if "--" in col_name:
+                continue
+
+            for band, value, flag in zip(bands, params.values[i, :nbands].tolist(), flags[i, :nbands].tolist()):
+                row[f"{component}_{col_name}_{band}"] = value
+                problems[f"{component}_{col_name}_{band}_problem"] = flag
+
+    if "J" in base:
+        for band, value in zip(bands, base["J"]["value"].split(",")):
+            row[f"ZP_{band}"] = _parse_value(value)
+
+    row.update(problems)
+    return row
+
+
+def _read_row(filename, qa=False):
+    try:
+        with open(filename, "r") as f:
+            base, components = parse_feedme(f.read())
+        row = result_row(base, components)
+    except Exception:
+        return output_name(filename), None
+
+    if qa:
+        from pygalfitm.qa import qa_row
+        try:
+            row.update(qa_row(base, components))
+        except Exception as e:
+            control.warn(f"QA failed {filename} - {type(e).__name__}: {e}")
+    return output_name(filename), row
+
+
+def _map_rows(func, items, max_workers=None, chunksize=64):
+    ## Few items (or max_workers=1) are run in this process, starting the pool would cost more
+    items = list(items)
+    if len(items) > chunksize and max_workers != 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            return list(pool.map(func, items, chunksize=chunksize))
+    return [func(item) for item in items]
+
+
+def _rows_to_columns(rows):
+    ## {column: float array}, NaN where a row (None for failed ones) does not have the column
+    columns = {}
+    for i, row in enumerate(rows):
+        if row is None:
+            continue
+        for col, value in row.items():
+            if col not in columns:
+                columns[col] = np.full(len(rows), np.nan)
+            columns[col][i] = value
+    return columns
+
+
+def _rows_to_frame(rows):
+    ## One DataFrame of (name, row) pairs, indexed by name
+    import pandas as pd
+
+    names = [name for name, _ in rows]
+    return pd.DataFrame(_rows_to_columns([row for _, row in rows]), index=pd.Index(names, name="ID"))
+
+
+def read_many(paths, max_workers=None, chunksize=64, qa=False):
+    """Reads many .band results in a process pool and returns them as one table.
+
+    Ex:
+        df = read_many(glob.glob("outputs/*/*ss.galfit.01.band"), max_workers=32)
+
+    Args:
+        paths (list): result file names.
+        max_workers (int, optional): number of worker processes. Defaults to None (number of CPUs).
+        chunksize (int, optional): number of files sent to a worker at once. Defaults to 64.
+        qa (bool, optional): also compute the QA metrics of each fit in the workers, columns
+            "QA_<metric>_<band>" (see pygalfitm.qa). Defaults to False.
+
+    Returns:
+        pandas.DataFrame: one row per file (indexed by object name), one float column per parameter and band
+            (columns of result_row, the problem flags are 1.0 or 0.0). Files that could not be parsed get a row of NaN.
+    """
+    return _rows_to_frame(_map_rows(functools.partial(_read_row, qa=qa), paths, max_workers, chunksize))
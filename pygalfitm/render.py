@@ -0,0 +1,315 @@
+import os
+import time
+import threading
+
+from concurrent.futures import ProcessPoolExecutor, wait as wait_futures
+
+import numpy as np
+
+from pygalfitm.auxiliars import band_list
+from pygalfitm.imageblock import ImageBlock, KINDS
+from pygalfitm.log import control
+
+## Figures of each layout, created once per worker process and reused for every object
+_templates = {}
+
+## Layouts kept per worker, the least recently used figure is closed above this
+MAX_TEMPLATES = 8
+
+
+def init_renderer():
+    """Initializer of the render processes, selects the headless Agg backend before pyplot is imported."""
+    import matplotlib
+    matplotlib.use("Agg")
+
+
+def parameter_labels(pygalfit, component_selected="sersic", plot_parameters=[]):
+    """Labels of parameter values of a component for each band, as in the titles of gen_plot.
+
+    Args:
+        pygalfit (pygalfitm.PyGalfitm): PyGalfitm object.
+        component_selected (str, optional): component. Defaults to "sersic".
+        plot_parameters (list, optional): parameters of the component. Defaults to [].
+
+    Returns:
+        list: one list of labels per band.
+    """
+    n_filters = len(band_list(pygalfit.base))
+    labels = [[] for _ in range(n_filters)]
+    for param in plot_parameters:
+        values = pygalfit.components_config[component_selected].value(str(param))
+        comment = pygalfit.components_config[component_selected][str(param)]["comment"]
+        if comment.strip() == "":
+            raise Exception("Please insert labels manually")
+
+        ## Parameters with a single value (constant over the bands) label every band
+        if values.size == 1:
+            values = np.repeat(values, n_filters)
+        for key in range(n_filters):
+            labels[key].append(f'{values[key]:g} {comment.lstrip().split("[")[0]}')
+    return labels
+
+
+def plot_job(pyg, out, component_selected="sersic", plot_parameters=[], plotsize_factor=(1, 1), colorbar=True,
+             lupton_stretch=0.2, lupton_q=8, dpi=None):
+    """Builds the job of a gen_plot quick-look, only the values needed are taken from the PyGalfitm object.
+
+    Args:
+        pyg (pygalfitm.PyGalfitm): PyGalfitm object, usually read from a .band result.
+        out (str): output file, the format is taken from the extension (png, pdf, ...).
+        Other arguments as in PyGalfitm.gen_plot, dpi as in matplotlib savefig.
+
+    Returns:
+        dict: render job, see render_job.
+    """
+    return {
+        "kind": "plot", "block": pyg.base["B"]["value"].strip(), "bands": band_list(pyg.base), "out": out, "dpi": dpi,
+        "labels": parameter_labels(pyg, component_selected, plot_parameters),
+        "plotsize_factor": tuple(plotsize_factor), "colorbar": colorbar,
+        "lupton_stretch": lupton_stretch, "lupton_q": lupton_q,
+    }
+
+
+def color_plot_job(pyg, out, band_combinations=["i,r,g", "u,f378,f395"], lupton_stretch=3.5, lupton_Q=8, dpi=None):
+    """Builds the job of a gen_color_plot quick-look.
+
+    Args:
+        pyg (pygalfitm.PyGalfitm): PyGalfitm object, usually read from a .band result.
+        out (str): output file, the format is taken from the extension (png, pdf, ...).
+        Other arguments as in PyGalfitm.gen_color_plot, dpi as in matplotlib savefig.
+
+    Returns:
+        dict: render job, see render_job.
+    """
+    return {
+        "kind": "color", "block": pyg.base["B"]["value"].strip(), "bands": band_list(pyg.base), "out": out, "dpi": dpi,
+        "band_combinations": list(band_combinations), "lupton_stretch": lupton_stretch, "lupton_q": lupton_Q,
+    }
+
+
+class _PlotTemplate:
+    """Figure of gen_plot (input, model and residual rows, one column per band)."""
+
+    def __init__(self, n_filters, plotsize_factor, colorbar):
+        import matplotlib.pyplot as plt
+        from mpl_toolkits.axes_grid1 import make_axes_locatable
+
+        self.fig = plt.figure(figsize=(n_filters * 4 * plotsize_factor[0], 12 * plotsize_factor[1]), facecolor='white')
+        self.axes = []
+        self.images = []
+        self.colorbars = []
+        self.laid_out = False
+
+        y_label = ["INPUT", "MODEL", "RESIDUAL"]
+        for i in range(n_filters * 3):
+            ax = self.fig.add_subplot(3, n_filters, i + 1)
+            im = ax.imshow(np.zeros((2, 2, 3), dtype=np.uint8), cmap='gray', interpolation='none')
+            ax.set_xticks([])
+            ax.set_yticks([])
+            if i % n_filters == 0:
+                ax.set_ylabel(y_label[i // n_filters], rotation=90, size='large')
+
+            if colorbar:
+                cax = make_axes_locatable(ax).append_axes('right', size='3%', pad=0.05)
+                self.colorbars.append(self.fig.colorbar(im, cax=cax, orientation='vertical'))
+
+            self.axes.append(ax)
+            self.images.append(im)
+
+    def draw(self, job, block):
+        from pygalfitm.plot import lupton_gray
+
+        bands = job["bands"]
+        n_filters = len(bands)
+        images = block.stack()
+        gray = lupton_gray(images.reshape(-1, *images.shape[2:]), stretch=job["lupton_stretch"], Q=job["lupton_q"])
+        for i, (ax, im) in enumerate(zip(self.axes, self.images)):
+            rgb = np.repeat(gray[i][..., None], 3, axis=-1)
+            im.set_data(rgb)
+            im.set_extent((-0.5, rgb.shape[1] - 0.5, rgb.shape[0] - 0.5, -0.5))
+            if self.colorbars:
+                im.set_clim(rgb.min(), rgb.max())
+                self.colorbars[i].update_normal(im)
+
+            if i < n_filters:
+                string = "".join(f"{label}\n" for label in job["labels"][i])
+                ax.set_title(f"""
+
+{bands[i]}
+{string}
+            """, loc='left')
+
+        ## Same layout (bands and number of labels) for every object of this template, computed once
+        if not self.laid_out:
+            self.fig.tight_layout()
+            self.fig.subplots_adjust(hspace=0.05)
+            self.laid_out = True
+
+
+class _ColorTemplate:
+    """Figure of gen_color_plot (one row per band combination, input, model and residual columns)."""
+
+    def __init__(self, band_combinations):
+        import matplotlib.pyplot as plt
+
+        n_rows = len(band_combinations)
+        self.fig, self.axs = plt.subplots(nrows=n_rows, ncols=3, figsize=(3 * 5, n_rows * 5), squeeze=False)
+        self.images = np.empty((n_rows, 3), dtype=object)
+
+        for i in range(n_rows):
+            for j in range(3):
+                self.images[i, j] = self.axs[i, j].imshow(np.zeros((2, 2, 3), dtype=np.uint8))
+                self.axs[i, j].set_xticks([])
+                self.axs[i, j].set_yticks([])
+            self.axs[i, 0].set_ylabel(band_combinations[i], size='large')
+
+        for j in range(3):
+            self.axs[0, j].set_title(['Input', 'Model', 'Residual'][j], size='large')
+
+        self.fig.subplots_adjust(wspace=0.01, hspace=0.01)
+        self.fig.set_facecolor('white')
+
+    def draw(self, job, block):
+        from astropy.visualization import make_lupton_rgb
+        from pygalfitm.plot import get_bands
+
+        for i, combination in enumerate(job["band_combinations"]):
+            for j, kind in enumerate(KINDS):
+                r, g, b = (block[kind, band] for band in get_bands(combination))
+                rgb = make_lupton_rgb(r, g, b, stretch=job["lupton_stretch"], Q=job["lupton_q"])
+                self.images[i, j].set_data(rgb)
+                self.images[i, j].set_extent((-0.5, rgb.shape[1] - 0.5, rgb.shape[0] - 0.5, -0.5))
+
+
+def _template(job):
+    if job["kind"] == "plot":
+        key = ("plot", len(job["bands"]), len(job["labels"][0]), job["plotsize_factor"], job["colorbar"])
+    else:
+        key = ("color", tuple(job["band_combinations"]))
+
+    template = _templates.pop(key, None)
+    if template is None:
+        if job["kind"] == "plot":
+            template = _PlotTemplate(len(job["bands"]), job["plotsize_factor"], job["colorbar"])
+        else:
+            template = _ColorTemplate(job["band_combinations"])
+
+        if len(_templates) >= MAX_TEMPLATES:
+            import matplotlib.pyplot as plt
+            plt.close(_templates.pop(next(iter(_templates))).fig)
+
+    _templates[key] = template
+    return template
+
+
+def render_job(job):
+    """Renders a quick-look job in this process, reusing the figure of its layout.
+
+    The output image block is opened memory-mapped (see ImageBlock) and closed before returning. The file is written
+    to a temporary name and renamed, so a partial image is never left at `out`.
+
+    Args:
+        job (dict): job built by plot_job or color_plot_job.
+
+    Returns:
+        dict: out (path written) and elapsed (seconds).
+    """
+    start = time.time()
+    template = _template(job)
+
+    with ImageBlock(path=job["block"], bands=job["bands"]) as block:
+        template.draw(job, block)
+
+    out = job["out"]
+    root, ext = os.path.splitext(out)
+    tmp = f"{root}.{os.getpid()}.tmp{ext}"
+    template.fig.savefig(tmp, dpi=job["dpi"])
+    os.replace(tmp, out)
+
+    return {"out": out, "elapsed": round(time.time() - start, 4)}
+
+
+class RenderFarm:
+    """
+    Pool of headless (Agg) processes rendering gen_plot and gen_color_plot quick-looks in the background.
+
+    Each process keeps one figure per layout (number of bands, size, colorbar / band combinations) and only
+    replaces the images and labels for every new object, instead of building all axes and colorbars again.
+    Jobs only carry the path of the image block and the labels, submitting returns at once, so fits are
+    never blocked by plotting.
+
+    Examples
+    --------
+    >>> with RenderFarm(max_workers=4) as farm:
+    ...     for result in iter_fit_catalog(...):
+    ...         farm.submit_plot(result["result"], f"plots/{result['name']}.png", plot_parameters=[3, 4, 5, 9])
+    """
+
+    def __init__(self, max_workers=None):
+        """
+        Args:
+            max_workers (int, optional): number of render processes. Defaults to None (number of CPUs).
+        """
+        self._pool = ProcessPoolExecutor(max_workers=max_workers, initializer=init_renderer)
+        ## Only the jobs not finished yet, each one is dropped by its done-callback
+        self.pending = set()
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def submit(self, job):
+        """Submits a job built by plot_job or color_plot_job.
+
+        Returns:
+            concurrent.futures.Future: future of the render_job result.
+        """
+        future = self._pool.submit(render_job, job)
+        with self._lock:
+            self.pending.add(future)
+        future.add_done_callback(self._job_done)
+        return future
+
+    def _job_done(self, future):
+        with self._lock:
+            self.pending.discard(future)
+        if not future.cancelled() and future.exception() is not None:
+            control.warn(f"Render failed - {type(future.exception()).__name__}: {future.exception()}")
+
+    def submit_plot(self, pyg, out, **kwargs):
+        """Submits a gen_plot quick-look of a PyGalfitm result, see plot_job.
+
+        Returns:
+            concurrent.futures.Future: future of the render_job result.
+        """
+        return self.submit(plot_job(pyg, out, **kwargs))
+
+    def submit_color_plot(self, pyg, out, **kwargs):
+        """Submits a gen_color_plot quick-look of a PyGalfitm result, see color_plot_job.
+
+        Returns:
+            concurrent.futures.Future: future of the render_job result.
+        """
+        return self.submit(color_plot_job(pyg, out, **kwargs))
+
+    def wait(self):
+        """Waits for every submitted job, failed jobs are logged.
+
+        Finished jobs are not kept by the farm, use the futures returned by submit to get their results.
+        """
+        while True:
+            with self._lock:
+                pending = list(self.pending)
+            if not pending:
+                return
+            wait_futures(pending)
+
+    def close(self, wait=True):
+        """Waits for the pending jobs and stops the render processes."""
+        if wait:
+            self.wait()
+        self._pool.shutdown(wait=wait)
+
@@ -0,0 +1,336 @@
+import os
+import glob
+import uuid
+import shutil
+
+import numpy as np
+
+from astropy.io import fits
+from astropy.table import Table, vstack
+
+from pygalfitm.auxiliars import band_list, remove_parentheses_and_brackets
+from pygalfitm.components import parse_values
+from pygalfitm.log import control
+
+## Column layout of each result schema (bands and parameters of the active components), see build_result_table
+_schemas = {}
+
+
+class ResultWriter:
+    """
+    Buffered writer of result catalogs, the streaming counterpart of PyGalfitm.create_fits_table.
+
+    Rows are kept in memory and flushed every `batch_size` objects to a new part file inside
+    `<out_table>.parts/`. Part files are never rewritten, so flushing costs O(batch) and any number
+    of processes may write parts of the same catalog at the same time. `finalize` merges all parts
+    into the final catalog in a single pass.
+
+    With backend "fits" the final catalog has the same layout as create_fits_table, one binary
+    table HDU per band. With backend "parquet" (requires pyarrow) `out_table` is a folder with one
+    <band>.parquet file per band.
+
+    Examples
+    --------
+    >>> writer = ResultWriter("after_fit.fits", batch_size=500)
+    >>> for result in iter_fit_catalog(...):
+    ...     writer.add(result["result"])
+    >>> writer.finalize()
+
+    In worker processes create a ResultWriter for the same out_table and call `flush` when
+    the worker is done, then call `finalize` once from the main process.
+    """
+
+    def __init__(self, out_table, batch_size=1000, backend="fits"):
+        """
+        Args:
+            out_table (str): path of the final catalog.
+            batch_size (int, optional): number of objects buffered before a flush. Defaults to 1000.
+            backend (str, optional): "fits" or "parquet". Defaults to "fits".
+
+        Raises:
+            ValueError: Backend not valid.
+        """
+        if backend not in ["fits", "parquet"]:
+            raise ValueError(f"Backend not valid - {backend}")
+
+        self.out_table = out_table
+        self.parts_dir = out_table.rstrip(os.sep) + ".parts"
+        self.batch_size = batch_size
+        self.backend = backend
+
+        self._rows = {}
+        self._n_buffered = 0
+
+    def __getstate__(self):
+        ## Buffered rows stay in the process that added them
+        state = self.__dict__.copy()
+        state["_rows"] = {}
+        state["_n_buffered"] = 0
+        return state
+
+    def add(self, pyg):
+        """Adds the rows of a PyGalfitm object, see PyGalfitm.fits_table_rows.
+
+        Args:
+            pyg (pygalfitm.PyGalfitm): PyGalfitm object, usually read from a .band result.
+        """
+        self.add_rows(pyg.fits_table_rows())
+
+    def add_rows(self, rows):
+        """Adds the rows of one object.
+
+        Args:
+            rows (dict): {band: {column: value}} as returned by PyGalfitm.fits_table_rows.
+        """
+        for band, row in rows.items():
+            self._rows.setdefault(band, []).append(row)
+        self._n_buffered += 1
+
+        if self._n_buffered >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Writes the buffered rows to a new part file."""
+        if self._n_buffered == 0:
+            return
+
+        os.makedirs(self.parts_dir, exist_ok=True)
+        part_name = f"part-{os.getpid()}-{uuid.uuid4().hex}"
+        tables = {band: _rows_to_table(rows) for band, rows in self._rows.items()}
+
+        if self.backend == "fits":
+            cube = fits.HDUList([fits.PrimaryHDU()])
+            for band, table in tables.items():
+                cube.append(fits.BinTableHDU(name=band, data=table))
+            tmp = os.path.join(self.parts_dir, part_name + ".tmp")
+            cube.writeto(tmp)
+            os.replace(tmp, os.path.join(self.parts_dir, part_name + ".fits"))
+        else:
+            pq = _import_parquet()
+            for band, table in tables.items():
+                band_dir = os.path.join(self.parts_dir, band)
+                os.makedirs(band_dir, exist_ok=True)
+                tmp = os.path.join(band_dir, part_name + ".tmp")
+                pq.write_table(_to_arrow(table), tmp)
+                os.replace(tmp, os.path.join(band_dir, part_name + ".parquet"))
+
+        self._rows = {}
+        self._n_buffered = 0
+
+    def finalize(self, append=True):
+        """Flushes the buffer and merges all part files into the final catalog.
+
+        Args:
+            append (bool, optional): keep the rows of an existing out_table. Defaults to True.
+
+        Returns:
+            str: path of the final catalog.
+        """
+        self.flush()
+        if self.backend == "fits":
+            self._finalize_fits(append)
+        else:
+            self._finalize_parquet(append)
+
+        shutil.rmtree(self.parts_dir, ignore_errors=True)
+        return self.out_table
+
+    def _finalize_fits(self, append):
+        tables = {}
+        if append and os.path.exists(self.out_table):
+            with fits.open(self.out_table) as cube:
+                for hdu in cube[1:]:
+                    tables[hdu.name.lower()] = [Table(hdu.data)]
+
+        for part in sorted(glob.glob(os.path.join(self.parts_dir, "*.fits"))):
+            with fits.open(part) as cube:
+                for hdu in cube[1:]:
+                    tables.setdefault(hdu.name.lower(), []).append(Table(hdu.data))
+
+        if len(tables) == 0:
+            control.info("No rows to write.")
+            return
+
+        cube = fits.HDUList([fits.PrimaryHDU()])
+        for band, band_tables in tables.items():
+            cube.append(fits.BinTableHDU(name=band, data=vstack(band_tables, join_type="outer")))
+
+        tmp = self.out_table + ".tmp"
+        cube.writeto(tmp, overwrite=True)
+        os.replace(tmp, self.out_table)
+
+    def _finalize_parquet(self, append):
+        import pyarrow as pa
+        pq = _import_parquet()
+
+        os.makedirs(self.out_table, exist_ok=True)
+        for band_dir in sorted(glob.glob(os.path.join(self.parts_dir, "*"))):
+            band = os.path.basename(band_dir)
+            out = os.path.join(self.out_table, f"{band}.parquet")
+
+            tables = []
+            if append and os.path.exists(out):
+                tables.append(pq.read_table(out))
+            tables += [pq.read_table(part) for part in sorted(glob.glob(os.path.join(band_dir, "*.parquet")))]
+
+            pq.write_table(pa.concat_tables(tables, promote_options="default"), out + ".tmp")
+            os.replace(out + ".tmp", out)
+
+
+def _result_schema(pyg):
+    bands = tuple(band_list(pyg.base))
+    nbands = len(bands)
+    n_zps = min(len(pyg.base["J"]["value"].split(",")), nbands) if "J" in pyg.base else 0
+
+    components = {component: pyg.components_config[component] for component in pyg.active_components}
+    key = (bands, n_zps, tuple(
+        (component, tuple(params.names), tuple(params.comments), (params.lengths == nbands).tobytes())
+        for component, params in components.items()
+    ))
+
+    if key not in _schemas:
+        from pygalfitm.read import result_row
+
+        ## Names and order of the columns are the ones of the row of create_result_table and read_many
+        columns = list(result_row(pyg.base, components))
+
+        ## Column of every value copied from the parameter arrays, in the order they are concatenated
+        values = []
+        selection = []
+        for component, params in components.items():
+            rows = []
+            for i in np.flatnonzero(params.lengths == nbands):
+                col_name = remove_parentheses_and_brackets(params.comments[i])
+                if "--" in col_name:
+                    continue
+                rows.append(i)
+                values += [f"{component}_{col_name}_{band}" for band in bands]
+            selection.append((component, np.array(rows, dtype=np.int64)))
+
+        problems = [f"{col}_problem" for col in values]
+        targets = values + [f"ZP_{band}" for band in bands[:n_zps]] + problems
+        _schemas[key] = (nbands, n_zps, selection, columns, targets, frozenset(problems))
+
+    return _schemas[key]
+
+
+def _qa_columns(objects):
+    from pygalfitm.qa import qa_metrics
+    from pygalfitm.read import _rows_to_columns
+
+    rows = []
+    for pyg in objects:
+        try:
+            rows.append(qa_metrics(pyg))
+        except Exception as e:
+            control.warn(f"QA failed {pyg.name} - {type(e).__name__}: {e}")
+            rows.append(None)
+
+    columns = _rows_to_columns(rows)
+    return list(columns), np.column_stack(list(columns.values())) if columns else np.empty((len(objects), 0))
+
+
+def build_result_table(objects, output="pandas", qa=False):
+    """Builds one result table of many PyGalfitm objects, one row per object.
+
+    Columns are the ones of PyGalfitm.create_result_table and read_many, in the same order (see read.result_row):
+    "component_col_name_band" of the active components, "ZP_band", the boolean "component_col_name_band_problem"
+    and the QA columns. Column names are computed once per schema (bands and
+    parameters of the active components) and the values are copied from the parameter arrays into
+    preallocated columns, objects with a different schema get NaN (False for the problem flags) in the columns
+    they do not have.
+
+    Ex:
+        objects = [read_output_to_class(f) for f in glob.glob("outputs/*/*ss.galfit.01.band")]
+        df = build_result_table(objects)
+        build_result_table(objects, "fits").write("results.fits")
+
+    Args:
+        objects (list): PyGalfitm objects, usually read from .band results.
+        output (str, optional): "pandas" (DataFrame indexed by ID), "arrow" (pyarrow.Table) or
+            "fits" (astropy Table, ready to be written as a FITS binary table). Defaults to "pandas".
+        qa (bool, optional): add the QA metrics of each fit, columns "QA_<metric>_<band>" (see pygalfitm.qa,
+            qa_many computes them for many files in a process pool). Defaults to False.
+
+    Raises:
+        ValueError: Output not valid.
+
+    Returns:
+        pandas.DataFrame, pyarrow.Table or astropy.table.Table: result table with an "ID" column (the object names).
+    """
+    if output not in ["pandas", "arrow", "fits"]:
+        raise ValueError(f"Output not valid - {output}")
+
+    objects = list(objects)
+    schemas = [_result_schema(pyg) for pyg in objects]
+
+    col_index = {}
+    positions = {}
+    problem_columns = set()
+    for schema in schemas:
+        if id(schema) not in positions:
+            for col in schema[3]:
+                col_index.setdefault(col, len(col_index))
+            positions[id(schema)] = np.array([col_index[col] for col in schema[4]], dtype=np.int64)
+            problem_columns |= schema[5]
+
+    ## Problem flags are stored as 0 or 1 and turned into boolean columns at the end
+    data = np.full((len(objects), len(col_index)), np.nan)
+    names = []
+    for row, (pyg, schema) in enumerate(zip(objects, schemas)):
+        names.append(os.path.basename(pyg.name))
+        nbands, n_zps, selection = schema[:3]
+
+        values = [pyg.components_config[component].values[rows, :nbands].ravel() for component, rows in selection]
+        if n_zps > 0:
+            values.append(parse_values(pyg.base["J"]["value"])[:n_zps])
+        values += [pyg.components_config[component].problem_mask[rows, :nbands].ravel() for component, rows in selection]
+        if len(values) > 0:
+            data[row, positions[id(schema)]] = np.concatenate(values)
+
+    columns = list(col_index)
+    arrays = [data[:, key] == 1 if col in problem_columns else data[:, key] for key, col in enumerate(columns)]
+    if qa:
+        qa_columns, qa_data = _qa_columns(objects)
+        columns += qa_columns
+        arrays += [qa_data[:, key] for key in range(len(qa_columns))]
+
+    if output == "pandas":
+        import pandas as pd
+        return pd.DataFrame(dict(zip(columns, arrays)), index=pd.Index(names, name="ID"))
+
+    ids = np.array(names, dtype=str)
+    if output == "arrow":
+        import pyarrow as pa
+        return pa.table([pa.array(ids)] + arrays, names=["ID"] + columns)
+
+    return Table([ids] + arrays, names=["ID"] + columns, copy=False)
+
+
+def _rows_to_table(rows):
+    """Builds a Table from a list of row dicts, columns missing in a row are filled with NaN."""
+    columns = {}
+    for row in rows:
+        for col in row:
+            columns.setdefault(col, None)
+
+    data = {}
+    for col in columns:
+        if col == "ID":
+            data[col] = np.array([str(row.get(col, "")) for row in rows])
+        else:
+            data[col] = np.array([row.get(col, np.nan) for row in rows], dtype=np.float64)
+    return Table(data)
+
+
+def _to_arrow(table):
+    import pyarrow as pa
+    return pa.table({col: np.asarray(table[col]) for col in table.colnames})
+
+
+def _import_parquet():
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("The parquet backend requires pyarrow, install it with: pip install pyarrow")
+    return pq
@@ -0,0 +1,267 @@
+import os
+import copy
+import time
+import shutil
+import tempfile
+import subprocess
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import util
+
+from pygalfitm.auxiliars import band_output_path
+from pygalfitm.log import control
+
+## Base parameters that name input files, made absolute before galfitm runs in a scratch folder
+INPUT_PARAMETERS = ["A", "C", "D", "F", "G"]
+
+## Outputs that can be moved back from the scratch folder
+OUTPUTS = ["block", "band", "log", "feedme"]
+
+## State of this worker process, set once by init_worker
+_worker = {}
+
+
+def default_scratch_root():
+    """Returns /dev/shm (memory backed) if it is writable, otherwise the temporary folder of the system."""
+    if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK):
+        return "/dev/shm"
+    return tempfile.gettempdir()
+
+
+def validate_executable(executable):
+    """Returns the absolute path of a galfitm executable.
+
+    Args:
+        executable (str): galfitm executable path.
+
+    Raises:
+        FileNotFoundError: Executable not found or not executable.
+
+    Returns:
+        str: absolute path.
+    """
+    executable = os.path.abspath(executable)
+    if not os.path.isfile(executable) or not os.access(executable, os.X_OK):
+        raise FileNotFoundError(
+            f"galfitm executable not found or not executable - {executable}. "
+            "Run PyGalfitm().check_executable() to download it."
+        )
+    return executable
+
+
+def init_worker(executable=None, scratch_root=None):
+    """Initializer of a worker process, validates the executable and creates the scratch folder of the worker.
+
+    The scratch folder is removed when the worker process exits.
+
+    Args:
+        executable (str, optional): galfitm executable path. Defaults to None (the one of each PyGalfitm).
+        scratch_root (str, optional): folder where the scratch folder is created. Defaults to None (see default_scratch_root).
+    """
+    if executable is not None:
+        executable = validate_executable(executable)
+
+    scratch = tempfile.mkdtemp(prefix=f"pygalfitm-{os.getpid()}-", dir=scratch_root or default_scratch_root())
+    util.Finalize(None, shutil.rmtree, args=(scratch,), kwargs={"ignore_errors": True}, exitpriority=10)
+
+    _worker.clear()
+    _worker.update({"executable": executable, "scratch": scratch, "validated": set()})
+
+
+def _absolute(value, cwd=None):
+    items = []
+    for item in str(value).split(","):
+        path = item.strip()
+        if path and path.lower() != "none" and not os.path.isabs(path):
+            item = os.path.abspath(os.path.join(cwd or "", path))
+        items.append(item)
+    return ",".join(items)
+
+
+def _clear(folder):
+    for entry in os.scandir(folder):
+        if entry.is_dir(follow_symlinks=False):
+            shutil.rmtree(entry.path, ignore_errors=True)
+        else:
+            os.remove(entry.path)
+
+
+def _move(src, dst, scratch=None, dst_dir=None):
+    ## Text outputs name the block inside the scratch folder, rewritten to the final folder
+    tmp = f"{dst}.{os.getpid()}.tmp"
+    if scratch is not None:
+        with open(src, "r") as f:
+            text = f.read().replace(scratch + os.sep, dst_dir + os.sep)
+        with open(tmp, "w") as f:
+            f.write(text)
+        os.remove(src)
+    else:
+        shutil.move(src, tmp)
+    os.replace(tmp, dst)
+
+
+def run_job(pyg, outputs=("block", "band"), timeout=None, cwd=None):
+    """Runs galfitm for a PyGalfitm object inside the scratch folder of this worker process.
+
+    The feedme is written to the scratch folder with the output block (base B) pointing there, galfitm is
+    executed directly (no shell) with the scratch folder as working directory, and only the requested
+    outputs are moved to the folder of base B. Relative paths of the inputs and of base B are read
+    from `cwd`, the directory galfitm would run in without the scratch folder.
+
+    Args:
+        pyg (pygalfitm.PyGalfitm): PyGalfitm object, not modified.
+        outputs (list, optional): outputs moved back, any of "block" (base B), "band" (.band result),
+            "log" (fit.log) and "feedme" (galfit.feedme). Defaults to ("block", "band").
+        timeout (float, optional): maximum time in seconds for the fit, galfitm is killed on expiry. Defaults to None.
+        cwd (str, optional): directory relative paths are resolved against. Defaults to None (working directory of the worker).
+
+    Raises:
+        TimeoutError: galfitm did not finish in `timeout` seconds.
+        Exception: galfitm exited with an error.
+
+    Returns:
+        dict: output (stdout of galfitm), paths ({output: final path}), elapsed and pid.
+    """
+    if not _worker:
+        init_worker()
+
+    for output in outputs:
+        if output not in OUTPUTS:
+            raise ValueError(f"Output not valid - {output}")
+
+    start = time.time()
+    scratch = _worker["scratch"]
+    _clear(scratch)
+
+    executable = _worker["executable"]
+    if executable is None:
+        executable = pyg.executable
+        if executable not in _worker["validated"]:
+            validate_executable(executable)
+            _worker["validated"].add(executable)
+        executable = os.path.abspath(executable)
+
+    block = _absolute(pyg.base["B"]["value"].strip(), cwd)
+    dst_dir = os.path.dirname(block)
+
+    job = copy.copy(pyg)
+    job.base = {letter: dict(param) for letter, param in pyg.base.items()}
+    for letter in INPUT_PARAMETERS:
+        if letter in job.base:
+            job.base[letter]["value"] = _absolute(job.base[letter]["value"], cwd)
+    job.base["B"]["value"] = os.path.join(scratch, os.path.basename(block))
+    job.write_feedme(os.path.join(scratch, "galfit.feedme"))
+
+    if not job.check_number_of_filters():
+        control.info("Warning! Running with possibly wrong parameters on components.")
+
+    try:
+        proc = subprocess.run(
+            [executable, "galfit.feedme"], cwd=scratch, timeout=timeout,
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+        )
+    except subprocess.TimeoutExpired:
+        raise TimeoutError(f"galfitm did not finish in {timeout}s - {block}")
+    output = proc.stdout.decode("UTF-8", errors="replace")
+
+    sources = {
+        "block": (job.base["B"]["value"], block),
+        "band": (band_output_path(job), _absolute(band_output_path(pyg), cwd)),
+        "log": (os.path.join(scratch, "fit.log"), os.path.join(dst_dir, "fit.log")),
+        "feedme": (job.feedme_path, os.path.join(dst_dir, "galfit.feedme")),
+    }
+
+    if proc.returncode != 0:
+        control.info(output)
+        outputs = ["log"]
+
+    os.makedirs(dst_dir, exist_ok=True)
+    paths = {}
+    for name in outputs:
+        src, dst = sources[name]
+        if os.path.exists(src):
+            _move(src, dst, *((scratch, dst_dir) if name in ["band", "feedme"] else ()))
+            paths[name] = dst
+
+    if proc.returncode != 0:
+        raise Exception("Error running galfitm.")
+
+    return {"output": output, "paths": paths, "elapsed": round(time.time() - start, 4), "pid": os.getpid()}
+
+
+class GalfitmPool:
+    """
+    Long lived pool of galfitm worker processes.
+
+    Every worker validates the executable once and owns a scratch folder (in /dev/shm when available),
+    where galfitm runs with exec (no shell), so fit.log and intermediate files of concurrent fits never
+    collide. Only the requested outputs are moved to the folder of base B of each fit.
+
+    Examples
+    --------
+    >>> with GalfitmPool(max_workers=32) as pool:
+    ...     futures = [pool.submit(pyg) for pyg in pygs]
+    ...     outputs = [future.result()["output"] for future in futures]
+    """
+
+    def __init__(self, max_workers=None, executable=None, scratch_root=None, outputs=("block", "band"), timeout=None):
+        """
+        Args:
+            max_workers (int, optional): number of worker processes. Defaults to None (number of CPUs).
+            executable (str, optional): galfitm executable used by every fit. Defaults to None (the one of each PyGalfitm).
+            scratch_root (str, optional): folder where the scratch folders are created. Defaults to None (see default_scratch_root).
+            outputs (list, optional): outputs moved back after each fit, see run_job. Defaults to ("block", "band").
+            timeout (float, optional): maximum time in seconds of each fit. Defaults to None.
+        """
+        if executable is not None:
+            executable = validate_executable(executable)
+
+        self.executable = executable
+        self.outputs = tuple(outputs)
+        self.timeout = timeout
+        self._pool = ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=init_worker,
+            initargs=(executable, scratch_root),
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def submit(self, pyg, outputs=None, timeout=None):
+        """Submits a fit, see run_job.
+
+        Args:
+            pyg (pygalfitm.PyGalfitm): PyGalfitm object.
+            outputs (list, optional): outputs moved back. Defaults to None (the ones of the pool).
+            timeout (float, optional): maximum time in seconds of the fit. Defaults to None (the one of the pool).
+
+        Returns:
+            concurrent.futures.Future: future of the run_job result.
+        """
+        return self._pool.submit(
+            run_job, pyg,
+            self.outputs if outputs is None else tuple(outputs),
+            self.timeout if timeout is None else timeout,
+        )
+
+    def run(self, pyg, outputs=None, timeout=None):
+        """Runs a fit and waits for it, see run_job.
+
+        Returns:
+            str: output of run.
+        """
+        return self.submit(pyg, outputs, timeout).result()["output"]
+
+    def map(self, pygs, outputs=None, timeout=None):
+        """Runs many fits, yielding their run_job results in the order of pygs."""
+        futures = [self.submit(pyg, outputs, timeout) for pyg in pygs]
+        for future in futures:
+            yield future.result()
+
+    def close(self, wait=True):
+        """Stops the workers and removes their scratch folders."""
+        self._pool.shutdown(wait=wait)
@@ -1,6 +1,7 @@
 from pygalfitm.VOs import splus
 
 from pygalfitm import PyGalfitm
+from pygalfitm.imageblock import ImageBlock
 import splusdata
 
 from astropy.io import fits
@@ -157,11 +158,7 @@ filters = pygalgitm_object.base['A1']['value'].split(",")
 for key, band in enumerate(filters): 
     filters[key] = band.strip()
 
-fits_cube = fits.open(os.path.join(OUTPUT_FOLDER, "testss.fits"))
-
-input_data = {f: fits_cube[i + 1].data for i, f in enumerate(filters)}
-model_data = {f: fits_cube[i + len(filters) + 1].data for i, f in enumerate(filters)}
-residual_data = {f: fits_cube[i + 2*len(filters) + 1].data for i, f in enumerate(filters)}
+block = ImageBlock(path=os.path.join(OUTPUT_FOLDER, "testss.fits"), bands=filters)
 
 colors = {
     'i': (97, 0, 0),
@@ -197,7 +194,10 @@ from os.path import join
 
 print("------------------------------------")
 print("Extracting results data and applying color filters")
-for key in input_data:
+block.export(OUTPUT_FOLDER)
+block.close()
+
+for key in filters:
     input_name = join(OUTPUT_FOLDER, f"input_{key}.fits")
     model_name = join(OUTPUT_FOLDER, f"model_{key}.fits")
     residual_name = join(OUTPUT_FOLDER, f"residual_{key}.fits")
@@ -206,10 +206,6 @@ for key in input_data:
     model_im = join(OUTPUT_FOLDER, f"model_{key}.png")
     residual_im = join(OUTPUT_FOLDER, f"residual_{key}.png")
 
-    fits.PrimaryHDU(data = input_data[key]).writeto(input_name, overwrite = True)
-    fits.PrimaryHDU(data = model_data[key]).writeto(model_name, overwrite = True)
-    fits.PrimaryHDU(data = residual_data[key]).writeto(residual_name, overwrite = True)
-    
     os.system(f"fitspng -o {input_im} {input_name}")
     os.system(f"fitspng -o {model_im} {model_name}")
     os.system(f"fitspng -o {residual_im} {residual_name}")
@@ -4,7 +4,13 @@ import os
 import splusdata
 
 from pygalfitm.read import read_output_to_class
+from pygalfitm.journal import RunJournal
+from pygalfitm.render import RenderFarm
+from pygalfitm.tables import ResultWriter
 import matplotlib
+import time
+
+from functools import partial
 
 import argparse
 
@@ -19,6 +25,9 @@ parser.add_argument('-P', '--spluspassword', type=str, default=None, help='Splus
 parser.add_argument('-F', '--data_folder', type=str, default="../data/", help='Data folder.')
 parser.add_argument('-O', '--output_folder', type=str, default="../outputs/", help='Output folder.')
 parser.add_argument('-G', '--galfit_path', type=str, default=None, help='Path to galfit executable.')
+parser.add_argument('-J', '--journal', type=str, default=None, help='Run journal, objects done in it are skipped. Defaults to <output_folder>/journal.sqlite.')
+parser.add_argument('-R', '--retries', type=int, default=0, help='Number of times an object that failed in previous runs is tried again.')
+parser.add_argument('-W', '--render_workers', type=int, default=2, help='Number of processes rendering the plots in the background.')
 
 # Execute the parse_args() method
 args = parser.parse_args()
@@ -70,13 +79,49 @@ if not os.path.exists(OUTPUT_FOLDER):
 
 ra_col, dec_col, ID_col = get_column_labels(df.columns)
 
+def record_render(name, attempt, start, outfolder, pygal_obj, result_obj, band_file, future):
+    ## An object is done only when its plot and both table rows are written, so a crash before that fits it
+    ## again on resume, and failed attempts add no rows
+    feedme = pygal_obj.feedme_path
+    if future.cancelled():
+        error = "Render cancelled"
+    elif future.exception() is not None:
+        error = f"Render failed - {type(future.exception()).__name__}: {str(future.exception())}"
+    else:
+        try:
+            before_writer.add(pygal_obj)
+            after_writer.add(result_obj)
+            journal.record(name, "done", attempt=attempt, started=start, elapsed=time.time() - start,
+                           workdir=outfolder, feedme=feedme, band_file=band_file)
+            return
+        except Exception as e:
+            error = f"Table rows not written - {type(e).__name__}: {str(e)}"
+
+    journal.record(name, "failed", attempt=attempt, started=start, elapsed=time.time() - start,
+                   workdir=outfolder, feedme=feedme, band_file=band_file, error=error)
+
+journal = RunJournal(args.journal or os.path.join(OUTPUT_FOLDER, "journal.sqlite"))
+states = journal.states()
+total = len(df)
+farm = RenderFarm(max_workers=args.render_workers)
+
+## One writer per catalog, each row is written to its own part file before the object is journaled as done,
+## and the parts are merged once at the end of the run
+before_writer = ResultWriter(os.path.join(OUTPUT_FOLDER, "before_fit.fits"), batch_size=1)
+after_writer = ResultWriter(os.path.join(OUTPUT_FOLDER, "after_fit.fits"), batch_size=1)
+
 for key, value in df.iterrows():
     name = value[ID_col]
     ra = value[ra_col]
     dec = value[dec_col]
+
+    status, failures = states.get(str(name), (None, 0))
+    if status == "done" or failures > args.retries:
+        continue
     
     print("====================================")
-    print(f"Starting {name}")
+    print(f"Starting {name} ({key + 1}/{total})")
+    start = time.time()
 
     cut_size = int(args.cut_size)
 
@@ -94,36 +139,49 @@ for key, value in df.iterrows():
             output_folder=outfolder,
             conn=conn,
             remove_negatives=True, 
-            bands = bands
+            bands = bands,
+            psf_folder=os.path.join(DATA_FOLDER, "psf")
         )
         
     except Exception as e:
         print(e)
         print(f"Skipping {name}")
         print("====================================")
+        journal.record(name, "failed", attempt=failures + 1, started=start, elapsed=time.time() - start,
+                       workdir=outfolder, error=f"{type(e).__name__}: {str(e)}")
         continue
     
-    pygal_obj.write_feedme()
-    pygal_obj.create_fits_table(os.path.join(OUTPUT_FOLDER, "before_fit.fits"))
-    
-    if args.galfit_path is not None:
-        pygal_obj.executable = args.galfit_path
+    band_file = os.path.join(outfolder, f"{name}ss.galfit.01.band")
+    try:
+        pygal_obj.write_feedme()
+        
+        if args.galfit_path is not None:
+            pygal_obj.executable = args.galfit_path
 
-    _ = pygal_obj.run()
+        _ = pygal_obj.run()
 
-    os.path.join(outfolder, f"{name}ss.galfit.01.band")
-    result_obj = read_output_to_class(os.path.join(outfolder, f"{name}ss.galfit.01.band"))
-    
-    plot = result_obj.gen_plot(
-        "sersic", 
-        return_plot = True, 
-        plot_parameters=[3, 4, 5, 9], 
-        colorbar=True
-    )
-    plot.savefig(os.path.join(outfolder, f"{name}_plot.pdf"))
-    
-    result_obj.create_fits_table(os.path.join(OUTPUT_FOLDER, "after_fit.fits"))
-    
+        result_obj = read_output_to_class(band_file)
+        
+        render = farm.submit_plot(
+            result_obj,
+            os.path.join(outfolder, f"{name}_plot.pdf"),
+            component_selected="sersic",
+            plot_parameters=[3, 4, 5, 9],
+            colorbar=True
+        )
+    except Exception as e:
+        print(e)
+        print(f"Failed {name}")
+        print("====================================")
+        journal.record(name, "failed", attempt=failures + 1, started=start, elapsed=time.time() - start,
+                       workdir=outfolder, feedme=pygal_obj.feedme_path, error=f"{type(e).__name__}: {str(e)}")
+        continue
+
+    render.add_done_callback(partial(record_render, name, failures + 1, start, outfolder, pygal_obj, result_obj, band_file))
     print(f"Finished {name}")
     print("====================================")
 
+farm.close()
+before_writer.finalize()
+after_writer.finalize()
+